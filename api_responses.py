@@ -0,0 +1,206 @@
+"""
+Fast JSON rendering and response compression for the API server.
+
+Match detail and timeline payloads run to hundreds of KB, so two things
+are offered on top of the FastAPI defaults:
+
+    - FastJSONResponse renders with orjson instead of json.dumps. Handlers
+      opt in by returning json_response(content), which also skips
+      jsonable_encoder; API_FAST_JSON=1 makes it the default response
+      class of the app as well.
+    - CompressionMiddleware compresses bodies of at least
+      API_COMPRESS_MIN_SIZE bytes with brotli or gzip, whichever the
+      client prefers in Accept-Encoding (brotli wins ties). Streamed
+      bodies are flushed chunk by chunk, so NDJSON lines still arrive as
+      they are produced.
+
+orjson and brotli are optional: without orjson responses are rendered with
+json.dumps, without brotli only gzip is offered.
+"""
+
+import json
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FAST_JSON = os.getenv("API_FAST_JSON", "0") == "1"
+COMPRESS_MIN_SIZE = int(os.getenv("API_COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("API_BROTLI_QUALITY", "4"))
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/yaml",
+    "text/",
+)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, falling back to compact json.dumps."""
+
+    def render(self, content):
+        if orjson is None:
+            return json.dumps(
+                content, ensure_ascii=False, separators=(",", ":"), default=str
+            ).encode("utf-8")
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def default_response_class():
+    return FastJSONResponse if FAST_JSON else JSONResponse
+
+
+def json_response(content):
+    """
+    Wraps a large, already JSON-compatible payload in a FastJSONResponse.
+
+    Returning a Response from a handler bypasses FastAPI's jsonable_encoder
+    walk over the payload, which costs more than the rendering itself.
+    """
+    return FastJSONResponse(content)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Picks the content coding for an Accept-Encoding header.
+
+    Returns:
+        str: "br", "gzip" or None when the client accepts neither.
+    """
+    offered = {"gzip": 0.0}
+    if brotli is not None:
+        offered["br"] = 0.0
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() != "q":
+                continue
+            try:
+                quality = float(value.strip())
+            except ValueError:
+                quality = 0.0
+        if coding == "*":
+            for name in offered:
+                offered[name] = max(offered[name], quality)
+        elif coding in offered:
+            offered[coding] = quality
+    best = max(offered, key=lambda name: (offered[name], name == "br"))
+    return best if offered[best] > 0 else None
+
+
+class Compressor:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self.compressor.process(data)
+        return self.compressor.compress(data)
+
+    def flush(self):
+        if self.encoding == "br":
+            return self.compressor.flush()
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+
+    Complete bodies are compressed when they reach `minimum_size`; streamed
+    bodies are always compressed, each chunk flushed as it is sent.
+    Responses that are already encoded, or not text/JSON/YAML, pass through
+    untouched.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if start_message is not None and compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                if (
+                    "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(
+                        COMPRESSIBLE_TYPES
+                    )
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+                compressor = Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                    message["body"] = compressor.compress(body) + compressor.flush()
+                else:
+                    message["body"] = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(message["body"]))
+                await send(start_message)
+                start_message = None
+                await send(message)
+                return
+            if compressor is None:
+                await send(message)
+                return
+            body = compressor.compress(message.get("body", b""))
+            if message.get("more_body", False):
+                message["body"] = body + compressor.flush()
+            else:
+                message["body"] = body + compressor.finish()
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,287 @@
+"""
+Durable crawl state for match_list, the crawl engine and the pipeline.
+
+Kept in a small local SQLite file (CRAWL_STATE_PATH), whatever database
+the crawl writes its results to, and made of:
+
+    - summoners: per (region, summoner name), when it was last crawled, its
+      puuid and the newest match ID seen, so a re-crawl only pages back to
+      that match and summoners crawled within CRAWL_FRESHNESS_HOURS are
+      skipped altogether
+    - cursors: per stage, the shuffle seed and position of the current run,
+      so an interrupted run resumes with the same order where it stopped
+
+Usage:
+    python crawl_state.py status
+    python crawl_state.py reset --stage match_list
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", "crawl_state.db")
+CRAWL_FRESHNESS_HOURS = float(os.getenv("CRAWL_FRESHNESS_HOURS", "24"))
+LEGACY_CHECKPOINT_PATH = os.getenv("CRAWL_CHECKPOINT", "crawl_checkpoint.json")
+FLUSH_EVERY = 50
+
+
+class CrawlState:
+    """
+    Thread-safe crawl state. Summoner updates are buffered and written every
+    FLUSH_EVERY records, on flush() and whenever a cursor moves.
+    """
+
+    def __init__(
+        self,
+        path=CRAWL_STATE_PATH,
+        freshness_hours=CRAWL_FRESHNESS_HOURS,
+        legacy_checkpoint=LEGACY_CHECKPOINT_PATH,
+    ):
+        self.path = path
+        self.freshness = freshness_hours * 3600
+        self.lock = threading.Lock()
+        self.pending = dict()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summoners (
+                region TEXT NOT NULL,
+                summoner_name TEXT NOT NULL,
+                puuid TEXT,
+                last_crawled REAL NOT NULL,
+                last_match_id TEXT,
+                PRIMARY KEY (region, summoner_name)
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cursors (
+                stage TEXT PRIMARY KEY,
+                seed INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                started REAL NOT NULL,
+                updated REAL NOT NULL,
+                finished REAL
+            )
+            """
+        )
+        self.conn.commit()
+        if legacy_checkpoint and os.path.exists(legacy_checkpoint):
+            self.import_checkpoint(legacy_checkpoint)
+
+    def import_checkpoint(self, checkpoint_path):
+        # Summoners listed in the old crawler.py JSON checkpoint count as crawled then.
+        with open(checkpoint_path, "r") as f:
+            checkpoint = json.load(f)
+        updated = checkpoint.get("updated", time.time())
+        rows = [
+            tuple(key.split(":", 1)) + (updated,)
+            for key in checkpoint.get("done", [])
+            if ":" in key
+        ]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO summoners (region, summoner_name, last_crawled) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            self.conn.commit()
+        os.replace(checkpoint_path, checkpoint_path + ".imported")
+
+    def fresh_keys(self):
+        """
+        Returns:
+            set: (region, summoner name) of every summoner crawled within the freshness window.
+        """
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT region, summoner_name FROM summoners WHERE last_crawled > ?",
+                (time.time() - self.freshness,),
+            ).fetchall()
+        return set(rows)
+
+    def last_match_id(self, region, summoner_name):
+        with self.lock:
+            if (region, summoner_name) in self.pending:
+                return self.pending[(region, summoner_name)][1]
+            row = self.conn.execute(
+                "SELECT last_match_id FROM summoners WHERE region = ? AND summoner_name = ?",
+                (region, summoner_name),
+            ).fetchone()
+        return row[0] if row else None
+
+    def record(self, region, summoner_name, puuid, newest_match_id=None):
+        """
+        Marks a summoner as crawled now. `newest_match_id` replaces the stored
+        last-seen match only when set, i.e. when the crawl found newer matches.
+        """
+        with self.lock:
+            if newest_match_id is None:
+                previous = self.pending.get((region, summoner_name))
+                if previous is not None:
+                    newest_match_id = previous[1]
+            self.pending[(region, summoner_name)] = (puuid, newest_match_id, time.time())
+            full = len(self.pending) >= FLUSH_EVERY
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows = [
+                (region, summoner_name, puuid, crawled, match_id)
+                for (region, summoner_name), (puuid, match_id, crawled) in self.pending.items()
+            ]
+            self.pending.clear()
+            if not rows:
+                return
+            self.conn.executemany(
+                """
+                INSERT INTO summoners (region, summoner_name, puuid, last_crawled, last_match_id)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (region, summoner_name) DO UPDATE SET
+                    puuid = COALESCE(excluded.puuid, puuid),
+                    last_crawled = excluded.last_crawled,
+                    last_match_id = COALESCE(excluded.last_match_id, last_match_id)
+                """,
+                rows,
+            )
+            self.conn.commit()
+
+    def start_run(self, stage, total, resume=True):
+        """
+        Starts a run of a stage, or resumes its unfinished one.
+
+        A run is only resumed over the same number of items: once items were
+        added or removed, the shuffled order no longer lines up with the
+        saved position, so a new run starts instead. Summoners the
+        interrupted run already crawled are still skipped as fresh.
+
+        Returns:
+            tuple: (seed, position). Shuffle the stage's items with
+            random.Random(seed) and start at `position`.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT seed, position, total FROM cursors "
+                "WHERE stage = ? AND finished IS NULL",
+                (stage,),
+            ).fetchone()
+            if resume and row is not None and row[2] == total:
+                return row[0], row[1]
+            seed = random.getrandbits(31)
+            now = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cursors VALUES (?, ?, 0, ?, ?, ?, NULL)",
+                (stage, seed, total, now, now),
+            )
+            self.conn.commit()
+            return seed, 0
+
+    def unfinished(self, stage):
+        with self.lock:
+            return (
+                self.conn.execute(
+                    "SELECT 1 FROM cursors WHERE stage = ? AND finished IS NULL",
+                    (stage,),
+                ).fetchone()
+                is not None
+            )
+
+    def advance(self, stage, position):
+        # Summoners are flushed first, so the cursor never runs ahead of them.
+        self.flush()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE cursors SET position = ?, updated = ? WHERE stage = ?",
+                (position, time.time(), stage),
+            )
+            self.conn.commit()
+
+    def finish(self, stage):
+        self.flush()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE cursors SET finished = ?, updated = ? WHERE stage = ?",
+                (time.time(), time.time(), stage),
+            )
+            self.conn.commit()
+
+    def reset(self, stage=None):
+        with self.lock:
+            if stage is None:
+                self.conn.execute("DELETE FROM cursors")
+            else:
+                self.conn.execute("DELETE FROM cursors WHERE stage = ?", (stage,))
+            self.conn.commit()
+
+    def status(self):
+        self.flush()
+        with self.lock:
+            cursors = self.conn.execute(
+                "SELECT stage, position, total, started, updated, finished FROM cursors"
+            ).fetchall()
+            summoners, fresh = self.conn.execute(
+                "SELECT COUNT(*), SUM(last_crawled > ?) FROM summoners",
+                (time.time() - self.freshness,),
+            ).fetchone()
+        return {
+            "summoners": summoners,
+            "fresh": fresh or 0,
+            "stages": [
+                {
+                    "stage": stage,
+                    "position": position,
+                    "total": total,
+                    "started": started,
+                    "updated": updated,
+                    "finished": finished,
+                }
+                for stage, position, total, started, updated, finished in cursors
+            ],
+        }
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["status", "reset"])
+    parser.add_argument("--path", default=CRAWL_STATE_PATH)
+    parser.add_argument("--stage", default=None)
+    args = parser.parse_args()
+
+    state = CrawlState(args.path)
+    if args.command == "reset":
+        state.reset(args.stage)
+    status = state.status()
+    print(
+        "{} summoners tracked, {} crawled in the last {:.0f}h".format(
+            status["summoners"], status["fresh"], state.freshness / 3600
+        )
+    )
+    for cursor in status["stages"]:
+        print(
+            "{:<12} {}/{} {} (updated {})".format(
+                cursor["stage"],
+                cursor["position"],
+                cursor["total"],
+                "finished" if cursor["finished"] else "in progress",
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(cursor["updated"])),
+            )
+        )
+    state.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import queue
+import threading
+import time
+
+from rich import print
+
+from constants import MASS_REGIONS, REGIONS
+from crawl_state import CrawlState
+
+_DONE = object()
+
+
+class RegionStats:
+    """Request and item counters for one worker lane."""
+
+    def __init__(self, region):
+        self.region = region
+        self.items = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, items=1, errors=0):
+        with self.lock:
+            self.items += items
+            self.errors += errors
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.started
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+
+class CrawlEngine:
+    """
+    Runs RiotAPI.player_list and RiotAPI.match_list with one worker lane per routing value.
+
+    Riot quotas are per region, so each platform (na1, euw1, ...) gets a lane
+    for its summoner lookups and each mass region (americas, asia, europe)
+    gets a lane for its match ID lookups. Every lane saturates its own quota
+    through the shared rate limiter instead of waiting for the others.
+
+    Summoners whose match IDs were stored are recorded in the CrawlState,
+    so a restarted crawl skips the ones crawled within the freshness window
+    and only pages the others back to their newest known match.
+    """
+
+    def __init__(self, api, state=None, report_every=30):
+        self.api = api
+        self.db = api.db
+        self.state = state or CrawlState()
+        self.report_every = report_every
+        self.stats = dict()
+
+    def run_lanes(self, lanes):
+        threads = [
+            threading.Thread(target=target, args=args, name=name, daemon=True)
+            for name, (target, args) in lanes.items()
+        ]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=self.report_every)
+                if thread.is_alive():
+                    break
+            self.state.flush()
+            self.report()
+        self.state.flush()
+        self.report()
+
+    def report(self):
+        for region, stats in sorted(self.stats.items()):
+            print(
+                "[{}][CRAWL] {:<8} items {:>7} | errors {:>4} | {:.2f}/s".format(
+                    time.strftime("%Y-%m-%d %H:%M"),
+                    region,
+                    stats.items,
+                    stats.errors,
+                    stats.throughput(),
+                )
+            )
+
+    def failed(self, region, item, error):
+        self.stats[region].add(items=0, errors=1)
+        print(
+            "[{}][CRAWL][ERR] {} {}: {}".format(
+                time.strftime("%Y-%m-%d %H:%M"), region, item, error
+            )
+        )
+
+    def player_list(self, queue_type="RANKED_SOLO_5x5"):
+        self.stats = {region: RegionStats(region) for region in REGIONS}
+
+        def lane(region):
+            try:
+                self.api.top_players(region, queue_type, self.db)
+            except Exception as e:
+                self.failed(region, queue_type, e)
+                return
+            self.stats[region].add()
+
+        self.run_lanes({region: (lane, (region,)) for region in REGIONS})
+
+    def match_list(self, num_matches=990):
+        self.stats = {region: RegionStats(region) for region in REGIONS + MASS_REGIONS}
+        summoners = {region: list() for region in REGIONS}
+        fresh = self.state.fresh_keys()
+        for x in self.db.execute("SELECT * FROM player_table"):
+            request_region = x[11].lower()
+            if request_region in summoners and (request_region, x[1]) not in fresh:
+                summoners[request_region].append(x[1])
+
+        pending = {region: queue.Queue(maxsize=1000) for region in MASS_REGIONS}
+        platforms_left = {region: 0 for region in MASS_REGIONS}
+        for region in REGIONS:
+            platforms_left[self.api.mass_region(region)[0]] += 1
+        remaining_lock = threading.Lock()
+
+        def platform_lane(region):
+            overall_region = self.api.mass_region(region)[0]
+            try:
+                for summoner_name in summoners[region]:
+                    try:
+                        summoner = self.api.summoner_info(summoner_name, region)
+                    except Exception as e:
+                        self.failed(region, summoner_name, e)
+                        continue
+                    if summoner is None:
+                        self.stats[region].add(items=0, errors=1)
+                        continue
+                    self.stats[region].add()
+                    pending[overall_region].put(
+                        (region, summoner_name, summoner.get("puuid"))
+                    )
+            finally:
+                # The mass region lane stops once every platform feeding it is done.
+                with remaining_lock:
+                    platforms_left[overall_region] -= 1
+                    if platforms_left[overall_region] == 0:
+                        pending[overall_region].put(_DONE)
+
+        def mass_region_lane(overall_region):
+            while True:
+                item = pending[overall_region].get()
+                if item is _DONE:
+                    return
+                region, summoner_name, puuid = item
+                try:
+                    match_ids, complete = self.api.match_ids(
+                        puuid,
+                        num_matches,
+                        "ranked",
+                        overall_region,
+                        stop_at=self.state.last_match_id(region, summoner_name),
+                    )
+                    self.api.save_match_ids(summoner_name, match_ids)
+                    # Summoners whose paging failed are retried from the old watermark.
+                    if complete:
+                        self.state.record(
+                            region,
+                            summoner_name,
+                            puuid,
+                            match_ids[0]["match_id"] if match_ids else None,
+                        )
+                except Exception as e:
+                    self.failed(overall_region, summoner_name, e)
+                    continue
+                self.stats[overall_region].add(items=len(match_ids))
+
+        lanes = {region: (platform_lane, (region,)) for region in REGIONS}
+        lanes.update(
+            {region: (mass_region_lane, (region,)) for region in MASS_REGIONS}
+        )
+        self.run_lanes(lanes)
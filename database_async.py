@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+
+import asyncpg
+
+from database_pg import POOL_MAX_SIZE, POOL_MIN_SIZE, STATEMENT_TIMEOUT_MS
+
+# Rows fetched per round trip by the server-side cursors behind the streaming endpoints.
+STREAM_CHUNK_SIZE = int(os.getenv("DB_STREAM_CHUNK_SIZE", "100"))
+# match_detail columns served by the API, timeline first.
+MATCH_DETAIL_COLUMNS = "timeline, match_id"
+
+
+class AsyncDatabase:
+    """
+    asyncio counterpart of database_pg.Database for the API server.
+
+    Wraps one asyncpg pool, opened on startup and closed on shutdown, with
+    the same size limits (DB_POOL_MIN / DB_POOL_MAX), connection settings
+    (DB_* variables or a DSN) and statement_timeout as the psycopg2 pool.
+    Callers waiting for a free connection yield to the event loop instead
+    of blocking it; checkout waits are tracked like ConnectionPool.metrics.
+
+    Usage:
+        adb = AsyncDatabase(os.getenv("DATABASE_URL"))
+        await adb.open()
+        row = await adb.fetchrow("SELECT 1")
+    """
+
+    def __init__(self, dsn=None, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        self.open_lock = asyncio.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def open(self):
+        async with self.open_lock:
+            if self.pool is not None:
+                return
+            self.pool = await asyncpg.create_pool(
+                dsn=self.dsn,
+                host=None if self.dsn else os.environ.get("DB_HOST"),
+                port=None if self.dsn else os.environ.get("DB_PORT"),
+                database=None if self.dsn else os.environ.get("DB_NAME"),
+                user=None if self.dsn else os.environ.get("DB_USER"),
+                password=None if self.dsn else os.environ.get("DB_PASSWORD"),
+                min_size=self.min_size,
+                max_size=self.max_size,
+                server_settings={"statement_timeout": str(STATEMENT_TIMEOUT_MS)},
+            )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def acquire(self):
+        await self.open()
+        start = time.perf_counter()
+        connection = await self.pool.acquire()
+        waited = time.perf_counter() - start
+        self.checkouts += 1
+        self.in_use += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return connection
+
+    async def release(self, connection):
+        self.in_use -= 1
+        await self.pool.release(connection)
+
+    async def fetch(self, query, *args):
+        connection = await self.acquire()
+        try:
+            return await connection.fetch(query, *args)
+        finally:
+            await self.release(connection)
+
+    async def fetchrow(self, query, *args):
+        connection = await self.acquire()
+        try:
+            return await connection.fetchrow(query, *args)
+        finally:
+            await self.release(connection)
+
+    async def fetch_match_detail(self, match_id):
+        """
+        Returns:
+            asyncpg.Record: The MATCH_DETAIL_COLUMNS of `match_id`, timeline
+            still encoded as stored, or None if no timeline is stored for it.
+        """
+        return await self.fetchrow(
+            f"SELECT {MATCH_DETAIL_COLUMNS} FROM match_detail "
+            "WHERE match_id = $1 AND timeline IS NOT NULL",
+            match_id,
+        )
+
+    async def iter_match_details(
+        self, match_ids=None, limit=None, chunk_size=STREAM_CHUNK_SIZE
+    ):
+        """
+        Yields MATCH_DETAIL_COLUMNS rows from a server-side cursor, `chunk_size` rows per round trip.
+
+        Only one chunk is held in memory at a time, however many rows match.
+        The connection stays checked out until the generator is exhausted or
+        closed.
+
+        Args:
+            match_ids (list, optional): Only yield these matches. Defaults to every row.
+            limit (int, optional): Stop after this many rows.
+        """
+        query = (
+            f"SELECT {MATCH_DETAIL_COLUMNS} FROM match_detail WHERE timeline IS NOT NULL"
+        )
+        args = []
+        if match_ids:
+            args.append(list(match_ids))
+            query += " AND match_id = ANY($1::text[])"
+        if limit is not None:
+            args.append(limit)
+            query += " LIMIT ${}".format(len(args))
+        connection = await self.acquire()
+        try:
+            async with connection.transaction():
+                async for record in connection.cursor(
+                    query, *args, prefetch=chunk_size
+                ):
+                    yield record
+        finally:
+            await self.release(connection)
+
+    def pool_metrics(self):
+        return {
+            "max_size": self.max_size,
+            "size": self.pool.get_size() if self.pool is not None else 0,
+            "in_use": self.in_use,
+            "checkouts": self.checkouts,
+            "wait_avg_ms": (self.wait_total / self.checkouts * 1000)
+            if self.checkouts
+            else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+        }
@@ -1,11 +1,628 @@
+import io
+import json
+import multiprocessing
 import os
+import re
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import pandas as pd
+import numpy as np
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from psycopg2.extras import Json, execute_values
 from rich import print
 from sqlalchemy import create_engine
 
+from timeline_frames import build_frames
+from timeline_store import decode_timeline, encode_timeline
+
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX", "10"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "60000"))
+HEALTH_CHECK_INTERVAL = 30
+PREDICTOR_CHUNK_SIZE = int(os.getenv("PREDICTOR_CHUNK_SIZE", "200"))
+PREDICTOR_WORKERS = int(os.getenv("PREDICTOR_WORKERS", str(os.cpu_count() or 1)))
+
+
+PLAYER_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS player_table (
+        summoner_id TEXT PRIMARY KEY,
+        summoner_name TEXT,
+        league_points INTEGER,
+        rank TEXT,
+        wins INTEGER,
+        losses INTEGER,
+        veteran BOOLEAN,
+        inactive BOOLEAN,
+        fresh_blood BOOLEAN,
+        hot_streak BOOLEAN,
+        tier TEXT,
+        request_region TEXT,
+        queue TEXT
+    )
+"""
+
+MATCH_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS match_table (
+        match_id TEXT PRIMARY KEY
+    )
+"""
+
+PERFORMANCE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS performance_table (
+        assists INTEGER,
+        baron_kills INTEGER,
+        bounty_level INTEGER,
+        champ_experience INTEGER,
+        champ_level INTEGER,
+        champion_id INTEGER,
+        champion_name TEXT,
+        champion_transform INTEGER,
+        consumables_purchased INTEGER,
+        damage_dealt_to_buildings INTEGER,
+        damage_dealt_to_objectives INTEGER,
+        damage_dealt_to_turrets INTEGER,
+        damage_self_mitigated INTEGER,
+        deaths INTEGER,
+        detector_wards_placed INTEGER,
+        double_kills INTEGER,
+        dragon_kills INTEGER,
+        first_blood_assist BOOLEAN,
+        first_blood_kill BOOLEAN,
+        first_tower_assist BOOLEAN,
+        first_tower_kill BOOLEAN,
+        game_ended_in_early_surrender BOOLEAN,
+        game_ended_in_surrender BOOLEAN,
+        gold_earned INTEGER,
+        gold_spent INTEGER,
+        individual_position TEXT,
+        inhibitor_kills INTEGER,
+        inhibitor_takedowns INTEGER,
+        inhibitors_lost INTEGER,
+        item_0 INTEGER,
+        item_1 INTEGER,
+        item_2 INTEGER,
+        item_3 INTEGER,
+        item_4 INTEGER,
+        item_5 INTEGER,
+        item_6 INTEGER,
+        items_purchased INTEGER,
+        killing_sprees INTEGER,
+        kills INTEGER,
+        lane TEXT,
+        largest_critical_strike INTEGER,
+        largest_killing_spree INTEGER,
+        largest_multi_kill INTEGER,
+        longest_time_spent_living INTEGER,
+        magic_damage_dealt INTEGER,
+        magic_damage_dealt_to_champions INTEGER,
+        magic_damage_taken INTEGER,
+        neutral_minions_killed INTEGER,
+        nexus_kills INTEGER,
+        nexus_lost INTEGER,
+        nexus_takedowns INTEGER,
+        objectives_stolen INTEGER,
+        objectives_stolen_assists INTEGER,
+        participant_id INTEGER,
+        penta_kills INTEGER,
+        physical_damage_dealt INTEGER,
+        physical_damage_dealt_to_champions INTEGER,
+        physical_damage_taken INTEGER,
+        profile_icon INTEGER,
+        puuid TEXT,
+        quadra_kills INTEGER,
+        riot_id_name TEXT,
+        riot_id_tagline TEXT,
+        role TEXT,
+        sight_wards_bought_in_game INTEGER,
+        spell_1_casts INTEGER,
+        spell_2_casts INTEGER,
+        spell_3_casts INTEGER,
+        spell_4_casts INTEGER,
+        summoner_1_casts INTEGER,
+        summoner_1_id INTEGER,
+        summoner_2_casts INTEGER,
+        summoner_2_id INTEGER,
+        summoner_id TEXT,
+        summoner_level INTEGER,
+        summoner_name TEXT,
+        team_early_surrendered BOOLEAN,
+        team_id INTEGER,
+        team_position TEXT,
+        time_ccing_others INTEGER,
+        time_played INTEGER,
+        total_damage_dealt INTEGER,
+        total_damage_dealt_to_champions INTEGER,
+        total_damage_shielded_on_teammates INTEGER,
+        total_damage_taken INTEGER,
+        total_heal INTEGER,
+        total_heals_on_teammates INTEGER,
+        total_minions_killed INTEGER,
+        total_time_cc_dealt INTEGER,
+        total_time_spent_dead INTEGER,
+        total_units_healed INTEGER,
+        triple_kills INTEGER,
+        true_damage_dealt INTEGER,
+        true_damage_dealt_to_champions INTEGER,
+        true_damage_taken INTEGER,
+        turret_kills INTEGER,
+        turret_takedowns INTEGER,
+        turrets_lost INTEGER,
+        unreal_kills INTEGER,
+        vision_score INTEGER,
+        vision_wards_bought_in_game INTEGER,
+        wards_killed INTEGER,
+        wards_placed INTEGER,
+        win BOOLEAN,
+        match_identifier TEXT,
+        duration NUMERIC,
+        f1 NUMERIC,
+        f2 NUMERIC,
+        f3 NUMERIC,
+        f4 NUMERIC,
+        f5 NUMERIC,
+        calculated_player_performance NUMERIC
+    )
+"""
+
+MATCH_DETAIL_SQL = """
+    CREATE TABLE IF NOT EXISTS match_detail (
+        match_id TEXT PRIMARY KEY,
+        game_duration INTEGER,
+        winning_team INTEGER,
+        participants TEXT,
+        participant_id INTEGER,
+        team_id INTEGER,
+        champion_id INTEGER,
+        champion_name TEXT,
+        champion_transform INTEGER,
+        individual_position TEXT,
+        lane TEXT,
+        role TEXT,
+        kills INTEGER,
+        deaths INTEGER,
+        assists INTEGER,
+        total_damage_dealt INTEGER,
+        total_damage_dealt_to_champions INTEGER,
+        total_damage_taken INTEGER,
+        total_heal INTEGER,
+        total_minions_killed INTEGER,
+        gold_earned INTEGER,
+        gold_spent INTEGER,
+        turret_kills INTEGER,
+        turret_takedowns INTEGER,
+        turrets_lost INTEGER,
+        inhibitor_kills INTEGER,
+        inhibitor_takedowns INTEGER,
+        inhibitors_lost INTEGER,
+        total_time_spent_dead INTEGER,
+        vision_score INTEGER,
+        wards_placed INTEGER,
+        wards_killed INTEGER,
+        first_blood_kill BOOLEAN,
+        first_blood_assist BOOLEAN,
+        first_tower_kill BOOLEAN,
+        first_tower_assist BOOLEAN,
+        win BOOLEAN
+    )
+"""
+
+TOP_PLAYERS_SQL = """
+    CREATE TABLE IF NOT EXISTS top_players (
+        summoner_name TEXT,
+        region TEXT,
+        tier TEXT,
+        division TEXT,
+        league_points INTEGER,
+        wins INTEGER,
+        losses INTEGER,
+        veteran BOOLEAN,
+        inactive BOOLEAN,
+        fresh_blood BOOLEAN,
+        hot_streak BOOLEAN,
+        queue TEXT
+    )
+"""
+
+
+
+def timeline_param(timeline):
+    """
+    Encodes a timeline for the BYTEA match_detail.timeline column.
+    """
+    value = encode_timeline(timeline)
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return psycopg2.Binary(value)
+
+
+def backfill_match_detail(cursor, batch_size=500):
+    """
+    Moves legacy timelines out of match_detail.match_id into the timeline column.
+
+    The old positional INSERT stored each timeline in match_id (as TEXT, or as
+    BYTEA once utils/migrate_timelines.py had compressed it) and never set key.
+    Both now get the timeline's metadata.matchId; a row whose match is already
+    stored under its ID is a duplicate and is dropped.
+
+    Runs on the migration's autocommit connection and commits every
+    `batch_size` rows, so only the rows of the current batch are ever locked
+    and writers keep going. Rows are picked by key IS NULL, so an interrupted
+    backfill resumes where it stopped.
+    """
+    binary = match_id_type(cursor) == "bytea"
+    moved, dropped = 0, 0
+    while True:
+        cursor.execute("BEGIN")
+        cursor.execute(
+            "SELECT ctid, match_id FROM match_detail WHERE key IS NULL "
+            "LIMIT %s FOR UPDATE",
+            (batch_size,),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            cursor.execute("COMMIT")
+            break
+        for ctid, stored in rows:
+            stored = bytes(stored) if binary else stored
+            try:
+                match_id = decode_timeline(stored)["metadata"]["matchId"]
+            except (ValueError, TypeError, KeyError):
+                # Already a plain match ID.
+                plain = stored.decode("utf-8") if binary else stored
+                cursor.execute(
+                    "UPDATE match_detail SET key = %s WHERE ctid = %s", (plain, ctid)
+                )
+                continue
+            new_id = psycopg2.Binary(match_id.encode("utf-8")) if binary else match_id
+            cursor.execute("SELECT 1 FROM match_detail WHERE match_id = %s", (new_id,))
+            if cursor.fetchone():
+                cursor.execute("DELETE FROM match_detail WHERE ctid = %s", (ctid,))
+                dropped += 1
+                continue
+            cursor.execute(
+                "UPDATE match_detail SET match_id = %s, key = %s, timeline = %s "
+                "WHERE ctid = %s",
+                (
+                    new_id,
+                    match_id,
+                    psycopg2.Binary(stored if binary else stored.encode("utf-8")),
+                    ctid,
+                ),
+            )
+            moved += 1
+        cursor.execute("COMMIT")
+    print(
+        "{} [MIGRATE] match_detail: {} timelines moved, {} duplicates dropped".format(
+            time.strftime("%Y-%m-%d %H:%M"), moved, dropped
+        )
+    )
+
+
+def match_id_type(cursor):
+    cursor.execute(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = 'match_detail' AND column_name = 'match_id'"
+    )
+    return cursor.fetchone()[0]
+
+
+def match_id_to_text(cursor):
+    """
+    Converts a BYTEA match_detail.match_id back to TEXT.
+
+    Only databases whose timelines were compressed in place by the old
+    utils/migrate_timelines.py have a BYTEA match_id. Changing the type
+    rewrites match_detail under an ACCESS EXCLUSIVE lock, so readers and
+    writers of the table wait for the whole rewrite: stop the crawlers and
+    the API before migrating such a database. For a TEXT match_id this is a
+    no-op.
+    """
+    if match_id_type(cursor) != "bytea":
+        return
+    print(
+        "{} [MIGRATE] match_detail.match_id is BYTEA: rewriting the table "
+        "to convert it to TEXT".format(time.strftime("%Y-%m-%d %H:%M"))
+    )
+    cursor.execute(
+        "ALTER TABLE match_detail ALTER COLUMN match_id TYPE TEXT "
+        "USING convert_from(match_id, 'UTF8')"
+    )
+
+
+# Schema migrations, applied in order by Database.migrate and recorded in
+# schema_migrations: (version, description, statements, indexes).
+# Statements of one migration run in a single transaction. A statement may
+# also be a callable taking the cursor, for data migrations SQL cannot
+# express: callables run in order once that transaction has committed, on
+# the autocommit connection, and commit their own batches, so a backfill
+# never holds its locks across the whole table. They must be safe to rerun,
+# since a migration is only recorded once everything in it has finished.
+# Indexes, (name, definition) or (name, definition, unique), are then built
+# with CREATE INDEX CONCURRENTLY, so upgrades never block writers.
+MIGRATIONS = [
+    (
+        1,
+        "create base tables",
+        [
+            PLAYER_TABLE_SQL,
+            MATCH_TABLE_SQL,
+            PERFORMANCE_TABLE_SQL,
+            MATCH_DETAIL_SQL,
+            TOP_PLAYERS_SQL,
+        ],
+        [],
+    ),
+    (
+        2,
+        "add work-queue and ladder columns",
+        [
+            "ALTER TABLE match_table ADD COLUMN IF NOT EXISTS processed_1v1 INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE match_table ADD COLUMN IF NOT EXISTS processed_5v5 INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE match_detail ADD COLUMN IF NOT EXISTS key TEXT",
+            "ALTER TABLE match_detail ADD COLUMN IF NOT EXISTS classifier_processed INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE match_detail ADD COLUMN IF NOT EXISTS classifier_processed_liveclient INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE top_players ADD COLUMN IF NOT EXISTS summoner_id TEXT",
+            "ALTER TABLE top_players ADD COLUMN IF NOT EXISTS rank TEXT",
+            "ALTER TABLE top_players ADD COLUMN IF NOT EXISTS request_region TEXT",
+        ],
+        [],
+    ),
+    (
+        3,
+        "index pending work and lookup columns",
+        [],
+        [
+            ("match_table_pending_1v1", "match_table (match_id) WHERE processed_1v1 != 1"),
+            ("match_table_pending_5v5", "match_table (match_id) WHERE processed_5v5 != 1"),
+            (
+                "match_detail_pending_classifier",
+                "match_detail (key) WHERE classifier_processed != 1",
+            ),
+            (
+                "match_detail_pending_liveclient",
+                "match_detail (key) WHERE classifier_processed_liveclient != 1",
+            ),
+            ("performance_table_match_identifier", "performance_table (match_identifier)"),
+            ("top_players_region_tier", "top_players (request_region, tier)"),
+        ],
+    ),
+    (
+        4,
+        "add work-queue leases",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS work_leases (
+                queue TEXT NOT NULL,
+                item TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL,
+                PRIMARY KEY (queue, item)
+            )
+            """,
+        ],
+        [("work_leases_owner", "work_leases (queue, owner)")],
+    ),
+    (
+        5,
+        "store timelines in their own column and backfill key",
+        [
+            "ALTER TABLE match_detail ADD COLUMN IF NOT EXISTS timeline BYTEA",
+            "CREATE TABLE IF NOT EXISTS predictor (frame JSONB)",
+            "CREATE TABLE IF NOT EXISTS predictor_liveclient (frame JSONB)",
+            backfill_match_detail,
+            # Blocks match_detail while it rewrites it; see match_id_to_text.
+            match_id_to_text,
+        ],
+        [],
+    ),
+    (
+        6,
+        "key top_players by summoner_id",
+        [
+            # Every ladder refresh used to append the whole ladder again; keep the last copy.
+            """
+            DELETE FROM top_players a USING top_players b
+            WHERE a.summoner_id = b.summoner_id AND a.ctid < b.ctid
+            """,
+        ],
+        [("top_players_summoner_id", "top_players (summoner_id)", True)],
+    ),
+]
+
+# Lease-based work queues: name -> (table, id column, processed flag).
+WORK_QUEUES = {
+    "match_download_standard": ("match_table", "match_id", "processed_1v1"),
+    "match_download_detail": ("match_table", "match_id", "processed_5v5"),
+}
+LEASE_SECONDS = int(os.getenv("WORK_LEASE_SECONDS", "300"))
+LEASE_BATCH_SIZE = int(os.getenv("WORK_LEASE_BATCH_SIZE", "50"))
+
+# Work-queue queries that must be served by an index: (index, query).
+QUERY_PLAN_CHECKS = [
+    ("match_table_pending_1v1", "SELECT * FROM match_table WHERE processed_1v1 != 1"),
+    ("match_table_pending_5v5", "SELECT * FROM match_table WHERE processed_5v5 != 1"),
+    (
+        "match_detail_pending_classifier",
+        "SELECT * FROM match_detail WHERE classifier_processed != 1",
+    ),
+    (
+        "match_detail_pending_liveclient",
+        "SELECT * FROM match_detail WHERE classifier_processed_liveclient != 1",
+    ),
+    (
+        "performance_table_match_identifier",
+        "SELECT DISTINCT match_identifier FROM performance_table "
+        "WHERE match_identifier = ANY(ARRAY['0'])",
+    ),
+    (
+        "top_players_region_tier",
+        "SELECT * FROM top_players WHERE request_region = 'na1' AND tier = 'CHALLENGER'",
+    ),
+]
+
+# Arbitrary key for the advisory lock held while migrating.
+MIGRATION_LOCK_ID = 7_301_017
+
+
+def connection_params():
+    return dict(
+        host=os.environ.get("DB_HOST"),
+        port=os.environ.get("DB_PORT"),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        options="-c statement_timeout={}".format(STATEMENT_TIMEOUT_MS),
+    )
+
+
+def connect():
+    """
+    Opens a standalone connection with the pool's settings, for worker processes.
+    """
+    return psycopg2.connect(**connection_params())
+
+
+class ConnectionPool:
+    """
+    Process-wide psycopg2 connection pool.
+
+    Borrowers block until a connection is free instead of failing when the
+    pool is exhausted. Connections idle for longer than
+    HEALTH_CHECK_INTERVAL seconds are checked with SELECT 1 before being
+    handed out, and broken ones are replaced. Every connection runs with
+    the configured statement_timeout.
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE):
+        self.pool = psycopg2.pool.ThreadedConnectionPool(
+            min_size, max_size, **connection_params()
+        )
+        self.max_size = max_size
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.last_used = dict()
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.replaced = 0
+
+    def getconn(self):
+        start = time.perf_counter()
+        self.slots.acquire()
+        waited = time.perf_counter() - start
+        try:
+            connection = self.pool.getconn()
+            idle = time.monotonic() - self.last_used.get(id(connection), 0)
+            if connection.closed or (
+                idle > HEALTH_CHECK_INTERVAL and not self.healthy(connection)
+            ):
+                self.pool.putconn(connection, close=True)
+                connection = self.pool.getconn()
+                with self.lock:
+                    self.replaced += 1
+        except Exception:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return connection
+
+    def putconn(self, connection):
+        close = bool(connection.closed)
+        if not close:
+            try:
+                if (
+                    connection.get_transaction_status()
+                    != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                ):
+                    connection.rollback()
+            except psycopg2.Error:
+                close = True
+        self.last_used[id(connection)] = time.monotonic()
+        self.pool.putconn(connection, close=close)
+        with self.lock:
+            self.in_use -= 1
+        self.slots.release()
+
+    def healthy(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "max_size": self.max_size,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "replaced": self.replaced,
+                "wait_avg_ms": (self.wait_total / self.checkouts * 1000)
+                if self.checkouts
+                else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+
+
+class PooledConnection:
+    """
+    A connection borrowed from the ConnectionPool.
+
+    Behaves like a psycopg2 connection, except that close() and leaving a
+    `with` block hand it back to the pool instead of closing it.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._connection = pool.getconn()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._connection.commit()
+            else:
+                self._connection.rollback()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._connection is not None:
+            self._pool.putconn(self._connection)
+            self._connection = None
+
+
+_pool = None
+_pool_pid = None
+_engine = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool, _pool_pid
+    # Connections must not be shared across fork(), so each process builds its own pool.
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool()
+                _pool_pid = os.getpid()
+    return _pool
+
 
 class Database:
 
@@ -19,240 +636,451 @@ class Database:
                 conn.commit()
 
     def execute(self, query, params=None):
+        """
+        Runs one statement on a pooled connection and commits it.
+
+        Returns:
+            list: The rows of the result, fetched before the connection goes
+            back to the pool, or None for statements without a result.
+        """
         with self.get_connection() as connection:
             cursor = connection.cursor()
             cursor.execute(query, params or ())
-            return cursor
+            return cursor.fetchall() if cursor.description is not None else None
 
-    def get_connection(self):
-        return psycopg2.connect(
-            host=os.environ.get("DB_HOST"),
-            port=os.environ.get("DB_PORT"),
-            database=os.environ.get("DB_NAME"),
-            user=os.environ.get("DB_USER"),
-            password=os.environ.get("DB_PASSWORD"),
-        )
+    def bulk_insert(
+        self, table_name, columns, rows, batch_size=5000, conflict_columns=None
+    ):
+        """
+        Inserts rows in bulk, skipping the ones that conflict with existing keys.
 
-    def get_sqlalchemy_engine(self):
-        database_url = (
-            f"postgresql+psycopg2://{os.environ.get('DB_USER')}:"
-            f"{os.environ.get('DB_PASSWORD')}@{os.environ.get('DB_HOST')}:"
-            f"{os.environ.get('DB_PORT')}/{os.environ.get('DB_NAME')}"
-        )
-        engine = create_engine(database_url)
-        return engine
+        Each batch is streamed with COPY ... FROM STDIN into a temporary staging
+        table and merged into `table_name` with INSERT ... ON CONFLICT DO NOTHING,
+        so a batch costs one round trip and one commit instead of one per row.
+        With `conflict_columns`, which must carry a unique index, rows are
+        upserted instead: a row whose key exists updates the other columns.
 
-    def run_init_db(self):
-        conn = self.get_connection()
-        player_table = """
-            CREATE TABLE IF NOT EXISTS player_table (
-                summoner_id TEXT PRIMARY KEY,
-                summoner_name TEXT,
-                league_points INTEGER,
-                rank TEXT,
-                wins INTEGER,
-                losses INTEGER,
-                veteran BOOLEAN,
-                inactive BOOLEAN,
-                fresh_blood BOOLEAN,
-                hot_streak BOOLEAN,
-                tier TEXT,
-                request_region TEXT,
-                queue TEXT
+        Args:
+            table_name (str): The destination table.
+            columns (list): The column names, in the order of the values in each row.
+            rows (iterable): Tuples of values. dicts and lists are stored as JSON.
+            batch_size (int): Rows per COPY / commit.
+            conflict_columns (list, optional): The key to upsert on.
+
+        Returns:
+            int: The number of rows actually inserted (or updated, when upserting).
+        """
+        column_list = ", ".join(columns)
+        staging_table = "staging_{}".format(table_name)
+        inserted, total = 0, 0
+        start = time.perf_counter()
+        connection = self.get_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TEMP TABLE IF NOT EXISTS {staging_table} "
+                    f"(LIKE {table_name} INCLUDING DEFAULTS)"
+                )
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        inserted += self._copy_merge(
+                            cursor, table_name, staging_table, columns, batch,
+                            conflict_columns,
+                        )
+                        total += len(batch)
+                        connection.commit()
+                        batch = []
+                if batch:
+                    inserted += self._copy_merge(
+                        cursor, table_name, staging_table, columns, batch,
+                        conflict_columns,
+                    )
+                    total += len(batch)
+                cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            connection.commit()
+        finally:
+            connection.close()
+
+        elapsed = time.perf_counter() - start
+        print(
+            "{} [BULK] {}: {}/{} rows inserted in {:.2f}s ({:.0f} rows/s)".format(
+                time.strftime("%Y-%m-%d %H:%M"),
+                table_name,
+                inserted,
+                total,
+                elapsed,
+                total / elapsed if elapsed > 0 else 0,
             )
+        )
+        return inserted
+
+    def insert_missing(self, table_name, column_name, values):
+        """
+        Inserts the values that are not yet present in a unique column.
+
+        Only the candidate values travel to the database, so the cost depends
+        on len(values) and not on the size of the table.
+
+        Args:
+            table_name (str): The table to insert into.
+            column_name (str): A column with a unique constraint.
+            values (list): The candidate values.
+
+        Returns:
+            list: The values that were actually inserted.
         """
+        if not values:
+            return []
+        with self.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table_name} ({column_name}) "
+                    f"SELECT unnest(%s::text[]) ON CONFLICT DO NOTHING "
+                    f"RETURNING {column_name}",
+                    (list(values),),
+                )
+                return [row[0] for row in cursor.fetchall()]
 
-        match_table = """
-            CREATE TABLE IF NOT EXISTS match_table (
-                match_id TEXT PRIMARY KEY
+    def iter_column(self, table_name, column_name, where=None, chunk_size=10000):
+        """
+        Streams every value of a column through a server-side cursor.
+
+        Args:
+            where (str, optional): A SQL condition restricting the rows.
+        """
+        query = f"SELECT {column_name} FROM {table_name}"
+        if where:
+            query += f" WHERE {where}"
+        with self.get_connection() as connection:
+            with connection.cursor(name=f"iter_{table_name}_{column_name}") as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(query)
+                for row in cursor:
+                    yield row[0]
+
+    def lease_work(
+        self, queue, owner, batch_size=LEASE_BATCH_SIZE, lease_seconds=LEASE_SECONDS
+    ):
+        """
+        Leases up to `batch_size` pending items of a work queue to `owner`.
+
+        Pending rows are locked with FOR UPDATE SKIP LOCKED, so concurrent
+        workers on any host never wait on or claim each other's rows. An item
+        stays leased until it is completed, released, or its lease expires,
+        after which another worker can claim it.
+
+        Returns:
+            list: The leased item IDs.
+        """
+        table_name, id_column, flag_column = WORK_QUEUES[queue]
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                WITH candidates AS (
+                    SELECT t.{id_column} FROM {table_name} t
+                    WHERE t.{flag_column} != 1
+                    AND NOT EXISTS (
+                        SELECT 1 FROM work_leases l
+                        WHERE l.queue = %(queue)s AND l.item = t.{id_column}
+                        AND l.expires_at > now()
+                    )
+                    LIMIT %(batch_size)s
+                    FOR UPDATE OF t SKIP LOCKED
+                )
+                INSERT INTO work_leases (queue, item, owner, expires_at)
+                SELECT %(queue)s, {id_column}, %(owner)s,
+                    now() + make_interval(secs => %(lease_seconds)s)
+                FROM candidates
+                ON CONFLICT (queue, item) DO UPDATE
+                SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at
+                WHERE work_leases.expires_at <= now()
+                RETURNING item
+                """,
+                {
+                    "queue": queue,
+                    "owner": owner,
+                    "batch_size": batch_size,
+                    "lease_seconds": lease_seconds,
+                },
             )
+            return [row[0] for row in cursor.fetchall()]
+
+    def lease_items(self, queue, owner, items, lease_seconds=LEASE_SECONDS):
         """
+        Leases specific items of a work queue, skipping those another worker holds.
 
-        performance_table = """
-            CREATE TABLE IF NOT EXISTS performance_table (
-                assists INTEGER,
-                baron_kills INTEGER,
-                bounty_level INTEGER,
-                champ_experience INTEGER,
-                champ_level INTEGER,
-                champion_id INTEGER,
-                champion_name TEXT,
-                champion_transform INTEGER,
-                consumables_purchased INTEGER,
-                damage_dealt_to_buildings INTEGER,
-                damage_dealt_to_objectives INTEGER,
-                damage_dealt_to_turrets INTEGER,
-                damage_self_mitigated INTEGER,
-                deaths INTEGER,
-                detector_wards_placed INTEGER,
-                double_kills INTEGER,
-                dragon_kills INTEGER,
-                first_blood_assist BOOLEAN,
-                first_blood_kill BOOLEAN,
-                first_tower_assist BOOLEAN,
-                first_tower_kill BOOLEAN,
-                game_ended_in_early_surrender BOOLEAN,
-                game_ended_in_surrender BOOLEAN,
-                gold_earned INTEGER,
-                gold_spent INTEGER,
-                individual_position TEXT,
-                inhibitor_kills INTEGER,
-                inhibitor_takedowns INTEGER,
-                inhibitors_lost INTEGER,
-                item_0 INTEGER,
-                item_1 INTEGER,
-                item_2 INTEGER,
-                item_3 INTEGER,
-                item_4 INTEGER,
-                item_5 INTEGER,
-                item_6 INTEGER,
-                items_purchased INTEGER,
-                killing_sprees INTEGER,
-                kills INTEGER,
-                lane TEXT,
-                largest_critical_strike INTEGER,
-                largest_killing_spree INTEGER,
-                largest_multi_kill INTEGER,
-                longest_time_spent_living INTEGER,
-                magic_damage_dealt INTEGER,
-                magic_damage_dealt_to_champions INTEGER,
-                magic_damage_taken INTEGER,
-                neutral_minions_killed INTEGER,
-                nexus_kills INTEGER,
-                nexus_lost INTEGER,
-                nexus_takedowns INTEGER,
-                objectives_stolen INTEGER,
-                objectives_stolen_assists INTEGER,
-                participant_id INTEGER,
-                penta_kills INTEGER,
-                physical_damage_dealt INTEGER,
-                physical_damage_dealt_to_champions INTEGER,
-                physical_damage_taken INTEGER,
-                profile_icon INTEGER,
-                puuid TEXT,
-                quadra_kills INTEGER,
-                riot_id_name TEXT,
-                riot_id_tagline TEXT,
-                role TEXT,
-                sight_wards_bought_in_game INTEGER,
-                spell_1_casts INTEGER,
-                spell_2_casts INTEGER,
-                spell_3_casts INTEGER,
-                spell_4_casts INTEGER,
-                summoner_1_casts INTEGER,
-                summoner_1_id INTEGER,
-                summoner_2_casts INTEGER,
-                summoner_2_id INTEGER,
-                summoner_id TEXT,
-                summoner_level INTEGER,
-                summoner_name TEXT,
-                team_early_surrendered BOOLEAN,
-                team_id INTEGER,
-                team_position TEXT,
-                time_ccing_others INTEGER,
-                time_played INTEGER,
-                total_damage_dealt INTEGER,
-                total_damage_dealt_to_champions INTEGER,
-                total_damage_shielded_on_teammates INTEGER,
-                total_damage_taken INTEGER,
-                total_heal INTEGER,
-                total_heals_on_teammates INTEGER,
-                total_minions_killed INTEGER,
-                total_time_cc_dealt INTEGER,
-                total_time_spent_dead INTEGER,
-                total_units_healed INTEGER,
-                triple_kills INTEGER,
-                true_damage_dealt INTEGER,
-                true_damage_dealt_to_champions INTEGER,
-                true_damage_taken INTEGER,
-                turret_kills INTEGER,
-                turret_takedowns INTEGER,
-                turrets_lost INTEGER,
-                unreal_kills INTEGER,
-                vision_score INTEGER,
-                vision_wards_bought_in_game INTEGER,
-                wards_killed INTEGER,
-                wards_placed INTEGER,
-                win BOOLEAN,
-                match_identifier TEXT,
-                duration NUMERIC,
-                f1 NUMERIC,
-                f2 NUMERIC,
-                f3 NUMERIC,
-                f4 NUMERIC,
-                f5 NUMERIC,
-                calculated_player_performance NUMERIC
+        Returns:
+            list: The item IDs leased to `owner`.
+        """
+        if not items:
+            return []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO work_leases (queue, item, owner, expires_at)
+                SELECT %(queue)s, unnest(%(items)s::text[]), %(owner)s,
+                    now() + make_interval(secs => %(lease_seconds)s)
+                ON CONFLICT (queue, item) DO UPDATE
+                SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at
+                WHERE work_leases.expires_at <= now()
+                RETURNING item
+                """,
+                {
+                    "queue": queue,
+                    "owner": owner,
+                    "items": list(items),
+                    "lease_seconds": lease_seconds,
+                },
             )
+            return [row[0] for row in cursor.fetchall()]
+
+    def renew_leases(self, queue, owner, items, lease_seconds=LEASE_SECONDS):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE work_leases SET expires_at = now() + make_interval(secs => %s)
+                WHERE queue = %s AND owner = %s AND item = ANY(%s)
+                """,
+                (lease_seconds, queue, owner, list(items)),
+            )
+            return cursor.rowcount
+
+    def release_leases(self, queue, owner, items):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM work_leases WHERE queue = %s AND owner = %s AND item = ANY(%s)",
+                (queue, owner, list(items)),
+            )
+            return cursor.rowcount
+
+    def complete_work(self, queue, owner, items):
+        """
+        Flags leased items as processed and drops their leases, in one transaction.
         """
+        table_name, id_column, flag_column = WORK_QUEUES[queue]
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"UPDATE {table_name} SET {flag_column} = 1 WHERE {id_column} = ANY(%s)",
+                (list(items),),
+            )
+            cursor.execute(
+                "DELETE FROM work_leases WHERE queue = %s AND owner = %s AND item = ANY(%s)",
+                (queue, owner, list(items)),
+            )
+            return len(items)
+
+    def insert_match_detail(self, timeline):
+        """
+        Stores one timeline in match_detail.
 
-        match_detail = """
-            CREATE TABLE IF NOT EXISTS match_detail (
-                match_id TEXT PRIMARY KEY,
-                game_duration INTEGER,
-                winning_team INTEGER,
-                participants TEXT,
-                participant_id INTEGER,
-                team_id INTEGER,
-                champion_id INTEGER,
-                champion_name TEXT,
-                champion_transform INTEGER,
-                individual_position TEXT,
-                lane TEXT,
-                role TEXT,
-                kills INTEGER,
-                deaths INTEGER,
-                assists INTEGER,
-                total_damage_dealt INTEGER,
-                total_damage_dealt_to_champions INTEGER,
-                total_damage_taken INTEGER,
-                total_heal INTEGER,
-                total_minions_killed INTEGER,
-                gold_earned INTEGER,
-                gold_spent INTEGER,
-                turret_kills INTEGER,
-                turret_takedowns INTEGER,
-                turrets_lost INTEGER,
-                inhibitor_kills INTEGER,
-                inhibitor_takedowns INTEGER,
-                inhibitors_lost INTEGER,
-                total_time_spent_dead INTEGER,
-                vision_score INTEGER,
-                wards_placed INTEGER,
-                wards_killed INTEGER,
-                first_blood_kill BOOLEAN,
-                first_blood_assist BOOLEAN,
-                first_tower_kill BOOLEAN,
-                first_tower_assist BOOLEAN,
-                win BOOLEAN
+        Returns:
+            bool: False if the timeline was already stored.
+        """
+        match_id = decode_timeline(timeline)["metadata"]["matchId"]
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO match_detail (match_id, key, timeline) VALUES (%s, %s, %s)",
+                    (match_id, match_id, timeline_param(timeline)),
+                )
+            return True
+        except psycopg2.IntegrityError:
+            return False
+
+    def _copy_merge(
+        self, cursor, table_name, staging_table, columns, batch, conflict_columns=None
+    ):
+        column_list = ", ".join(columns)
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write("\t".join(copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor.execute(f"TRUNCATE {staging_table}")
+        cursor.copy_expert(
+            f"COPY {staging_table} ({column_list}) FROM STDIN", buffer
+        )
+        if conflict_columns:
+            key_list = ", ".join(conflict_columns)
+            updates = ", ".join(
+                f"{column} = EXCLUDED.{column}"
+                for column in columns
+                if column not in conflict_columns
+            )
+            # A key may only be upserted once per statement.
+            cursor.execute(
+                f"INSERT INTO {table_name} ({column_list}) "
+                f"SELECT DISTINCT ON ({key_list}) {column_list} FROM {staging_table} "
+                f"ON CONFLICT ({key_list}) DO UPDATE SET {updates}"
             )
+        else:
+            cursor.execute(
+                f"INSERT INTO {table_name} ({column_list}) "
+                f"SELECT {column_list} FROM {staging_table} ON CONFLICT DO NOTHING"
+            )
+        return cursor.rowcount
+
+    def get_connection(self):
+        """
+        Borrows a connection from the process-wide pool.
+
+        Calling close() on it, or leaving a `with` block, returns it to the pool.
         """
+        return PooledConnection(get_pool())
 
-        top_players = """
-            CREATE TABLE IF NOT EXISTS top_players (
-                summoner_name TEXT,
-                region TEXT,
-                tier TEXT,
-                division TEXT,
-                league_points INTEGER,
-                wins INTEGER,
-                losses INTEGER,
-                veteran BOOLEAN,
-                inactive BOOLEAN,
-                fresh_blood BOOLEAN,
-                hot_streak BOOLEAN,
-                queue TEXT
+    def pool_metrics(self):
+        return get_pool().metrics()
+
+    def get_sqlalchemy_engine(self):
+        global _engine
+        if _engine is None:
+            database_url = (
+                f"postgresql+psycopg2://{os.environ.get('DB_USER')}:"
+                f"{os.environ.get('DB_PASSWORD')}@{os.environ.get('DB_HOST')}:"
+                f"{os.environ.get('DB_PORT')}/{os.environ.get('DB_NAME')}"
             )
+            _engine = create_engine(
+                database_url,
+                pool_size=POOL_MAX_SIZE,
+                pool_pre_ping=True,
+                connect_args={
+                    "options": "-c statement_timeout={}".format(STATEMENT_TIMEOUT_MS)
+                },
+            )
+        return _engine
+
+    def run_init_db(self):
+        """
+        Creates the tables and brings the schema up to the latest migration.
+        """
+        return self.migrate()
+
+    def migrate(self, migrations=MIGRATIONS):
+        """
+        Applies every migration newer than the recorded schema version.
+
+        Runs under an advisory lock, so concurrent workers starting up do not
+        race each other. Indexes are built with CREATE INDEX CONCURRENTLY
+        outside a transaction; a concurrent build that failed leaves an
+        invalid index behind, which is dropped and rebuilt on the next run.
+        A migration is recorded only once its indexes are built.
+
+        Returns:
+            list: The versions applied by this call.
+        """
+        applied = []
+        with self.get_connection() as conn:
+            conn.set_session(autocommit=True)
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SET statement_timeout = 0")
+                cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT,
+                        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+                cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+                current = cursor.fetchone()[0]
+                for version, description, statements, indexes in migrations:
+                    if version <= current:
+                        continue
+                    start = time.perf_counter()
+                    cursor.execute("BEGIN")
+                    for statement in statements:
+                        if not callable(statement):
+                            cursor.execute(statement)
+                    cursor.execute("COMMIT")
+                    for statement in statements:
+                        if callable(statement):
+                            statement(cursor)
+                    for name, definition, *unique in indexes:
+                        self.create_index_concurrently(cursor, name, definition, *unique)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                        (version, description),
+                    )
+                    applied.append(version)
+                    print(
+                        "{} [MIGRATE] {} {} ({:.1f}s)".format(
+                            time.strftime("%Y-%m-%d %H:%M"),
+                            version,
+                            description,
+                            time.perf_counter() - start,
+                        )
+                    )
+            finally:
+                if (
+                    conn.get_transaction_status()
+                    != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                ):
+                    cursor.execute("ROLLBACK")
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+                cursor.execute("RESET statement_timeout")
+                conn.set_session(autocommit=False)
+        return applied
+
+    def create_index_concurrently(self, cursor, name, definition, unique=False):
+        cursor.execute(
+            """
+            SELECT NOT i.indisvalid
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s
+            """,
+            (name,),
+        )
+        row = cursor.fetchone()
+        if row and row[0]:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        cursor.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS "
+            f"{name} ON {definition}"
+        )
+
+    def schema_version(self):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+            return cursor.fetchone()[0]
+
+    def check_query_plans(self, checks=QUERY_PLAN_CHECKS):
         """
+        Checks that each work-queue query can be served by its index.
 
-        # Execute table creation queries
-        self.execute(player_table)
-        self.execute(match_table)
-        self.execute(performance_table)
-        self.execute(match_detail)
-        self.execute(top_players)
+        Sequential scans are disabled for the check, so on a small or empty
+        table the planner still shows whether the index is usable at all.
 
-        conn.commit()
-        conn.close()
+        Returns:
+            list: (index, query, passed, plan nodes) for every check.
+        """
+        results = []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            for index_name, query in checks:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                nodes = list(plan_nodes(plan[0]["Plan"]))
+                passed = any(node.get("Index Name") == index_name for node in nodes)
+                results.append(
+                    (index_name, query, passed, [node["Node Type"] for node in nodes])
+                )
+            conn.rollback()
+        return results
 
     def change_column_value_by_key(self, table_name, column_name, column_value, key):
         """
@@ -283,192 +1111,491 @@ class Database:
         )
         connection.close()
 
-    def process_predictor(self):
-        connection = self.get_connection()
-        cursor = connection.cursor()
-        query = "SELECT * FROM match_detail WHERE classifier_processed != 1"
-        cursor.execute(query)
-        matches = cursor.fetchall()
-        print(
-            "{} Total match_detail documents (to process): {}".format(
-                time.strftime("%Y-%m-%d %H:%M"),
-                len(matches),
-            )
+    def process_predictor(self, chunk_size=PREDICTOR_CHUNK_SIZE):
+        return self.stream_predictor(
+            "predictor", "classifier_processed", build_frames, chunk_size
         )
 
-        for doc in matches:
-            content = doc[0]
-            built_object = build_final_object(content)
-            if built_object:
-                for x in built_object:
-                    try:
-                        insert_query = "INSERT INTO predictor VALUES (%s)"
-                        cursor.execute(insert_query, (x,))
-                        print(
-                            "{} {}".format(
-                                time.strftime("%Y-%m-%d %H:%M"),
-                                doc[0].get("metadata").get("matchId"),
-                            )
-                        )
-                        update_query = "UPDATE match_detail SET classifier_processed = 1 WHERE key = %s"
-                        cursor.execute(update_query, (doc[0],))
-                    except psycopg2.IntegrityError as e:
-                        print(
-                            "[{}][DUP]: {} {}".format(
-                                time.strftime("%Y-%m-%d %H:%M"), doc[0], e
-                            )
+    def process_predictor_liveclient(self, chunk_size=PREDICTOR_CHUNK_SIZE):
+        return self.stream_predictor(
+            "predictor_liveclient",
+            "classifier_processed_liveclient",
+            build_final_object_liveclient,
+            chunk_size,
+        )
+
+    def stream_predictor(self, table_name, flag_column, builder, chunk_size):
+        """
+        Builds predictor frames for every unprocessed match_detail row, one chunk at a time.
+
+        Rows are read through a named server-side cursor, so only `chunk_size`
+        timelines are held in memory. For each chunk the frames are inserted in
+        bulk and the processed flags are set in the same transaction, which is
+        committed before the next chunk is read. An interrupted run resumes
+        from the first chunk that was not committed.
+
+        Args:
+            table_name (str): The table the frames are inserted into.
+            flag_column (str): The match_detail column marking processed rows.
+            builder (callable): Turns one timeline into a list of frame dicts.
+            chunk_size (int): The number of match_detail rows per chunk.
+
+        Returns:
+            int: The number of match_detail rows processed.
+        """
+        processed = 0
+        with self.get_connection() as reader, self.get_connection() as writer:
+            with reader.cursor(name=f"stream_{table_name}") as source:
+                source.itersize = chunk_size
+                source.execute(
+                    f"SELECT match_id, timeline FROM match_detail "
+                    f"WHERE {flag_column} != 1 AND timeline IS NOT NULL"
+                )
+                while True:
+                    rows = source.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    processed += self.write_predictor_chunk(
+                        writer, table_name, flag_column, builder, rows
+                    )
+                    print(
+                        "{} [{}] {} match_detail documents processed".format(
+                            time.strftime("%Y-%m-%d %H:%M"), table_name, processed
                         )
-                        continue
-        connection.commit()
-        connection.close()
+                    )
+        return processed
+
+    def write_predictor_chunk(self, connection, table_name, flag_column, builder, rows):
+        """
+        Inserts the frames of (match_id, timeline) rows and flags the matches, in one transaction.
+
+        The flags are set first, and only matches that were not flagged yet get
+        frames, so a timeline handed in twice (or built concurrently by another
+        writer) never inserts its frames twice. Timelines the builder cannot
+        build are flagged as well, so they are not read again on every run.
+
+        Returns:
+            int: The number of matches flagged.
+        """
+        frames = dict()
+        for match_id, timeline in rows:
+            frames[match_id] = builder(decode_timeline(timeline)) or []
+            if not frames[match_id]:
+                print(
+                    "[{}][SKIP]: {} has no predictor frames".format(
+                        time.strftime("%Y-%m-%d %H:%M"), match_id
+                    )
+                )
 
-    def process_predictor_liveclient(self):
-        connection = self.get_connection()
         cursor = connection.cursor()
-        query = "SELECT * FROM match_detail WHERE classifier_processed_liveclient != 1"
-        cursor.execute(query)
-        matches = cursor.fetchall()
+        insert_query = f"INSERT INTO {table_name} VALUES %s"
+        claim_query = (
+            f"UPDATE match_detail SET {flag_column} = 1 "
+            f"WHERE match_id = ANY(%s) AND {flag_column} != 1 RETURNING match_id"
+        )
+        cursor.execute(claim_query, (list(frames),))
+        claimed = [row[0] for row in cursor.fetchall()]
+        try:
+            execute_values(
+                cursor,
+                insert_query,
+                [(Json(x),) for match_id in claimed for x in frames[match_id]],
+                template="(%s)",
+                page_size=1000,
+            )
+            connection.commit()
+            return len(claimed)
+        except psycopg2.IntegrityError:
+            connection.rollback()
+
+        # A duplicate somewhere in the chunk: fall back to one savepoint per match.
+        cursor.execute(claim_query, (list(frames),))
+        claimed = [row[0] for row in cursor.fetchall()]
+        for match_id in claimed:
+            cursor.execute("SAVEPOINT predictor_match")
+            try:
+                execute_values(
+                    cursor,
+                    insert_query,
+                    [(Json(x),) for x in frames[match_id]],
+                    template="(%s)",
+                    page_size=1000,
+                )
+            except psycopg2.IntegrityError as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT predictor_match")
+                print(
+                    "[{}][DUP]: {} {}".format(
+                        time.strftime("%Y-%m-%d %H:%M"), match_id, e
+                    )
+                )
+        connection.commit()
+        return len(claimed)
+
+
+    def process_predictor_parallel(
+        self, liveclient=False, workers=PREDICTOR_WORKERS, chunk_size=PREDICTOR_CHUNK_SIZE
+    ):
+        """
+        Builds predictor frames across a pool of worker processes.
+
+        The coordinator streams the IDs of unprocessed match_detail rows and
+        shards them into chunks of `chunk_size`. Each worker opens its own
+        connection, loads its shard, and writes it with write_predictor_chunk
+        in one transaction, so a shard is either fully done or left for the
+        next run, and a match claimed by another writer is not built twice. Workers are spawned rather than forked, so no pooled
+        connection of the coordinator is shared with them. Throughput is
+        reported per worker.
+
+        Args:
+            liveclient (bool): Build predictor_liveclient instead of predictor.
+            workers (int): Number of worker processes.
+            chunk_size (int): Number of match_detail rows per shard.
+
+        Returns:
+            int: The number of match_detail rows processed.
+        """
+        if liveclient:
+            table_name, flag_column = "predictor_liveclient", "classifier_processed_liveclient"
+            builder = build_final_object_liveclient
+        else:
+            table_name, flag_column = "predictor", "classifier_processed"
+            builder = build_frames
+
+        def shards():
+            shard = []
+            for match_id in self.iter_column(
+                "match_detail",
+                "match_id",
+                where=f"{flag_column} != 1 AND timeline IS NOT NULL",
+            ):
+                shard.append(match_id)
+                if len(shard) >= chunk_size:
+                    yield shard
+                    shard = []
+            if shard:
+                yield shard
+
+        processed = 0
+        per_worker = dict()
+        start = time.perf_counter()
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    predictor_worker, table_name, flag_column, builder, shard
+                )
+                for shard in shards()
+            ]
+            for future in as_completed(futures):
+                pid, matches, elapsed = future.result()
+                processed += matches
+                stats = per_worker.setdefault(pid, [0, 0.0])
+                stats[0] += matches
+                stats[1] += elapsed
+                print(
+                    "{} [{}] {}/{} shards | {} match_detail documents processed".format(
+                        time.strftime("%Y-%m-%d %H:%M"),
+                        table_name,
+                        sum(f.done() for f in futures),
+                        len(futures),
+                        processed,
+                    )
+                )
+
+        for pid, (matches, elapsed) in sorted(per_worker.items()):
+            print(
+                "{} [WORKER {}] {} matches | {:.1f} matches/s".format(
+                    time.strftime("%Y-%m-%d %H:%M"),
+                    pid,
+                    matches,
+                    matches / elapsed if elapsed > 0 else 0,
+                )
+            )
         print(
-            "{} Total match_detail documents (to process): {}".format(
+            "{} [{}] {} matches in {:.1f}s".format(
                 time.strftime("%Y-%m-%d %H:%M"),
-                len(matches),
+                table_name,
+                processed,
+                time.perf_counter() - start,
             )
         )
+        return processed
 
-        for doc in matches:
-            content = doc[0]
-            built_object = build_final_object_liveclient(content)
-            if built_object:
-                for x in built_object:
-                    try:
-                        insert_query = "INSERT INTO predictor_liveclient VALUES (%s)"
-                        cursor.execute(insert_query, (x,))
-                        print(doc[0].get("metadata").get("matchId"))
-                        update_query = "UPDATE match_detail SET classifier_processed_liveclient = 1 WHERE key = %s"
-                        cursor.execute(update_query, (doc[0],))
-                    except psycopg2.IntegrityError as e:
-                        print(
-                            "[{}][DUP]: {} {}".format(
-                                time.strftime("%Y-%m-%d %H:%M"), doc[0], e
-                            )
-                        )
-                        continue
-        connection.commit()
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def predictor_worker(table_name, flag_column, builder, match_ids):
+    """
+    Worker process body for Database.process_predictor_parallel.
+
+    Returns:
+        tuple: (pid, matches flagged, seconds spent).
+    """
+    start = time.perf_counter()
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT match_id, timeline FROM match_detail "
+                f"WHERE match_id = ANY(%s) AND {flag_column} != 1",
+                (match_ids,),
+            )
+            rows = cursor.fetchall()
+        matches = Database(None).write_predictor_chunk(
+            connection, table_name, flag_column, builder, rows
+        )
+    finally:
         connection.close()
+    return os.getpid(), matches, time.perf_counter() - start
+
+
+def copy_value(value):
+    """
+    Formats a Python value for COPY's text format.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+DROPPED_PARTICIPANT_KEYS = {
+    "allInPings",
+    "challenges",
+    "eligibleForProgression",
+    "totalAllyJungleMinionsKilled",
+    "totalEnemyJungleMinionsKilled",
+    "basicPings",
+    "assistMePings",
+    "baitPings",
+    "commandPings",
+    "dangerPings",
+    "enemyMissingPings",
+    "enemyVisionPings",
+    "getBackPings",
+    "holdPings",
+    "needVisionPings",
+    "onMyWayPings",
+    "pushPings",
+    "visionClearedPings",
+    "perks",
+}
+
+# match-v5 participant keys whose performance_table column is not their
+# mechanical snake_case form.
+PARTICIPANT_COLUMN_OVERRIDES = {
+    "riotIdGameName": "riot_id_name",
+    "timeCCingOthers": "time_ccing_others",
+    "totalTimeCCDealt": "total_time_cc_dealt",
+}
+PERFORMANCE_COLUMNS = set(re.findall(r"^\s+(\w+) [A-Z]+,?$", PERFORMANCE_TABLE_SQL, re.M))
+
+
+def performance_column(key):
+    """
+    Maps a participant key to its performance_table column, e.g.
+    "summoner1Casts" to "summoner_1_casts".
+    """
+    if key in PARTICIPANT_COLUMN_OVERRIDES:
+        return PARTICIPANT_COLUMN_OVERRIDES[key]
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[a-z])(?=[0-9])", "_", key).lower()
 
 
 class ProcessPerformance:
     def __init__(self, db):
         self.db = db
 
-    def calculate_player_performance(self, participant_data, duration_m):
-        deaths_per_min = participant_data["deaths"] / duration_m
-        k_a_per_min = (
-            participant_data["kills"] + participant_data["assists"]
-        ) / duration_m
-        level_per_min = participant_data["champLevel"] / duration_m
-        total_damage_per_min = participant_data["totalDamageDealt"] / duration_m
-        gold_per_min = participant_data["goldEarned"] / duration_m
-
-        calculated_player_performance = (
-            0.336
-            - (1.437 * deaths_per_min)
-            + (0.000117 * gold_per_min)
-            + (0.443 * k_a_per_min)
-            + (0.264 * level_per_min)
-            + (0.000013 * total_damage_per_min)
-        )
-        return round((calculated_player_performance * 100), 2)
+    def insert_performance_data(self, final_objects):
+        """
+        Inserts one or more performance rows into performance_table with a single bulk write.
 
-    def insert_performance_data(self, final_object):
-        df = pd.DataFrame(final_object, index=[0])
-        try:
-            df.to_sql(
-                "performance_table",
-                self.db.get_sqlalchemy_engine(),
-                if_exists="append",
-                index=False,
-            )
+        Args:
+            final_objects (dict or list): A performance row, or a list of them. Keys
+                missing from some rows are inserted as NULL.
+
+        Returns:
+            int: The number of rows inserted.
+        """
+        if isinstance(final_objects, dict):
+            final_objects = [final_objects]
+        if not final_objects:
+            return 0
+        columns = list(dict.fromkeys(key for row in final_objects for key in row))
+        inserted = self.db.bulk_insert(
+            "performance_table",
+            columns,
+            (tuple(row.get(column) for column in columns) for row in final_objects),
+        )
+        for final_object in final_objects:
             print(
                 "[{}] PERF {}%".format(
-                    final_object["championName"],
-                    final_object["calculated_player_performance"],
+                    final_object.get("champion_name"),
+                    final_object.get("calculated_player_performance"),
                 )
             )
-        except ValueError:
-            print("[DUPLICATE FOUND] {}".format(final_object["match_identifier"]))
+        if inserted < len(final_objects):
+            print(
+                "[DUPLICATE FOUND] {}".format(final_objects[0].get("match_identifier"))
+            )
+        return inserted
 
-    def process_player_performance(self, obj, conn):
-        match_identifier = str()
-        try:
-            match_identifier = obj["info"]["gameId"]
-        except KeyError:
-            return
+    def process_match_details(self, match_ids, chunk_size=PREDICTOR_CHUNK_SIZE):
+        """
+        Scores the stored timelines of `match_ids`, `chunk_size` matches per batch.
+
+        Timelines are read through a named server-side cursor and each chunk is
+        handed to process_player_performance_batch as a whole, so the duplicate
+        check and the insert run once per chunk rather than once per match.
+
+        Returns:
+            int: The number of new matches inserted.
+        """
+        inserted = 0
+        with self.db.get_connection() as reader, self.db.get_connection() as conn:
+            with reader.cursor(name="stream_performance") as source:
+                source.itersize = chunk_size
+                source.execute(
+                    "SELECT timeline FROM match_detail "
+                    "WHERE match_id = ANY(%s) AND timeline IS NOT NULL",
+                    (list(match_ids),),
+                )
+                while True:
+                    rows = source.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    inserted += self.process_player_performance_batch(
+                        [decode_timeline(timeline) for (timeline,) in rows], conn
+                    )
+        return inserted
+
+    def process_player_performance_batch(self, objs, conn):
+        """
+        Scores every participant of many matches at once and inserts them in one bulk write.
+
+        Matches already present in performance_table are found with a single
+        query, the performance score and f1-f5 are computed with NumPy over all
+        participants, and rows with f3 > 50 are dropped with a mask.
+
+        Args:
+            objs (list): match-v5 match payloads.
+            conn: A database connection used for the duplicate check.
+
+        Returns:
+            int: The number of new matches inserted.
+        """
+        matches = dict()
+        for obj in objs:
+            try:
+                matches.setdefault(str(obj["info"]["gameId"]), obj)
+            except KeyError:
+                continue
+        if not matches:
+            return 0
 
         c = conn.cursor()
         c.execute(
-            "SELECT EXISTS(SELECT 1 FROM performance_table WHERE match_identifier = %s)",
-            (match_identifier,),
+            "SELECT DISTINCT match_identifier FROM performance_table WHERE match_identifier = ANY(%s)",
+            (list(matches),),
         )
-        result = c.fetchone()[0]
-        if result:
+        for (match_identifier,) in c.fetchall():
             print("[DUPLICATE FOUND] {}".format(match_identifier))
+            matches.pop(str(match_identifier), None)
+        if not matches:
             return 0
 
-        duration_m = obj["info"]["gameDuration"] / 60
+        participants, identifiers, durations = [], [], []
+        for match_identifier, obj in matches.items():
+            duration_m = obj["info"]["gameDuration"] / 60
+            for participant in obj["info"]["participants"]:
+                participants.append(participant)
+                identifiers.append(match_identifier)
+                durations.append(duration_m)
 
-        for participant in obj["info"]["participants"]:
-            calculated_performance = self.calculate_player_performance(
-                participant, duration_m
+        columns = {
+            key: np.array([p[key] for p in participants], dtype=np.float64)
+            for key in (
+                "deaths",
+                "kills",
+                "assists",
+                "champLevel",
+                "totalDamageDealt",
+                "goldEarned",
             )
+        }
+        features = performance_features(columns, np.array(durations))
+        keep = features["f3"] <= 50
 
+        final_objects = list()
+        for index in np.flatnonzero(keep):
+            # Keys without a performance_table column (new API fields) are dropped.
+            second_obj = dict()
+            for key, value in participants[index].items():
+                if key in DROPPED_PARTICIPANT_KEYS:
+                    continue
+                column = performance_column(key)
+                if column in PERFORMANCE_COLUMNS:
+                    second_obj[column] = value
             new_object = {
-                "match_identifier": match_identifier,
-                "duration": duration_m,
-                "f1": participant["deaths"] / duration_m,
-                "f2": (participant["kills"] + participant["assists"]) / duration_m,
-                "f3": participant["champLevel"] / duration_m,
-                "f4": participant["totalDamageDealt"] / duration_m,
-                "f5": participant["goldEarned"] / duration_m,
-                "calculated_player_performance": calculated_performance,
+                "match_identifier": identifiers[index],
+                "duration": durations[index],
             }
+            for key, values in features.items():
+                new_object[key] = values[index].item()
+            final_objects.append(second_obj | new_object)
 
-            if new_object["f3"] > 50:
-                continue
+        self.insert_performance_data(final_objects)
+        return len(matches)
 
-            second_obj = participant.copy()
-
-            for key in [
-                "allInPings",
-                "challenges",
-                "eligibleForProgression",
-                "totalAllyJungleMinionsKilled",
-                "totalEnemyJungleMinionsKilled",
-                "basicPings",
-                "assistMePings",
-                "baitPings",
-                "commandPings",
-                "dangerPings",
-                "enemyMissingPings",
-                "enemyVisionPings",
-                "getBackPings",
-                "holdPings",
-                "needVisionPings",
-                "onMyWayPings",
-                "pushPings",
-                "visionClearedPings",
-                "perks",
-            ]:
-                try:
-                    del second_obj[key]
-                except KeyError:
-                    pass
-
-            final_object = second_obj | new_object
-
-            self.insert_performance_data(final_object)
-
-        return 1
+
+def performance_features(columns, duration_m):
+    """
+    Vectorized f1-f5 and calculated_player_performance over many participants.
+
+    Args:
+        columns (dict): NumPy arrays for deaths, kills, assists, champLevel,
+            totalDamageDealt and goldEarned, one value per participant.
+        duration_m (numpy.ndarray): Each participant's game duration in minutes.
+
+    Returns:
+        dict: f1-f5 and calculated_player_performance arrays.
+    """
+    f1 = columns["deaths"] / duration_m
+    f2 = (columns["kills"] + columns["assists"]) / duration_m
+    f3 = columns["champLevel"] / duration_m
+    f4 = columns["totalDamageDealt"] / duration_m
+    f5 = columns["goldEarned"] / duration_m
+    calculated_player_performance = (
+        0.336
+        - (1.437 * f1)
+        + (0.000117 * f5)
+        + (0.443 * f2)
+        + (0.264 * f3)
+        + (0.000013 * f4)
+    )
+    return {
+        "f1": f1,
+        "f2": f2,
+        "f3": f3,
+        "f4": f4,
+        "f5": f5,
+        "calculated_player_performance": np.round(
+            calculated_player_performance * 100, 2
+        ),
+    }
 
 
 def extract_frame_data(frame, participant_id):
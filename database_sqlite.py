@@ -1,9 +1,23 @@
+import json
 import sqlite3
 import time
 
 import pandas as pd
 from rich import print
 
+from timeline_store import decode_timeline, encode_timeline
+
+PREDICTOR_CHUNK_SIZE = 200
+
+# Lease-based work queues: name -> (table, id column, processed flag).
+WORK_QUEUES = {
+    "match_download_standard": ("match_table", "match_id", "processed_1v1"),
+    "match_download_detail": ("match_table", "match_id", "processed_5v5"),
+}
+LEASE_SECONDS = 300
+LEASE_BATCH_SIZE = 50
+WORK_LEASES_DEFINITION = "queue TEXT NOT NULL, item TEXT NOT NULL, owner TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (queue, item)"
+
 
 class Database:
 
@@ -12,10 +26,13 @@ class Database:
 
 
     def execute(self, query, params=None):
-        with self.get_connection() as connection:
-            cursor = connection.cursor()
-            cursor.execute(query, params or ())
-            return cursor
+        connection = self.get_connection()
+        try:
+            with connection:
+                cursor = connection.execute(query, params or ())
+                return cursor.fetchall() if cursor.description is not None else None
+        finally:
+            connection.close()
 
 
     def get_connection(self):
@@ -30,17 +47,148 @@ class Database:
 
         definition = "match_id REAL PRIMARY KEY"
         conn.execute(f"CREATE TABLE IF NOT EXISTS match_table ({definition})")
+        self.add_columns(
+            conn,
+            "match_table",
+            [
+                ("processed_1v1", "INTEGER NOT NULL DEFAULT 0"),
+                ("processed_5v5", "INTEGER NOT NULL DEFAULT 0"),
+            ],
+        )
 
         definition = "assists REAL, baronKills REAL, bountyLevel REAL, champExperience REAL, champLevel REAL, championId REAL, championName TEXT, championTransform REAL, consumablesPurchased REAL, damageDealtToBuildings REAL, damageDealtToObjectives REAL, damageDealtToTurrets REAL, damageSelfMitigated REAL, deaths REAL, detectorWardsPlaced REAL, doubleKills REAL, dragonKills REAL, firstBloodAssist REAL, firstBloodKill REAL, firstTowerAssist REAL, firstTowerKill REAL, gameEndedInEarlySurrender REAL, gameEndedInSurrender REAL, goldEarned REAL, goldSpent REAL, individualPosition TEXT, inhibitorKills REAL, inhibitorTakedowns REAL, inhibitorsLost REAL, item0 REAL, item1 REAL, item2 REAL, item3 REAL, item4 REAL, item5 REAL, item6 REAL, itemsPurchased REAL, killingSprees REAL, kills REAL, lane TEXT, largestCriticalStrike REAL, largestKillingSpree REAL, largestMultiKill REAL, longestTimeSpentLiving REAL, magicDamageDealt REAL, magicDamageDealtToChampions REAL, magicDamageTaken REAL, neutralMinionsKilled REAL, nexusKills REAL, nexusLost REAL, nexusTakedowns REAL, objectivesStolen REAL, objectivesStolenAssists REAL, participantId REAL, pentaKills REAL, physicalDamageDealt REAL, physicalDamageDealtToChampions REAL, physicalDamageTaken REAL, profileIcon REAL, puuid TEXT, quadraKills REAL, riotIdName TEXT, riotIdTagline TEXT, role TEXT, sightWardsBoughtInGame REAL, spell1Casts REAL, spell2Casts REAL, spell3Casts REAL, spell4Casts REAL, summoner1Casts REAL, summoner1Id REAL, summoner2Casts REAL, summoner2Id REAL, summonerId TEXT, summonerLevel REAL, summonerName TEXT, teamEarlySurrendered REAL, teamId REAL, teamPosition TEXT, timeCCingOthers REAL, timePlayed REAL, totalDamageDealt REAL, totalDamageDealtToChampions REAL, totalDamageShieldedOnTeammates REAL, totalDamageTaken REAL, totalHeal REAL, totalHealsOnTeammates REAL, totalMinionsKilled REAL, totalTimeCCDealt REAL, totalTimeSpentDead REAL, totalUnitsHealed REAL, tripleKills REAL, trueDamageDealt REAL, trueDamageDealtToChampions REAL, trueDamageTaken REAL, turretKills REAL, turretTakedowns REAL, turretsLost REAL, unrealKills REAL, visionScore REAL, visionWardsBoughtInGame REAL, wardsKilled REAL, wardsPlaced REAL, win REAL, match_identifier REAL, duration REAL, f1 REAL, f2 REAL, f3 REAL, f4 REAL, f5 REAL, calculated_player_performance REAL"
         conn.execute(f"CREATE TABLE IF NOT EXISTS performance_table ({definition})")
 
         definition = "match_id TEXT PRIMARY KEY, game_duration INTEGER, winning_team INTEGER, participants TEXT"
         conn.execute(f"CREATE TABLE IF NOT EXISTS match_detail ({definition})")
+        self.add_columns(
+            conn,
+            "match_detail",
+            [
+                ("key", "TEXT"),
+                ("timeline", "BLOB"),
+                ("classifier_processed", "INTEGER NOT NULL DEFAULT 0"),
+                ("classifier_processed_liveclient", "INTEGER NOT NULL DEFAULT 0"),
+            ],
+        )
+
+        conn.execute(f"CREATE TABLE IF NOT EXISTS work_leases ({WORK_LEASES_DEFINITION})")
 
         conn.commit()
         conn.close()
 
 
+    def add_columns(self, conn, table_name, columns):
+        """
+        Adds the (name, definition) columns a table created by an older version lacks.
+        """
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+        for name, definition in columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {name} {definition}")
+
+
+    def lease_work(self, queue, owner, batch_size=LEASE_BATCH_SIZE, lease_seconds=LEASE_SECONDS):
+        """
+        SQLite twin of database_pg.Database.lease_work.
+
+        SQLite has no row locks, so the lease table is the lock: BEGIN IMMEDIATE
+        takes the database write lock, and workers claim one after another.
+        """
+        table_name, id_column, flag_column = WORK_QUEUES[queue]
+        connection = self.get_connection()
+        try:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS work_leases ({WORK_LEASES_DEFINITION})")
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            items = [
+                row[0]
+                for row in connection.execute(
+                    f"SELECT t.{id_column} FROM {table_name} t WHERE t.{flag_column} != 1 "
+                    "AND NOT EXISTS (SELECT 1 FROM work_leases l WHERE l.queue = ? "
+                    f"AND l.item = t.{id_column} AND l.expires_at > ?) LIMIT ?",
+                    (queue, now, batch_size),
+                )
+            ]
+            connection.executemany(
+                "INSERT OR REPLACE INTO work_leases VALUES (?, ?, ?, ?)",
+                [(queue, item, owner, now + lease_seconds) for item in items],
+            )
+            connection.commit()
+            return items
+        finally:
+            connection.close()
+
+
+    def lease_items(self, queue, owner, items, lease_seconds=LEASE_SECONDS):
+        connection = self.get_connection()
+        try:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS work_leases ({WORK_LEASES_DEFINITION})")
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            held = {
+                row[0]
+                for row in connection.execute(
+                    "SELECT item FROM work_leases WHERE queue = ? AND expires_at > ?",
+                    (queue, now),
+                )
+            }
+            items = [item for item in items if item not in held]
+            connection.executemany(
+                "INSERT OR REPLACE INTO work_leases VALUES (?, ?, ?, ?)",
+                [(queue, item, owner, now + lease_seconds) for item in items],
+            )
+            connection.commit()
+            return items
+        finally:
+            connection.close()
+
+
+    def renew_leases(self, queue, owner, items, lease_seconds=LEASE_SECONDS):
+        with self.get_connection() as connection:
+            cursor = connection.executemany(
+                "UPDATE work_leases SET expires_at = ? WHERE queue = ? AND owner = ? AND item = ?",
+                [(time.time() + lease_seconds, queue, owner, item) for item in items],
+            )
+            return cursor.rowcount
+
+
+    def release_leases(self, queue, owner, items):
+        with self.get_connection() as connection:
+            cursor = connection.executemany(
+                "DELETE FROM work_leases WHERE queue = ? AND owner = ? AND item = ?",
+                [(queue, owner, item) for item in items],
+            )
+            return cursor.rowcount
+
+
+    def complete_work(self, queue, owner, items):
+        table_name, id_column, flag_column = WORK_QUEUES[queue]
+        with self.get_connection() as connection:
+            connection.executemany(
+                f"UPDATE {table_name} SET {flag_column} = 1 WHERE {id_column} = ?",
+                [(item,) for item in items],
+            )
+            connection.executemany(
+                "DELETE FROM work_leases WHERE queue = ? AND owner = ? AND item = ?",
+                [(queue, owner, item) for item in items],
+            )
+            return len(items)
+
+
+    def insert_match_detail(self, timeline):
+        match_id = decode_timeline(timeline)["metadata"]["matchId"]
+        try:
+            with self.get_connection() as connection:
+                connection.execute(
+                    "INSERT INTO match_detail (match_id, key, timeline) VALUES (?, ?, ?)",
+                    (match_id, match_id, encode_timeline(timeline)),
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+
     def change_column_value_by_key(self, table_name, column_name, column_value, key):
         connection = self.get_connection()
         cursor = connection.cursor()
@@ -57,79 +205,72 @@ class Database:
         connection.close()
 
 
-    def process_predictor(self):
-        connection = self.get_connection()
-        cursor = connection.cursor()
-        query = "SELECT * FROM match_detail WHERE classifier_processed != 1"
-        cursor.execute(query)
-        matches = cursor.fetchall()
-        print(
-            "{} Total match_detail documents (to process): {}".format(
-                time.strftime("%Y-%m-%d %H:%M"),
-                len(matches),
-            )
+    def process_predictor(self, chunk_size=PREDICTOR_CHUNK_SIZE):
+        return self.stream_predictor(
+            "predictor", "classifier_processed", build_final_object, chunk_size
         )
 
-        for doc in matches:
-            content = doc[0]
-            built_object = build_final_object(content)
-            if built_object:
-                for x in built_object:
-                    try:
-                        insert_query = "INSERT INTO predictor VALUES (?)"
-                        cursor.execute(insert_query, (x,))
-                        print(
-                            "{} {}".format(
-                                time.strftime("%Y-%m-%d %H:%M"),
-                                doc[0].get("metadata").get("matchId"),
-                            )
-                        )
-                        update_query = "UPDATE match_detail SET classifier_processed = 1 WHERE key = ?"
-                        cursor.execute(update_query, (doc[0],))
-                    except sqlite3.IntegrityError as e:
-                        print(
-                            "[{}][DUP]: {} {}".format(
-                                time.strftime("%Y-%m-%d %H:%M"), doc[0], e
-                            )
-                        )
-                        continue
-        connection.commit()
-        connection.close()
+
+    def process_predictor_liveclient(self, chunk_size=PREDICTOR_CHUNK_SIZE):
+        return self.stream_predictor(
+            "predictor_liveclient",
+            "classifier_processed_liveclient",
+            build_final_object_liveclient,
+            chunk_size,
+        )
 
 
-    def process_predictor_liveclient(self):
+    def stream_predictor(self, table_name, flag_column, builder, chunk_size):
+        """
+        SQLite twin of database_pg.Database.stream_predictor.
+
+        SQLite has no server-side cursors, and a long-lived reader would block
+        the writer's commits, so each chunk is a fresh LIMIT query: rows flagged
+        by the previous chunk drop out of the result, which also makes the job
+        resumable.
+        """
+        processed = 0
         connection = self.get_connection()
         cursor = connection.cursor()
-        query = "SELECT * FROM match_detail WHERE classifier_processed_liveclient != 1"
-        cursor.execute(query)
-        matches = cursor.fetchall()
-        print(
-            "{} Total match_detail documents (to process): {}".format(
-                time.strftime("%Y-%m-%d %H:%M"),
-                len(matches),
+        skipped = 0
+        while True:
+            cursor.execute(
+                f"SELECT match_id, timeline FROM match_detail WHERE {flag_column} != 1 "
+                "AND timeline IS NOT NULL LIMIT ? OFFSET ?",
+                (chunk_size, skipped),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            frames, match_ids = [], []
+            for match_id, timeline in rows:
+                built_object = builder(decode_timeline(timeline))
+                if built_object:
+                    frames.extend((json.dumps(x),) for x in built_object)
+                    match_ids.append((match_id,))
+                else:
+                    # Unbuildable rows stay unflagged; step over them next time.
+                    skipped += 1
+            try:
+                cursor.executemany(f"INSERT INTO {table_name} VALUES (?)", frames)
+            except sqlite3.IntegrityError as e:
+                print("[{}][DUP]: {}".format(time.strftime("%Y-%m-%d %H:%M"), e))
+                connection.rollback()
+                cursor.executemany(
+                    f"INSERT OR IGNORE INTO {table_name} VALUES (?)", frames
+                )
+            cursor.executemany(
+                f"UPDATE match_detail SET {flag_column} = 1 WHERE match_id = ?", match_ids
+            )
+            connection.commit()
+            processed += len(match_ids)
+            print(
+                "{} [{}] {} match_detail documents processed".format(
+                    time.strftime("%Y-%m-%d %H:%M"), table_name, processed
+                )
             )
-        )
-
-        for doc in matches:
-            content = doc[0]
-            built_object = build_final_object_liveclient(content)
-            if built_object:
-                for x in built_object:
-                    try:
-                        insert_query = "INSERT INTO predictor_liveclient VALUES (?)"
-                        cursor.execute(insert_query, (x,))
-                        print(doc[0].get("metadata").get("matchId"))
-                        update_query = "UPDATE match_detail SET classifier_processed_liveclient = 1 WHERE key = ?"
-                        cursor.execute(update_query, (doc[0],))
-                    except sqlite3.IntegrityError as e:
-                        print(
-                            "[{}][DUP]: {} {}".format(
-                                time.strftime("%Y-%m-%d %H:%M"), doc[0], e
-                            )
-                        )
-                        continue
-        connection.commit()
         connection.close()
+        return processed
 
 
 class ProcessPerformance:
@@ -1,44 +1,289 @@
 """
-Reads data from an SQLite database into Pandas DataFrames.
+Exports the SQLite tables to partitioned, compressed Parquet datasets.
 
-Connects to the database file 'lol_gpt_v2.db' and reads the tables
-'performance_table', 'player_table', and 'match_table' into DataFrames.
+Connects to the database file 'lol_gpt_v2.db' and streams the tables
+'performance_table', 'player_table' and 'match_table' in chunks, so no table
+is ever fully loaded in memory. Column types are resolved once per table
+from the storage classes SQLite actually holds (text -> string, any real ->
+float64, only integers -> int64), so every chunk writes with the same
+Parquet schema even where the declared column type is wrong. Each
+incremental run re-probes the new rows and only ever widens the persisted
+schema (int64 -> float64 -> string); `load` and `--compact` read older files
+through the widened schema.
 
-Exports each DataFrame to a CSV file named after the table.
+Rows are partitioned by patch (from `gameVersion`, e.g. "13.24") and by
+region (from `request_region`, or from the prefix of `match_id`) when the
+table has those columns. performance_table has neither, and its
+`match_identifier` is the bare numeric gameId, so it is written
+unpartitioned.
 
-No data transformation, just extracting the tables from SQL to Pandas.
+Exports are incremental: each table keeps a persisted high-water mark on its
+SQLite rowid, and a run only appends the rows inserted since the last one.
+`--compact` merges the small files this produces.
+
+Downstream code can then load only what it needs:
+
+    df = load("performance_table", columns=["championName", "win", "f1", "f2"])
+
+Usage:
+    python read_data.py --db lol_gpt_v2.db --out export --chunksize 50000
+    python read_data.py --compact
+    python read_data.py --full
 """
 
+import argparse
+import json
+import os
+import shutil
 import sqlite3
+import time
+import uuid
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+TABLES = ["performance_table", "player_table", "match_table"]
+STATE_FILE = "_export_state.json"
+
+SQLITE_TYPES = {
+    "TEXT": pa.string(),
+    "INTEGER": pa.int64(),
+    "REAL": pa.float64(),
+}
+# Narrowest first: a column only ever moves right.
+TYPE_ORDER = [pa.int64(), pa.float64(), pa.string()]
+
+
+def table_schema(conn, table_name, since=0, stored=None):
+    """
+    Resolves the Parquet schema of the rows of a table above rowid `since`.
+
+    With a `stored` schema (from an earlier run), every column is widened to
+    at least its stored type, and columns the new rows leave empty keep it.
+    """
+    columns = [
+        (name, declared_type)
+        for _, name, declared_type, *_ in conn.execute(f"PRAGMA table_info({table_name})")
+    ]
+    stored_types = {field.name: field.type for field in stored or []}
+    # One scan over the new rows: which storage classes does each column hold?
+    probes = ", ".join(
+        f"max(typeof(\"{name}\") = 'text'), max(typeof(\"{name}\") = 'real'), "
+        f"max(typeof(\"{name}\") = 'integer')"
+        for name, _ in columns
+    )
+    flags = conn.execute(
+        f"SELECT {probes} FROM {table_name} WHERE rowid > ?", (since,)
+    ).fetchone()
+    fields = []
+    for i, (name, declared_type) in enumerate(columns):
+        has_text, has_real, has_integer = flags[3 * i : 3 * i + 3]
+        if has_text:
+            field_type = pa.string()
+        elif has_real:
+            field_type = pa.float64()
+        elif has_integer:
+            field_type = pa.int64()
+        elif name in stored_types:
+            field_type = stored_types[name]
+        else:
+            field_type = SQLITE_TYPES.get(declared_type.upper(), pa.string())
+        if name in stored_types:
+            field_type = max(stored_types[name], field_type, key=TYPE_ORDER.index)
+        fields.append(pa.field(name, field_type))
+    return pa.schema(fields)
+
+
+def stored_schema(state, table_name):
+    stored = state.get(table_name, {}).get("schema")
+    if not stored:
+        return None
+    return pa.schema([pa.field(name, pa.type_for_alias(t)) for name, t in stored])
+
+
+def partition_columns(columns):
+    """Returns the hive partition columns a table with these columns is written with."""
+    partition_cols = []
+    if "gameVersion" in columns:
+        partition_cols.append("patch")
+    if "request_region" in columns or "match_id" in columns:
+        partition_cols.append("region")
+    return partition_cols
+
+
+def add_partition_columns(df):
+    partition_cols = partition_columns(df.columns)
+    if "patch" in partition_cols:
+        df["patch"] = (
+            df["gameVersion"].astype(str).str.split(".").str[:2].str.join(".")
+        )
+    if "request_region" in df.columns:
+        df["region"] = df["request_region"].astype(str).str.lower()
+    elif "match_id" in df.columns:
+        df["region"] = df["match_id"].astype(str).str.split("_").str[0].str.lower()
+    return partition_cols
+
+
+def load_state(out_dir):
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_state(out_dir, state):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def export_table(
+    conn, table_name, out_dir, chunksize=50000, compression="zstd", full=False
+):
+    """
+    Streams the new rows of one table into a Parquet dataset under out_dir/table_name.
+
+    The high-water mark (the last exported SQLite rowid, i.e. insertion order)
+    and the resolved schema are persisted per table in out_dir/_export_state.json,
+    and advanced after every chunk. A run only reads rows above the mark and
+    writes them as extra files; `full` discards the dataset and starts over.
+
+    Returns:
+        int: The number of rows written.
+    """
+    state = load_state(out_dir)
+    root_path = os.path.join(out_dir, table_name)
+    if full:
+        shutil.rmtree(root_path, ignore_errors=True)
+        state.pop(table_name, None)
+    table_state = state.get(table_name, {})
+    watermark = table_state.get("watermark", 0)
+
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+    stored = stored_schema(state, table_name)
+    if stored is not None and stored.names == columns:
+        schema = table_schema(conn, table_name, since=watermark, stored=stored)
+    else:
+        schema = table_schema(conn, table_name)
+
+    # Unique per run, so two runs in the same second never overwrite each other's files.
+    run_id = uuid.uuid4().hex
+    total = 0
+    chunks = pd.read_sql_query(
+        f"SELECT rowid AS _rowid, * FROM {table_name} WHERE rowid > ? ORDER BY rowid",
+        conn,
+        params=(watermark,),
+        chunksize=chunksize,
+    )
+    for index, df in enumerate(chunks):
+        if df.empty:
+            continue
+        watermark = int(df["_rowid"].iloc[-1])
+        df = df.drop(columns="_rowid")
+        partition_cols = add_partition_columns(df)
+        chunk_schema = schema
+        for column in partition_cols:
+            chunk_schema = chunk_schema.append(pa.field(column, pa.string()))
+        table = pa.Table.from_pandas(df, schema=chunk_schema, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            root_path,
+            partition_cols=partition_cols or None,
+            basename_template=f"part-{run_id}-{index:05d}-{{i}}.parquet",
+            compression=compression,
+        )
+        total += len(df)
+        state[table_name] = {
+            "watermark": watermark,
+            "schema": [[field.name, str(field.type)] for field in schema],
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        save_state(out_dir, state)
+        print("{}: {} rows written".format(table_name, total))
+    if total == 0:
+        print("{}: up to date (watermark {})".format(table_name, watermark))
+    return total
 
-# Connect to the database
-conn = sqlite3.connect("lol_gpt_v2.db")
 
-# Read table from sqlite database
-df = pd.read_sql_query("SELECT * FROM performance_table", conn)
-print(df.tail())
-pd.set_option("display.max_columns", None)
-# print(df.iloc[-1]['summonerId'])
-print(len(df))
+def compact(table_name, out_dir, compression="zstd", min_files=2):
+    """
+    Merges the files of every partition of a table into one file per partition.
 
-df.to_csv("performance_report.csv", index=True)
+    Partitions with fewer than `min_files` files are left alone.
 
-df = pd.read_sql_query("SELECT * FROM player_table", conn)
+    Returns:
+        int: The number of partitions compacted.
+    """
+    root_path = os.path.join(out_dir, table_name)
+    schema = stored_schema(load_state(out_dir), table_name)
+    compacted = 0
+    for directory, _, names in os.walk(root_path):
+        files = sorted(
+            os.path.join(directory, name)
+            for name in names
+            if name.endswith(".parquet")
+        )
+        if len(files) < min_files:
+            continue
+        table = pa.concat_tables(
+            pq.read_table(path, partitioning=None, schema=schema) for path in files
+        )
+        target = os.path.join(directory, "compacted-{}.parquet".format(uuid.uuid4().hex))
+        pq.write_table(table, target + ".tmp", compression=compression)
+        os.replace(target + ".tmp", target)
+        for path in files:
+            if path != target:
+                os.remove(path)
+        compacted += 1
+        print("{}: compacted {} files into {}".format(table_name, len(files), target))
+    return compacted
 
-print(df.tail())
 
-print(len(df))
+def load(table_name, columns=None, filters=None, out_dir="export"):
+    """
+    Loads an exported table, reading only the requested columns and partitions.
 
-df.to_csv("player_report.csv", index=True)
+    Args:
+        table_name (str): One of TABLES.
+        columns (list, optional): Columns to read. Defaults to all of them.
+        filters (list, optional): pyarrow filters, e.g. [("patch", "=", "13.24")].
+    """
+    root_path = os.path.join(out_dir, table_name)
+    schema = stored_schema(load_state(out_dir), table_name)
+    if schema is not None:
+        # Files written before the schema was widened are cast up on read.
+        for name in partition_columns(schema.names):
+            schema = schema.append(pa.field(name, pa.string()))
+    return pq.read_table(
+        root_path, columns=columns, filters=filters, schema=schema
+    ).to_pandas()
 
-df = pd.read_sql_query("SELECT * FROM match_table", conn)
 
-print(df.tail())
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="lol_gpt_v2.db")
+    parser.add_argument("--out", default="export")
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--tables", nargs="+", default=TABLES)
+    parser.add_argument(
+        "--full", action="store_true", help="Ignore the watermarks and re-export everything"
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="Merge small files after exporting"
+    )
+    args = parser.parse_args()
 
-print(len(df))
+    conn = sqlite3.connect(args.db)
+    for table_name in args.tables:
+        export_table(conn, table_name, args.out, args.chunksize, full=args.full)
+        if args.compact:
+            compact(table_name, args.out)
+    conn.close()
 
-df.to_csv("match_report.csv", index=True)
 
-# print(', '.join([f'{key} REAL' for key in final_object.keys()]))
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from cassiopeia import cassiopeia as cass
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from v1.exceptions import MissingEnvironmentVariableError
 from routes.cassio import cass_router
@@ -38,3 +39,4 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
@@ -1,11 +1,14 @@
+import asyncio
 import os
 
+import httpx
+import pandas as pd
 from dotenv import load_dotenv
 from fastapi import APIRouter, Request, Response
 from fastapi.responses import FileResponse
 
 from v1.models import MassRegion, Region, SummonerData
-from v1.utils import get_api_response
+from v1.utils import FastJSONResponse, get_api_response
 
 load_dotenv()
 
@@ -31,6 +34,35 @@ QUEUE_ID_ROUTES = {
     "aram": 450,
 }
 QUEUE_TYPE_ROUTES = {"ranked": "ranked", "normal": "normal", "tourney": "tourney"}
+# Match requests in flight at once for one gather_all_data call.
+MATCH_FETCH_CONCURRENCY = int(os.getenv("MATCH_FETCH_CONCURRENCY", "10"))
+# gather_all_data column -> participant field of the match payload.
+SUMMARY_COLUMNS = {
+    "champion": "championName",
+    "champLevel": "champLevel",
+    "kills": "kills",
+    "deaths": "deaths",
+    "assists": "assists",
+    "win": "win",
+    "teamposition": "teamPosition",
+    "role": "role",
+    "timeplayed": "timePlayed",
+    "totaldamagedealt": "totalDamageDealt",
+    "goldearned": "goldEarned",
+    "goldspent": "goldSpent",
+}
+
+
+def player_from_match(match_data, puuid):
+    """
+    Returns:
+        dict: The participant entry of `puuid` in a match payload, or None if it is not there.
+    """
+    try:
+        participants = match_data["metadata"]["participants"]
+        return match_data["info"]["participants"][participants.index(puuid)]
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
 
 
 # Get summoner info using summoner name
@@ -106,7 +138,8 @@ async def get_match_data(match_id: str, mass_region: MassRegion = MassRegion.ame
     route = RIOT_API_ROUTES["match_by_id"].format(matchId=match_id)
     RIOT_API_URL = f"https://{mass_region.value}.{RIOT_API_BASE_URL}{route}"
     headers = {"X-Riot-Token": RIOT_API_KEY}
-    return await get_api_response(RIOT_API_URL, headers)
+    # Match payloads are large, so skip jsonable_encoder and render with orjson
+    return FastJSONResponse(await get_api_response(RIOT_API_URL, headers))
 
 
 # Gather all data
@@ -128,11 +161,17 @@ async def find_player_data(
     route = RIOT_API_ROUTES["match_by_id"].format(matchId=match_id)
     RIOT_API_URL = f"https://{mass_region.value}.{RIOT_API_BASE_URL}{route}"
     headers = {"X-Riot-Token": RIOT_API_KEY}
-    match_data = await get_api_response(RIOT_API_URL, headers)
-    participants = match_data["metadata"]["participants"]
-    player_index = participants.index(puuid)
-    player_data = match_data["info"]["participants"][player_index]
-    return player_data
+    response = await get_api_response(RIOT_API_URL, headers)
+    return player_from_match(response.get("data"), puuid)
+
+
+async def fetch_player_data(client, semaphore, match_id, puuid, mass_region):
+    route = RIOT_API_ROUTES["match_by_id"].format(matchId=match_id)
+    RIOT_API_URL = f"https://{mass_region.value}.{RIOT_API_BASE_URL}{route}"
+    headers = {"X-Riot-Token": RIOT_API_KEY}
+    async with semaphore:
+        response = await get_api_response(RIOT_API_URL, headers, client)
+    return player_from_match(response.get("data"), puuid)
 
 
 @router.get("/gather_all_data/{puuid}/{no_games}")
@@ -148,63 +187,33 @@ async def gather_all_data(
     mass_region (MassRegion, optional): The mass region where the games were played. Defaults to MassRegion.americas.
 
     Returns:
-    dict: A dictionary containing the data for each game.
+    dict: A dictionary containing the data for each game, plus the IDs of the matches that could not be fetched under "failed_matches".
     """
     # Get match_ids for the number of games requested
-    match_ids = await get_match_ids(puuid, no_games, mass_region)
-
-    # We initialise an empty dictionary to store data for each game
-    data = {
-        "champion": [],
-        "champLevel": [],
-        "kills": [],
-        "deaths": [],
-        "assists": [],
-        "win": [],
-        "teamposition": [],
-        "role": [],
-        "timeplayed": [],
-        "totaldamagedealt": [],
-        "goldearned": [],
-        "goldspent": [],
-    }
-
-    for match_id in match_ids:
-        # run the two functions to get the player data from the match ID
-        await get_match_data(match_id, mass_region)
-        player_data = await find_player_data(match_id, puuid, mass_region)
-
-        # Core Stats Variables
-        champion = player_data["championName"]
-        champLevel = player_data["champLevel"]
-        k = player_data["kills"]
-        d = player_data["deaths"]
-        a = player_data["assists"]
-        win = player_data["win"]
-
-        # Secondary Stats Variables
-        teamPosition = player_data["teamPosition"]
-        role = player_data["role"]
-        timePlayed = player_data["timePlayed"] / 60
-        totalDamageDealt = player_data["totalDamageDealt"]
-        goldEarned = player_data["goldEarned"]
-        goldSpent = player_data["goldSpent"]
-
-        # Core Stats
-        data["champion"].append(champion)
-        data["champLevel"].append(champLevel)
-        data["kills"].append(k)
-        data["deaths"].append(d)
-        data["assists"].append(a)
-        data["win"].append(win)
-
-        # Secondary Stats
-        data["teamposition"].append(teamPosition)
-        data["role"].append(role)
-        data["timeplayed"].append(timePlayed)
-        data["totaldamagedealt"].append(totalDamageDealt)
-        data["goldearned"].append(goldEarned)
-        data["goldspent"].append(goldSpent)
+    response = await get_match_ids(puuid, no_games, mass_region)
+    match_ids = response.get("data") or []
+
+    # Every match is fetched once, at most MATCH_FETCH_CONCURRENCY at a time, over one client
+    semaphore = asyncio.Semaphore(MATCH_FETCH_CONCURRENCY)
+    async with httpx.AsyncClient() as client:
+        players = await asyncio.gather(
+            *[
+                fetch_player_data(client, semaphore, match_id, puuid, mass_region)
+                for match_id in match_ids
+            ]
+        )
+
+    # Matches that could not be fetched are left out and reported, the rest are returned
+    rows = [player for player in players if player is not None]
+    frame = pd.DataFrame.from_records(rows, columns=list(SUMMARY_COLUMNS.values()))
+    frame.columns = list(SUMMARY_COLUMNS)
+    frame["timeplayed"] = frame["timeplayed"] / 60
+    data = frame.astype(object).where(frame.notna(), None).to_dict(orient="list")
+    data["failed_matches"] = [
+        match_id
+        for match_id, player in zip(match_ids, players)
+        if player is None
+    ]
 
     return data
 
@@ -1,6 +1,12 @@
 import logging
 
 import httpx
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -10,16 +16,35 @@ logging.basicConfig(
 )
 
 
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content):
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
 # Helper function to get API response
-async def get_api_response(RIOT_API_URL: str, headers: dict):
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(RIOT_API_URL, headers=headers)
-            response.raise_for_status()
-            return {"data": response.json(), "status_code": response.status_code}
-        except httpx.HTTPStatusError as exc:
-            logging.error(f"HTTPStatusError for {RIOT_API_URL}: {exc.response.text}")
-            return {"data": None, "status_code": exc.response.status_code}
-        except Exception as exc:
-            logging.error(f"Exception for {RIOT_API_URL}: {exc}")
-            return {"data": None, "status_code": 500}
+async def get_api_response(
+    RIOT_API_URL: str, headers: dict, client: httpx.AsyncClient = None
+):
+    """
+    Sends a GET request and wraps the outcome as {"data": ..., "status_code": ...}.
+
+    Pass `client` to reuse one connection pool across many calls; otherwise
+    a client is opened for this request only.
+    """
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            return await get_api_response(RIOT_API_URL, headers, client)
+    try:
+        response = await client.get(RIOT_API_URL, headers=headers)
+        response.raise_for_status()
+        return {"data": response.json(), "status_code": response.status_code}
+    except httpx.HTTPStatusError as exc:
+        logging.error(f"HTTPStatusError for {RIOT_API_URL}: {exc.response.text}")
+        return {"data": None, "status_code": exc.response.status_code}
+    except Exception as exc:
+        logging.error(f"Exception for {RIOT_API_URL}: {exc}")
+        return {"data": None, "status_code": 500}
@@ -3,16 +3,23 @@ import os
 import psycopg2
 from dotenv import load_dotenv
 
+from crawl_state import CrawlState
+from crawler import CrawlEngine
 from database_pg import Database
+from pipeline import Pipeline
 from riot_api import RiotAPI
 
-conn = psycopg2.connect(
-    host=os.environ.get("SUPABASE_URL"),
-    port=os.environ.get("SUPABASE_PORT"),
-    database=os.environ.get("SUPABASE_DB"),
-    user=os.environ.get("SUPABASE_USER"),
-    password=os.environ.get("SUPABASE_PW")
-)
+
+def connect():
+    # Opened per run rather than at import, so importing this module (main.py does) never blocks.
+    return psycopg2.connect(
+        host=os.environ.get("SUPABASE_URL"),
+        port=os.environ.get("SUPABASE_PORT"),
+        database=os.environ.get("SUPABASE_DB"),
+        user=os.environ.get("SUPABASE_USER"),
+        password=os.environ.get("SUPABASE_PW")
+    )
+
 
 # cursor = conn.cursor()
 # query = "SELECT * FROM match_table"
@@ -46,15 +53,26 @@ def data_mine(db, mode):
         api.player_list()
     elif mode == "match_list":
         api.match_list()
+    elif mode == "resume":
+        state = CrawlState()
+        if state.unfinished("match_list"):
+            api.match_list(state=state)
+        else:
+            print("No interrupted match_list run to resume")
     elif mode == "match_download_standard":
         api.match_download_standard(db)
     elif mode == "match_download_detail":
         api.match_download_detail(db)
+    elif mode == "process_predictor":
+        db.process_predictor_parallel()
+    elif mode == "process_predictor_liveclient":
+        db.process_predictor_parallel(liveclient=True)
+    elif mode == "crawl":
+        engine = CrawlEngine(api)
+        engine.player_list()
+        engine.match_list()
     else:
-        api.player_list()
-        api.match_list()
-        api.match_download_standard(db)
-        api.match_download_detail(db)
+        Pipeline(api).run()
 
 def main(mode: str) -> None:
     """
@@ -64,14 +82,15 @@ def main(mode: str) -> None:
     Args:
         mode (str): The mode in which the data_mine function should be called.
                     It can be one of the following values: "player_list", "match_list",
-                    "match_download_standard", or "match_download_detail".
+                    "match_download_standard", "match_download_detail", "crawl"
+                    or "resume" (continue an interrupted match_list run).
 
     Returns:
         None
     """
 
     # Initialize a Database object
-    db = Database(conn)
+    db = Database(connect())
 
     # Run the initialization script on the database
     db.run_init_db()
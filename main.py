@@ -1,15 +1,26 @@
+import asyncio
+import contextlib
+import functools
+import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 
 import uvicorn
-from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
-from constants import REGIONS
+from api_responses import CompressionMiddleware, default_response_class, json_response
+from constants import MASS_REGIONS, REGIONS
+from database_async import AsyncDatabase
 from database_pg import Database, ProcessPerformance
 from extract_pg import main as extract_main
-from riot_api import RiotAPI
+from riot_api_async import AsyncRiotAPI
+from timeline_store import decode_timeline
+from ttl_cache import ttl_cache
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -23,6 +34,7 @@ app = FastAPI(
         {"url": "http://0.0.0.0:8000/"},
         {"url": "https://lacralabs.replit.app"},
     ],
+    default_response_class=default_response_class(),
 )
 
 app.add_middleware(
@@ -32,15 +44,115 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
 
-db = Database(os.getenv("DATABASE_URL")).get_connection()
+# Threads available to the sync work left on the request path (psycopg2, timeline decoding, file reads).
+BLOCKING_WORKERS = int(os.getenv("API_BLOCKING_WORKERS", "8"))
+# IDs accepted per call by the batch lookup endpoints (a full lobby is 10).
+BATCH_MAX_ITEMS = int(os.getenv("API_BATCH_MAX_ITEMS", "20"))
+
+db = Database(os.getenv("DATABASE_URL"))
+adb = AsyncDatabase()
+executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_WORKERS, thread_name_prefix="api-blocking"
+)
+riot_api = AsyncRiotAPI(executor=executor)
+blocking_slots = asyncio.Semaphore(BLOCKING_WORKERS)
+
+
+async def run_blocking(func, *args):
+    """
+    Runs a sync call on the bounded executor so it never stalls the event loop.
+
+    At most BLOCKING_WORKERS calls are handed to the executor at once; the
+    others wait on the loop instead of piling up in the executor queue.
+    """
+    async with blocking_slots:
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(func, *args)
+        )
+
+
+def read_text(path):
+    with open(path, "r") as f:
+        return f.read()
+
+
+def ndjson_line(item):
+    return json.dumps(item, default=str) + "\n"
+
+
+def match_detail_line(match_detail):
+    return ndjson_line([decode_timeline(match_detail[0]), *list(match_detail)[1:]])
+
+
+async def ndjson(lines, label):
+    """
+    Streams already encoded NDJSON lines, closing their source when the client goes away.
+
+    The status line is sent before the first row, so a failure mid-stream
+    ends the body with an {"error": ...} line instead.
+    """
+    async with contextlib.aclosing(lines):
+        try:
+            async for line in lines:
+                yield line
+        except Exception as e:
+            logging.error(f"Error streaming {label}: {e}")
+            yield ndjson_line({"error": f"Error streaming {label}: {e}"})
+
+
+class BatchLookup(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+    region: str = "na1"
+
+
+async def batch_lookup(ids, lookup, label):
+    """
+    Resolves every distinct ID concurrently and answers in request order.
+
+    Duplicate IDs share one lookup. Each result carries its own status, so
+    one failed lookup does not fail the batch:
+    {"id": ..., "status": "ok", "data": ...} or {"id": ..., "status": "error", "error": ...}.
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    responses = await asyncio.gather(
+        *[lookup(item_id) for item_id in unique_ids], return_exceptions=True
+    )
+    results = dict()
+    for item_id, response in zip(unique_ids, responses):
+        if isinstance(response, Exception):
+            results[item_id] = {
+                "id": item_id,
+                "status": "error",
+                "error": f"Error retrieving {label}: {response}",
+            }
+        elif response is None:
+            results[item_id] = {
+                "id": item_id,
+                "status": "error",
+                "error": f"Error retrieving {label}: Riot API request failed",
+            }
+        else:
+            results[item_id] = {"id": item_id, "status": "ok", "data": response}
+    return {"results": [results[item_id] for item_id in ids]}
+
+
+def score_matches(match_ids):
+    return ProcessPerformance(db).process_match_details(match_ids)
 
 
 # API endpoints
 @app.on_event("startup")
 async def startup_event():
-    global riot_api
-    riot_api = RiotAPI(db)
+    await riot_api.open()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await riot_api.close()
+    await adb.close()
+    executor.shutdown(wait=False)
 
 
 @app.get("/summoner/{summoner_name}")
@@ -58,12 +170,46 @@ async def get_summoner_info(summoner_name: str, region: str = "na1"):
     if region not in REGIONS:
         return {"error": "Invalid region"}
     try:
-        summoner_info = riot_api.summoner_info(summoner_name, region)
+        summoner_info = await riot_api.summoner_info(summoner_name, region)
         return summoner_info
     except Exception as e:
         return {"error": f"Error retrieving summoner information: {e}"}
 
 
+@app.post("/summoner/batch")
+async def get_summoner_info_batch(batch: BatchLookup):
+    """
+    Retrieves the summoner information of up to BATCH_MAX_ITEMS summoner names of one region.
+
+    Returns:
+        dict: {"results": [...]}, one entry per requested name, in request order.
+    """
+    if batch.region not in REGIONS:
+        raise HTTPException(status_code=400, detail="Invalid region")
+    return await batch_lookup(
+        batch.ids,
+        lambda summoner_name: riot_api.summoner_info(summoner_name, batch.region),
+        "summoner information",
+    )
+
+
+@app.post("/summoner/leagues/batch")
+async def get_summoner_leagues_batch(batch: BatchLookup):
+    """
+    Retrieves the league entries of up to BATCH_MAX_ITEMS summoner IDs of one region.
+
+    Returns:
+        dict: {"results": [...]}, one entry per requested summoner ID, in request order.
+    """
+    if batch.region not in REGIONS:
+        raise HTTPException(status_code=400, detail="Invalid region")
+    return await batch_lookup(
+        batch.ids,
+        lambda summoner_id: riot_api.summoner_leagues(summoner_id, batch.region),
+        "summoner leagues",
+    )
+
+
 @app.get("/summoner/leagues/{summoner_id}")
 async def get_summoner_leagues(summoner_id: str, region: str = "na1"):
     """
@@ -77,8 +223,7 @@ async def get_summoner_leagues(summoner_id: str, region: str = "na1"):
         dict: A dictionary containing the league information for the given summoner ID.
     """
     try:
-        riot_api = RiotAPI(db)
-        summoner_leagues = riot_api.summoner_leagues(summoner_id, region)
+        summoner_leagues = await riot_api.summoner_leagues(summoner_id, region)
         return summoner_leagues
     except Exception as e:
         return {"error": f"Error retrieving summoner leagues: {e}"}
@@ -97,13 +242,29 @@ async def get_champion_mastery(puuid: str, region: str = "na1"):
         dict: A dictionary containing the champion mastery information, or an error message if an exception occurs.
     """
     try:
-        riot_api = RiotAPI(db)
-        champion_mastery = riot_api.champion_mastery(puuid, region)
+        champion_mastery = await riot_api.champion_mastery(puuid, region)
         return champion_mastery
     except Exception as e:
         return {"error": f"Error retrieving champion mastery: {e}"}
 
 
+@app.post("/champion_mastery/batch")
+async def get_champion_mastery_batch(batch: BatchLookup):
+    """
+    Retrieves the champion mastery of up to BATCH_MAX_ITEMS players of one region.
+
+    Returns:
+        dict: {"results": [...]}, one entry per requested PUUID, in request order.
+    """
+    if batch.region not in REGIONS:
+        raise HTTPException(status_code=400, detail="Invalid region")
+    return await batch_lookup(
+        batch.ids,
+        lambda puuid: riot_api.champion_mastery(puuid, batch.region),
+        "champion mastery",
+    )
+
+
 @app.get("/summoner/champion_mastery/scores/{puuid}")
 async def get_champion_mastery_total_score(puuid: str, region: str = "na1"):
     """
@@ -117,8 +278,9 @@ async def get_champion_mastery_total_score(puuid: str, region: str = "na1"):
         dict: A dictionary containing the total champion mastery score, or an error message if an exception occurs.
     """
     try:
-        riot_api = RiotAPI(db)
-        champion_mastery_score = riot_api.champion_mastery_total_score(puuid, region)
+        champion_mastery_score = await riot_api.champion_mastery_total_score(
+            puuid, region
+        )
         return champion_mastery_score
     except Exception as e:
         return {"error": f"Error retrieving total champion mastery score: {e}"}
@@ -138,8 +300,7 @@ async def get_match_list(
         f"Fetching match list for PUUID: {puuid}, Num Matches: {num_matches}, Queue Type: {queue_type}, Region: {region}"
     )
     try:
-        riot_api = RiotAPI(db)
-        match_list = riot_api.match_ids(puuid, num_matches, queue_type, region)
+        match_list = await riot_api.match_ids(puuid, num_matches, queue_type, region)
         if not match_list:
             logging.warning("Received empty match list.")
         return match_list
@@ -148,19 +309,74 @@ async def get_match_list(
         return {"error": f"Error retrieving match list: {e}"}
 
 
+@app.get("/summoner/match_list/{puuid}/stream")
+async def stream_match_list(
+    puuid: str,
+    num_matches: int = 10,
+    queue_type: str = "ranked",
+    region: str = "americas",
+):
+    """
+    Streams the match IDs of a player as NDJSON, one {"match_id": ...} per line.
+
+    Each page of up to 100 IDs is written as soon as Riot returns it, so
+    the first lines arrive after one round trip and memory use does not
+    grow with num_matches. Parameters are checked before the stream starts.
+    """
+    if region not in MASS_REGIONS:
+        raise HTTPException(status_code=400, detail="Invalid region")
+    if queue_type not in ["ranked"]:
+        raise HTTPException(status_code=400, detail="Invalid queue type")
+    if not 0 <= num_matches <= 990:
+        raise HTTPException(status_code=400, detail="Invalid number of matches")
+
+    async def lines():
+        pages = riot_api.iter_match_ids(puuid, num_matches, queue_type, region)
+        async with contextlib.aclosing(pages):
+            async for page in pages:
+                for match_id in page:
+                    yield ndjson_line({"match_id": match_id})
+
+    return StreamingResponse(
+        ndjson(lines(), "match list"), media_type="application/x-ndjson"
+    )
+
+
+@app.get("/match/detail/stream")
+async def stream_match_details(match_id: List[str] = Query(None), limit: int = None):
+    """
+    Streams match_detail rows as NDJSON, one row per line in the /match/detail format.
+
+    Rows come from a server-side cursor in chunks of DB_STREAM_CHUNK_SIZE
+    and are decoded on the executor, so memory use stays flat however many
+    rows are requested.
+
+    Args:
+        match_id (List[str], optional): Repeat to select matches. Defaults to every match.
+        limit (int, optional): The maximum number of rows to return.
+    """
+
+    async def lines():
+        rows = adb.iter_match_details(match_id, limit)
+        async with contextlib.aclosing(rows):
+            async for row in rows:
+                yield await run_blocking(match_detail_line, row)
+
+    return StreamingResponse(
+        ndjson(lines(), "match details"), media_type="application/x-ndjson"
+    )
+
+
 @app.get("/match/detail/{match_id}")
-async def get_match_detail(match_id: str, db):
+async def get_match_detail(match_id: str):
     """
     Retrieves the match detail for a given match ID.
     """
     try:
-        match_detail = (
-            db.cursor()
-            .execute("SELECT * FROM match_detail WHERE match_id = ?", (match_id,))
-            .fetchone()
-        )
+        match_detail = await adb.fetch_match_detail(match_id)
         if match_detail is not None:
-            return match_detail
+            timeline = await run_blocking(decode_timeline, match_detail[0])
+            return json_response([timeline, *list(match_detail)[1:]])
         else:
             return {"error": "Match not found"}
     except Exception as e:
@@ -168,18 +384,15 @@ async def get_match_detail(match_id: str, db):
 
 
 @app.get("/match/timeline/{match_id}")
-async def get_match_timeline(match_id: str, db):
+async def get_match_timeline(match_id: str):
     """
     Retrieves the match detail for a given match ID.
     """
     try:
-        match_detail = (
-            db.cursor()
-            .execute("SELECT * FROM match_detail WHERE match_id = ?", (match_id,))
-            .fetchone()
-        )
+        match_detail = await adb.fetch_match_detail(match_id)
         if match_detail is not None:
-            return match_detail
+            timeline = await run_blocking(decode_timeline, match_detail[0])
+            return json_response([timeline, *list(match_detail)[1:]])
         else:
             return {"error": "Match not found"}
     except Exception as e:
@@ -187,29 +400,19 @@ async def get_match_timeline(match_id: str, db):
 
 
 @app.post("/performance")
-async def calculate_performance(match_id: str):
+async def calculate_performance(match_id: List[str] = Query(...)):
     """
     Calculates player performance based on match details.
 
     Args:
-        match_id (str): The match ID.
-        db: The database connection.
+        match_id (List[str]): The match IDs, repeated to score several matches
+            in one batch.
 
     Returns:
-        dict: The calculated performance data.
+        int: The number of new matches scored.
     """
     try:
-        match_detail = db.cursor().execute(
-            "SELECT * FROM match_detail WHERE match_id = ?", (match_id,)
-        )
-        if match_detail:
-            performance_calculator = ProcessPerformance(db)
-            performance_data = performance_calculator.process_player_performance(
-                match_detail[0], db
-            )
-            return performance_data
-        else:
-            return {"error": "Match not found"}
+        return await run_blocking(score_matches, list(dict.fromkeys(match_id)))
     except Exception as e:
         return {"error": f"Error calculating performance: {e}"}
 
@@ -221,6 +424,8 @@ async def data_mining(mode: str, background_tasks: BackgroundTasks):
         "match_list",
         "match_download_standard",
         "match_download_detail",
+        "crawl",
+        "resume",
     ]
     if mode not in valid_modes:
         raise HTTPException(status_code=400, detail="Invalid mode specified")
@@ -230,6 +435,26 @@ async def data_mining(mode: str, background_tasks: BackgroundTasks):
     return {"message": "Data mining process initiated", "mode": mode}
 
 
+@app.get("/stats/cache")
+async def cache_stats():
+    """
+    Returns the hit, miss and coalesced counters of the Riot lookup cache.
+    """
+    return ttl_cache.report()
+
+
+@app.get("/stats/db")
+async def db_stats():
+    """
+    Returns the checkout and wait metrics of the asyncpg pool serving requests
+    and of the psycopg2 pool used by performance scoring and data mining.
+    """
+    return {
+        "async": adb.pool_metrics(),
+        "sync": await run_blocking(db.pool_metrics),
+    }
+
+
 @app.get("/")
 async def home():
     return {"message": "Welcome to the Esports Playmaker"}
@@ -247,16 +472,14 @@ async def plugin_favicon():
 
 @app.get("/.well-known/ai-plugin.json")
 async def plugin_manifest():
-    with open("ai-plugin.json", "r") as f:
-        json_content = f.read()
+    json_content = await run_blocking(read_text, "ai-plugin.json")
     return Response(content=json_content, media_type="application/json")
 
 
 @app.get("/openapi.yaml")
 async def openapi_spec(request: Request):
     host = request.client.host if request.client else "localhost"
-    with open("openapi.yaml", "r") as f:
-        yaml_content = f.read()
+    yaml_content = await run_blocking(read_text, "openapi.yaml")
     yaml_content = yaml_content.replace("PLUGIN_HOSTNAME", f"https://{host}")
     return Response(content=yaml_content, media_type="application/yaml")
 
@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv("MATCH_CACHE_DIR", os.path.join(".cache", "matches"))
+CACHE_MAX_BYTES = int(os.getenv("MATCH_CACHE_MAX_BYTES", str(2 * 1024**3)))
+# Eviction frees space down to this share of the cap. The directory is
+# re-scanned whenever this process has written the rest of the cap since the
+# last scan, so other processes' writes are seen without a scan per write.
+CACHE_EVICT_TO = 0.9
+
+
+class MatchCache:
+    """
+    Compressed on-disk cache for immutable Riot payloads (match and timeline).
+
+    Entries are addressed by the SHA-256 of "<endpoint>:<match_id>" and stored
+    as gzip-compressed JSON. The total size on disk is capped; when a write
+    goes over the cap the least recently used entries are evicted. Recency is
+    kept in the file modification time, so it survives restarts.
+
+    The index of the directory is built on first use, not at import. Several
+    processes may share one cache directory: each tracks only its own writes
+    between scans, so the directory is scanned again before evicting and the
+    cap is enforced on the size of the whole directory. Between scans it can
+    go over the cap by up to 10% of it per process.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.written = 0
+        self.hits = 0
+        self.misses = 0
+        self.loaded = False
+
+    def ensure_index(self):
+        with self.lock:
+            if not self.loaded:
+                self.load_index()
+
+    def load_index(self):
+        # Called with the lock held.
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.written = 0
+        self.loaded = True
+        if not os.path.isdir(self.cache_dir):
+            return
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".json.gz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Evicted by another process mid-scan.
+                    continue
+                files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self.entries[path] = size
+            self.total_bytes += size
+
+    def path(self, endpoint, match_id):
+        digest = hashlib.sha256("{}:{}".format(endpoint, match_id).encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], "{}.json.gz".format(digest))
+
+    def get(self, endpoint, match_id):
+        self.ensure_index()
+        path = self.path(endpoint, match_id)
+        with self.lock:
+            if path not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(path)
+            self.hits += 1
+        try:
+            with gzip.open(path, "rb") as f:
+                payload = json.loads(f.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.total_bytes -= self.entries.pop(path, 0)
+            return None
+        return payload
+
+    def put(self, endpoint, match_id, payload):
+        self.ensure_index()
+        path = self.path(endpoint, match_id)
+        data = gzip.compress(json.dumps(payload, separators=(",", ":")).encode(), 6)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(path, threading.get_ident())
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total_bytes += len(data) - self.entries.pop(path, 0)
+            self.entries[path] = len(data)
+            self.written += len(data)
+            if (
+                self.total_bytes > self.max_bytes
+                or self.written > self.max_bytes * (1 - CACHE_EVICT_TO)
+            ):
+                self.evict()
+
+    def evict(self):
+        # Count what the other processes sharing the directory wrote, too.
+        self.load_index()
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * CACHE_EVICT_TO
+        while self.total_bytes > target and len(self.entries) > 1:
+            path, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+match_cache = MatchCache()
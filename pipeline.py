@@ -0,0 +1,321 @@
+import os
+import queue
+import socket
+import threading
+import time
+
+from rich import print
+from rich.live import Live
+from rich.table import Table
+
+from constants import REGIONS
+from crawl_state import CrawlState
+from timeline_frames import build_frames
+
+_DONE = object()
+
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+# Timelines are large, so the predictor inbox is kept short.
+QUEUE_SIZES = {"predictor": 64}
+STAGE_WORKERS = {
+    "players": len(REGIONS),
+    "match_ids": 8,
+    "match_download_standard": 4,
+    "match_download_detail": 4,
+    "predictor": 2,
+}
+
+
+class Stage:
+    """
+    One step of the Pipeline: a pool of worker threads reading a bounded inbox.
+
+    `handler(item)` returns the items to pass downstream (or None). Every
+    output is put into the inbox of each downstream stage, which blocks
+    while that inbox is full; a slow stage therefore throttles everything
+    upstream of it instead of buffering without bound. Once every worker
+    has seen the end of its input, the optional `drain()` runs once per
+    worker and the end of input is passed on.
+    """
+
+    def __init__(self, name, handler, workers, queue_size=QUEUE_SIZE, drain=None):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.drain = drain
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.downstream = []
+        self.lock = threading.Lock()
+        self.running = workers
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.first_output = None
+        self.started = time.monotonic()
+
+    def feed(self, *stages):
+        self.downstream.extend(stages)
+        return self
+
+    def emit(self, item):
+        for stage in self.downstream:
+            stage.inbox.put(item)
+        with self.lock:
+            self.emitted += 1
+            if self.first_output is None:
+                self.first_output = time.monotonic()
+
+    def close(self):
+        for _ in range(self.workers):
+            self.inbox.put(_DONE)
+
+    def run_worker(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+            try:
+                for output in self.handler(item) or ():
+                    self.emit(output)
+                with self.lock:
+                    self.processed += 1
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                print(
+                    "[{}][{}][ERR] {}: {}".format(
+                        time.strftime("%Y-%m-%d %H:%M"), self.name, item, e
+                    )
+                )
+        if self.drain is not None:
+            try:
+                self.drain()
+            except Exception as e:
+                print(
+                    "[{}][{}][ERR] drain: {}".format(
+                        time.strftime("%Y-%m-%d %H:%M"), self.name, e
+                    )
+                )
+        with self.lock:
+            self.running -= 1
+            last = self.running == 0
+        if last:
+            for stage in self.downstream:
+                stage.close()
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class Pipeline:
+    """
+    Streams the extract_pg stages into each other instead of running them one after another.
+
+        players -> match_ids -> match_download_standard
+                             -> match_download_detail -> predictor
+
+    Ladder entries of every platform, and the players already in
+    player_table, feed match ID discovery as soon as they are read; every
+    new match ID feeds both downloaders, and every downloaded timeline is
+    built into predictor frames right away. Queues are bounded (QUEUE_SIZE)
+    and each stage has its own worker count (STAGE_WORKERS); a rich table
+    shows queue depths, counters and the time to the first timeline.
+
+    The downloaders lease each new match ID in the download work queue before
+    handling it, so they never collide with other download workers. When
+    discovery is over they drain what is left of the queue, so a run still
+    covers every pending match as the sequential stages did.
+    """
+
+    def __init__(
+        self,
+        api,
+        workers=None,
+        queue_sizes=None,
+        queue_type="RANKED_SOLO_5x5",
+        state=None,
+    ):
+        self.api = api
+        self.db = api.db
+        self.queue_type = queue_type
+        self.state = state or CrawlState()
+        self.workers = dict(STAGE_WORKERS, **(workers or {}))
+        self.queue_sizes = dict(QUEUE_SIZES, **(queue_sizes or {}))
+        # Summoners crawled within the freshness window are never re-queued.
+        self.seen = self.state.fresh_keys()
+        self.seen_lock = threading.Lock()
+        self.owner = "{}:{}:pipeline".format(socket.gethostname(), os.getpid())
+        self.started = time.monotonic()
+
+        def stage(name, handler, drain=None):
+            return Stage(
+                name,
+                handler,
+                self.workers[name],
+                self.queue_sizes.get(name, QUEUE_SIZE),
+                drain,
+            )
+
+        self.players = stage("players", self.read_players)
+        self.match_ids = stage("match_ids", self.discover_match_ids)
+        self.standard = stage(
+            "match_download_standard",
+            self.download_standard,
+            drain=lambda: self.api.match_download_standard(self.db),
+        )
+        self.detail = stage(
+            "match_download_detail", self.download_detail, drain=self.drain_detail
+        )
+        self.predictor = stage("predictor", self.build_predictor)
+        self.players.feed(self.match_ids)
+        self.match_ids.feed(self.standard, self.detail)
+        self.detail.feed(self.predictor)
+        self.stages = [
+            self.players,
+            self.match_ids,
+            self.standard,
+            self.detail,
+            self.predictor,
+        ]
+
+    def read_players(self, source):
+        if source is None:
+            rows = self.db.execute("SELECT * FROM player_table")
+            players = ((x[11].lower(), x[1]) for x in rows)
+        else:
+            entries = self.api.top_players(source, self.queue_type, self.db) or []
+            players = ((source, x["summonerName"]) for x in entries)
+        for region, summoner_name in players:
+            with self.seen_lock:
+                if (region, summoner_name) in self.seen:
+                    continue
+                self.seen.add((region, summoner_name))
+            yield region, summoner_name
+
+    def discover_match_ids(self, player):
+        region, summoner_name = player
+        summoner = self.api.summoner_info(summoner_name, region)
+        if summoner is None:
+            return []
+        overall_region = self.api.mass_region(region)[0]
+        match_ids, complete = self.api.match_ids(
+            summoner.get("puuid"),
+            990,
+            "ranked",
+            overall_region,
+            stop_at=self.state.last_match_id(region, summoner_name),
+        )
+        inserted = self.api.save_match_ids(summoner_name, match_ids)
+        if complete:
+            self.state.record(
+                region,
+                summoner_name,
+                summoner.get("puuid"),
+                match_ids[0]["match_id"] if match_ids else None,
+            )
+        return inserted
+
+    def leased(self, work_queue, match_id, handler):
+        if not self.db.lease_items(work_queue, self.owner, [match_id]):
+            return False
+        overall_region, _ = self.api.mass_region(match_id.split("_")[0].lower())
+        result = handler(match_id, overall_region)
+        if result:
+            self.db.complete_work(work_queue, self.owner, [match_id])
+        return result
+
+    def download_standard(self, match_id):
+        self.leased(
+            "match_download_standard",
+            match_id,
+            lambda match_id, region: self.api.extract_matches(
+                region, match_id, self.db
+            ),
+        )
+
+    def download_timeline(self, match_id, overall_region):
+        timeline = self.api.match_timeline(match_id, overall_region)
+        if not timeline:
+            return None
+        self.db.insert_match_detail(timeline)
+        return match_id, timeline
+
+    def download_detail(self, match_id):
+        row = self.leased("match_download_detail", match_id, self.download_timeline)
+        return [row] if row else []
+
+    def drain_detail(self):
+        # Timelines downloaded from the leftover queue feed the predictor too.
+        def download(match_id, overall_region):
+            row = self.download_timeline(match_id, overall_region)
+            if row:
+                self.detail.emit(row)
+            return row
+
+        self.api.drain_work_queue(self.db, "match_download_detail", download)
+
+    def build_predictor(self, row):
+        with self.db.get_connection() as connection:
+            self.db.write_predictor_chunk(
+                connection,
+                "predictor",
+                "classifier_processed",
+                build_frames,
+                [row],
+            )
+
+    def progress(self):
+        table = Table(title="extract_pg pipeline")
+        table.add_column("stage", no_wrap=True)
+        for column in ("workers", "queue", "processed", "emitted", "errors", "rate"):
+            table.add_column(column, justify="right")
+        for stage in self.stages:
+            table.add_row(
+                stage.name,
+                "{}/{}".format(stage.running, stage.workers),
+                "{}/{}".format(stage.inbox.qsize(), stage.inbox.maxsize),
+                str(stage.processed),
+                str(stage.emitted),
+                str(stage.errors),
+                "{:.2f}/s".format(stage.throughput()),
+            )
+        first_row = self.detail.first_output
+        table.caption = "elapsed {:.0f}s | first timeline after {}".format(
+            time.monotonic() - self.started,
+            "{:.1f}s".format(first_row - self.started) if first_row else "-",
+        )
+        return table
+
+    def run(self, refresh=1.0):
+        threads = [
+            threading.Thread(
+                target=stage.run_worker,
+                name="{}-{}".format(stage.name, i),
+                daemon=True,
+            )
+            for stage in self.stages
+            for i in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        # Fed from here after the workers are up, so a full inbox cannot deadlock.
+        for region in REGIONS:
+            self.players.inbox.put(region)
+        self.players.inbox.put(None)
+        self.players.close()
+
+        with Live(self.progress(), refresh_per_second=4) as live:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(refresh)
+                live.update(self.progress())
+            live.update(self.progress())
+        self.state.flush()
+        return {
+            stage.name: {
+                "processed": stage.processed,
+                "emitted": stage.emitted,
+                "errors": stage.errors,
+            }
+            for stage in self.stages
+        }
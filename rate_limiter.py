@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+# Development key limits, used until Riot tells us the real ones.
+DEFAULT_APP_LIMITS = [(20, 1), (100, 120)]
+
+
+def parse_rate_limit(header):
+    """
+    Parses a Riot rate limit header such as "20:1,100:120".
+
+    Args:
+        header (str): The header value, a comma separated list of "count:seconds" pairs.
+
+    Returns:
+        list: A list of (count, seconds) tuples. Empty if the header is missing.
+    """
+    limits = []
+    if not header:
+        return limits
+    for pair in header.split(","):
+        try:
+            count, seconds = pair.strip().split(":")
+            limits.append((int(count), int(seconds)))
+        except ValueError:
+            continue
+    return limits
+
+
+class RateLimitBucket:
+    """
+    Tracks every window of one Riot rate limit (app or method) for a single host.
+
+    Each window keeps the timestamps of the requests sent inside it. A caller
+    may send once every window has room; otherwise it waits for the oldest
+    request of the fullest window to expire.
+    """
+
+    def __init__(self, limits=None):
+        self.lock = threading.Lock()
+        self.windows = dict()
+        self.blocked_until = 0.0
+        self.set_limits(limits or [])
+
+    def set_limits(self, limits):
+        windows = dict()
+        for count, seconds in limits:
+            sent = self.windows.get(seconds, (None, deque()))[1]
+            windows[seconds] = (count, sent)
+        self.windows = windows
+
+    def wait_time(self, now):
+        wait = max(0.0, self.blocked_until - now)
+        for seconds, (count, sent) in self.windows.items():
+            while sent and sent[0] <= now - seconds:
+                sent.popleft()
+            if len(sent) >= count:
+                wait = max(wait, sent[0] + seconds - now)
+        return wait
+
+    def record(self, now):
+        for count, sent in self.windows.values():
+            sent.append(now)
+
+    def sync(self, counts, now):
+        # Riot's counters include requests sent by other processes using the same key.
+        for count, seconds in counts:
+            if seconds not in self.windows:
+                continue
+            sent = self.windows[seconds][1]
+            while len(sent) < count:
+                sent.appendleft(now)
+
+
+class RateLimiter:
+    """
+    Rate limit scheduler shared by every RiotAPI call.
+
+    Keeps one app bucket per host (na1, euw1, americas, ...) and one method
+    bucket per (host, method). Callers block in acquire() until both buckets
+    have room, so requests are queued instead of being sent into a 429.
+    Limits and counts are refreshed from the X-App-Rate-Limit and
+    X-Method-Rate-Limit headers of every response, and Retry-After pauses
+    the bucket that was exceeded.
+    """
+
+    def __init__(self, app_limits=None):
+        self.app_limits = app_limits or DEFAULT_APP_LIMITS
+        self.buckets = dict()
+        self.lock = threading.Lock()
+
+    def bucket(self, key, limits=None):
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = RateLimitBucket(limits)
+                self.buckets[key] = bucket
+            return bucket
+
+    def try_acquire(self, host, method):
+        """
+        Reserves a slot for one request if both buckets have room.
+
+        Returns:
+            float: 0 if the slot was reserved, otherwise the seconds to wait before trying again.
+        """
+        app = self.bucket((host,), self.app_limits)
+        method_bucket = self.bucket((host, method))
+        with app.lock, method_bucket.lock:
+            now = time.monotonic()
+            wait = max(app.wait_time(now), method_bucket.wait_time(now))
+            if wait <= 0:
+                app.record(now)
+                method_bucket.record(now)
+                return 0
+            return wait
+
+    def acquire(self, host, method):
+        while True:
+            wait = self.try_acquire(host, method)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, host, method):
+        while True:
+            wait = self.try_acquire(host, method)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def update(self, host, method, headers, status_code=200):
+        now = time.monotonic()
+        for bucket, prefix in (
+            (self.bucket((host,), self.app_limits), "X-App-Rate-Limit"),
+            (self.bucket((host, method)), "X-Method-Rate-Limit"),
+        ):
+            limits = parse_rate_limit(headers.get(prefix))
+            counts = parse_rate_limit(headers.get("{}-Count".format(prefix)))
+            with bucket.lock:
+                if limits:
+                    bucket.set_limits(limits)
+                if counts:
+                    bucket.sync(counts, now)
+
+        if status_code == 429:
+            retry_after = float(headers.get("Retry-After", 1))
+            # Riot reports which limit was hit; without it, pause the whole host.
+            if headers.get("X-Rate-Limit-Type") == "method":
+                bucket = self.bucket((host, method))
+            else:
+                bucket = self.bucket((host,), self.app_limits)
+            with bucket.lock:
+                bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+
+
+rate_limiter = RateLimiter()
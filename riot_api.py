@@ -2,21 +2,87 @@ import datetime
 import logging
 import os
 import random
+import socket
+import threading
 import time
+from urllib.parse import urlsplit
 
 import pandas as pd
 import psycopg2
 import requests
+from requests.adapters import HTTPAdapter
 
+from bloom import BloomFilter
 from constants import MASS_REGIONS, REGIONS
+from crawl_state import CrawlState
+from match_cache import match_cache
+from rate_limiter import rate_limiter
+from ttl_cache import cached
 
 riot_api_key = os.getenv("RIOT_API_KEY")
 
+# Download workers lease this many match IDs at a time, for this long.
+LEASE_SECONDS = int(os.getenv("WORK_LEASE_SECONDS", "300"))
+LEASE_BATCH_SIZE = int(os.getenv("WORK_LEASE_BATCH_SIZE", "50"))
+
+# One keep-alive connection pool per Riot host (na1, euw1, americas, ...),
+# shared by every RiotAPI instance in the process.
+POOL_SIZE = int(os.getenv("RIOT_POOL_SIZE", "10"))
+_sessions = dict()
+_sessions_lock = threading.Lock()
+
+
+def get_session(host, pool_size=POOL_SIZE):
+    """
+    Returns the shared requests.Session for a Riot API host, creating it on first use.
+
+    Args:
+        host (str): The host name, e.g. "na1.api.riotgames.com".
+        pool_size (int): Maximum number of keep-alive connections kept open to the host.
+
+    Returns:
+        requests.Session: A session whose connections are reused between calls.
+    """
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+    return session
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
 
 class RiotAPI:
 
-    def __init__(self, db):
+    def __init__(
+        self,
+        db,
+        pool_size=POOL_SIZE,
+        max_retries=5,
+        bloom_capacity=None,
+        bloom_error_rate=0.001,
+    ):
         self.db = db
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.known_matches = None
+        self.lock = threading.Lock()
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.match_cache = match_cache
         self.riot_api_key = os.getenv("RIOT_API_KEY")
         self.headers = {
             "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:89.0) Gecko/20100101 Firefox/89.0",
@@ -28,6 +94,36 @@ class RiotAPI:
         self.regions = REGIONS
         self.mass_regions = MASS_REGIONS
 
+    def get(self, request_url, method):
+        """
+        Sends a GET request to the Riot API through the shared session and rate limiter.
+
+        Waits until both the app limit of the host and the limit of `method` have
+        room. A 429 answer pauses the exceeded bucket for Retry-After seconds and
+        the request is queued again, up to `self.max_retries` times.
+
+        Args:
+            request_url (str): The full request URL.
+            method (str): The Riot method the URL belongs to, e.g. "match-v5.timeline".
+
+        Returns:
+            requests.Response: The last response received.
+        """
+        host = urlsplit(request_url).netloc
+        session = get_session(host, self.pool_size)
+        for _ in range(self.max_retries + 1):
+            self.rate_limiter.acquire(host, method)
+            response = session.get(request_url, headers=self.headers)
+            self.rate_limiter.update(
+                host, method, response.headers, response.status_code
+            )
+            if response.status_code != 429:
+                break
+            logging.warning(
+                f"Rate limited on {host} ({method}), retry after {response.headers.get('Retry-After')}s"
+            )
+        return response
+
     def mass_region(self, region):
         mass_region = str()
         tagline = str()
@@ -50,7 +146,7 @@ class RiotAPI:
             request_ref, summoner_name, region
         )
 
-        response = requests.get(request_url, headers=self.headers)
+        response = self.get(request_url, "account-v1.by-riot-id")
         if response.status_code == 200:
             pass
         elif response.status_code == 404:
@@ -70,6 +166,7 @@ class RiotAPI:
         puuid = response.json().get("puuid")
         return puuid
 
+    @cached("summoner")
     def summoner_info(self, summoner_name, request_region):
         assert request_region in self.regions
         request_url = (
@@ -77,7 +174,7 @@ class RiotAPI:
                 request_region, summoner_name
             )
         )
-        response = requests.get(request_url, headers=self.headers)
+        response = self.get(request_url, "summoner-v4.by-name")
         if response.status_code != 200:
             print(
                 "{} Request error (@get_summoner_information). HTTP code {}".format(
@@ -87,6 +184,7 @@ class RiotAPI:
             return None
         return response.json()
 
+    @cached("summoner_leagues")
     def summoner_leagues(self, summonerId, region):
         assert region in self.regions
         request_url = (
@@ -94,7 +192,7 @@ class RiotAPI:
                 region, summonerId
             )
         )
-        response = requests.get(request_url, headers=self.headers)
+        response = self.get(request_url, "league-v4.entries")
         if response.status_code == 200:
             print("{} {}".format(time.strftime("%Y-%m-%d %H:%M"), response.json()))
         else:
@@ -103,6 +201,7 @@ class RiotAPI:
                     time.strftime("%Y-%m-%d %H:%M"), response.status_code
                 )
             )
+            return None
         for i in response.json():
             if i.get("leaguePoints") != 100:
                 print(
@@ -136,6 +235,7 @@ class RiotAPI:
                 )
         return response.json()
 
+    @cached("champion_mastery")
     def champion_mastery(self, puuid, region):
         """
         Retrieves the champion mastery information for a given summoner.
@@ -158,7 +258,7 @@ class RiotAPI:
         request_url = "https://{}.api.riotgames.com/lol/champion-mastery/v4/champion-masteries/by-puuid/{}".format(
             region, puuid
         )
-        response = requests.get(request_url, headers=self.headers)
+        response = self.get(request_url, "champion-mastery-v4.by-puuid")
         print("Request URL: {}".format(request_url))
         print("Response Status Code: {}".format(response.status_code))
         if response.status_code == 200:
@@ -169,6 +269,7 @@ class RiotAPI:
                     time.strftime("%Y-%m-%d %H:%M"), response.status_code
                 )
             )
+            return None
         champion_df = pd.read_csv("data/champion_ids.csv")
         print(
             "{} Total champions played: {}".format(
@@ -200,12 +301,13 @@ class RiotAPI:
             )
             return response.json()
 
+    @cached("champion_mastery_total_score")
     def champion_mastery_total_score(self, puuid, region):
         assert region in self.regions
         request_url = "https://{}.api.riotgames.com/lol/champion-mastery/v4/scores/by-puuid/{}".format(
             region, puuid
         )
-        response = requests.get(request_url, headers=self.headers)
+        response = self.get(request_url, "champion-mastery-v4.scores")
         if response.status_code == 200:
             print("{} {}".format(time.strftime("%Y-%m-%d %H:%M"), response.json()))
         else:
@@ -214,28 +316,45 @@ class RiotAPI:
                     time.strftime("%Y-%m-%d %H:%M"), response.status_code
                 )
             )
+            return None
         return response.json()
 
-    def match_ids(self, puuid, num_matches, queue_type, region):
+    def match_ids(self, puuid, num_matches, queue_type, region, stop_at=None):
+        """
+        Pages the match IDs of a player, newest first, back to `stop_at`.
+
+        Returns:
+            tuple: ([{"match_id": ...}, ...], complete). `complete` is False
+            when a request failed before paging reached the end of the
+            history, `stop_at` or `num_matches`; the list then holds only the
+            newest pages, so it must not be used as a watermark.
+        """
         logging.info(f"Getting match IDs for PUUID: {puuid}, Region: {region}")
         available_regions = ["europe", "americas", "asia"]
         if region not in available_regions:
             logging.error(f"Invalid region: {region}")
-            return []
+            return [], False
         if queue_type not in ["ranked"]:
             logging.error(f"Invalid queue type: {queue_type}")
-            return []
+            return [], False
         if not 0 <= num_matches <= 990:
             logging.error(f"Invalid number of matches: {num_matches}")
-            return []
+            return [], False
         match_ids = []
+        complete = True
         iterator = 0
         request_url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?type={queue_type}&start={iterator}&count={min(num_matches, 100)}"
         while num_matches > 0:
             logging.info(f"Request URL: {request_url}")
-            response = requests.get(request_url, headers=self.headers)
+            response = self.get(request_url, "match-v5.by-puuid")
             if response.status_code == 200:
                 matches = response.json()
+                # Newest first: everything from the last-seen match on is already known.
+                if stop_at in matches:
+                    matches = matches[: matches.index(stop_at)]
+                    num_matches = 0
+                if not matches:
+                    break
                 match_ids.extend([{"match_id": match_id} for match_id in matches])
                 num_matches -= len(matches)
                 iterator += 100
@@ -245,9 +364,10 @@ class RiotAPI:
                 logging.error(
                     f"Request failed with status {response.status_code}: {response.text}"
                 )
+                complete = False
                 break
         logging.info(f"Retrieved {len(match_ids)} match IDs.")
-        return match_ids
+        return match_ids, complete
 
     def match_info(self, match_id, region):
         available_regions = ["europe", "americas", "asia"]
@@ -256,9 +376,12 @@ class RiotAPI:
             region, match_id
         )
         print(match_id)
-        response = requests.get(request_url, headers=self.headers)
+        cached = self.match_cache.get("match", match_id)
+        if cached is not None:
+            return cached
+        response = self.get(request_url, "match-v5.match")
         if response.status_code == 200:
-            pass
+            self.match_cache.put("match", match_id, response.json())
         elif response.status_code == 429:
             print(
                 "{} Request error (@get_match_info). HTTP code {}".format(
@@ -276,9 +399,13 @@ class RiotAPI:
                 region, match_id
             )
         )
-        response = requests.get(request_url, headers=self.headers)
+        cached = self.match_cache.get("timeline", match_id)
+        if cached is not None:
+            return cached
+        response = self.get(request_url, "match-v5.timeline")
         if response.status_code == 200:
             print("{} {}".format(time.strftime("%Y-%m-%d %H:%M"), response.json()))
+            self.match_cache.put("timeline", match_id, response.json())
         else:
             print(
                 "{} Request error (@get_match_timeline). HTTP code {}".format(
@@ -304,7 +431,7 @@ class RiotAPI:
             ),
         ]
         for x in request_urls:
-            response = requests.get(x, headers=self.headers)
+            response = self.get(x, "league-v4.{}".format(x.split("/")[-3]))
             if response.status_code == 200:
                 try:
                     print(
@@ -344,51 +471,66 @@ class RiotAPI:
             )
         )
 
-        insert_query = """
-    INSERT INTO top_players (summoner_id, summoner_name, league_points, rank, wins, losses, veteran, inactive, fresh_blood, hot_streak, tier, request_region, queue)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT (summoner_id) DO NOTHING
-    """
-        for player in total_users_to_insert:
-            try:
-                db.execute_raw(
-                    insert_query,
-                    (
-                        player["summonerId"],
-                        player["summonerName"],
-                        player["leaguePoints"],
-                        player["rank"],
-                        player["wins"],
-                        player["losses"],
-                        player["veteran"],
-                        player["inactive"],
-                        player["freshBlood"],
-                        player["hotStreak"],
-                        player["tier"],
-                        player["request_region"],
-                        player["queue"],
-                    ),
+        db.bulk_insert(
+            "top_players",
+            [
+                "summoner_id",
+                "summoner_name",
+                "league_points",
+                "rank",
+                "wins",
+                "losses",
+                "veteran",
+                "inactive",
+                "fresh_blood",
+                "hot_streak",
+                "tier",
+                "request_region",
+                "queue",
+            ],
+            (
+                (
+                    player["summonerId"],
+                    player["summonerName"],
+                    player["leaguePoints"],
+                    player["rank"],
+                    player["wins"],
+                    player["losses"],
+                    player["veteran"],
+                    player["inactive"],
+                    player["freshBlood"],
+                    player["hotStreak"],
+                    player["tier"],
+                    player["request_region"],
+                    player["queue"],
                 )
-                print("[INS]: {}".format(player["summonerName"]))
-            except psycopg2.IntegrityError:
-                continue
+                for player in total_users_to_insert
+            ),
+            conflict_columns=["summoner_id"],
+        )
+        return total_users_to_insert
 
-    def extract_matches(self, region, match_id, db, key):
-        assert region in self.regions
+    def extract_matches(self, region, match_id, db):
+        # Match-v5 is served by the regional hosts (americas, europe, asia).
+        assert region in self.mass_regions
         request_url = "https://{}.api.riotgames.com/lol/match/v5/matches/{}".format(
             region, match_id
         )
 
-        response = requests.get(request_url, headers=self.headers)
-        if response.status_code != 200:
-            print(
-                "{} Request error (@extract_matches). HTTP code {}".format(
-                    time.strftime("%Y-%m-%d %H:%M"), response.status_code
+        match = self.match_cache.get("match", match_id)
+        if match is None:
+            response = self.get(request_url, "match-v5.match")
+            if response.status_code != 200:
+                print(
+                    "{} Request error (@extract_matches). HTTP code {}".format(
+                        time.strftime("%Y-%m-%d %H:%M"), response.status_code
+                    )
                 )
-            )
-            return
-        o_version = response.json().get("info").get("gameVersion")
-        o_participants = response.json().get("info").get("participants")
+                return
+            match = response.json()
+            self.match_cache.put("match", match_id, match)
+        o_version = match.get("info").get("gameVersion")
+        o_participants = match.get("info").get("participants")
 
         matchups = {
             "top": list(),
@@ -422,7 +564,7 @@ class RiotAPI:
             if len(y) != 2:
                 continue
             else:
-                match_id = response.json().get("metadata").get("matchId")
+                match_id = match.get("metadata").get("matchId")
                 to_insert_obj = {
                     "p_match_id": "{}_{}".format(match_id, x),
                     "data": y,
@@ -445,133 +587,210 @@ class RiotAPI:
                         region,
                     )
                 )
-        db.execute("UPDATE match SET processed_1v1 = 1 WHERE key = ?", (key,))
-        return response.json()
+        return match
 
     def player_list(self):
         for x in self.regions:
             for y in ["RANKED_SOLO_5x5"]:
                 self.top_players(x, y, self.db)
 
-    def match_list(self):
-        query = "SELECT * FROM player_table"
-        result_set = self.db.execute(query)
-        all_summoners = result_set.fetchall()
-
-        query = "SELECT * FROM match_table"
+    def match_list(self, state=None, resume=True):
+        """
+        Stores the match IDs of every summoner in player_table.
 
-        random.shuffle(all_summoners)
-        for x in all_summoners:
+        Progress is kept in a CrawlState: the shuffled order and position of
+        the run survive a crash, so with `resume` an interrupted run carries
+        on where it stopped; summoners crawled within the freshness window
+        are skipped; and the others are only paged back to the newest match
+        seen last time.
+        """
+        state = state or CrawlState()
+        all_summoners = sorted(
+            self.db.execute("SELECT * FROM player_table"),
+            key=lambda x: (str(x[11]), str(x[1])),
+        )
+        seed, position = state.start_run("match_list", len(all_summoners), resume)
+        random.Random(seed).shuffle(all_summoners)
+        fresh = state.fresh_keys()
+        if position:
+            print(
+                "[{}][INFO] RESUMING match_list AT {}/{}".format(
+                    time.strftime("%Y-%m-%d %H:%M"), position, len(all_summoners)
+                )
+            )
+        for index in range(position, len(all_summoners)):
+            x = all_summoners[index]
             current_summoner = x[1]
             request_region = x[11].lower()
+            if (request_region, current_summoner) in fresh:
+                continue
             print(
                 "[{}][INFO] SUMMONER {} REGION {}".format(
                     time.strftime("%Y-%m-%d %H:%M"), current_summoner, request_region
                 )
             )
-            current_summoner_puuid = self.summoner_info(
-                current_summoner, request_region.lower()
-            )
-            if current_summoner_puuid is None:
+            summoner = self.summoner_info(current_summoner, request_region.lower())
+            if summoner is None:
+                state.advance("match_list", index + 1)
                 continue
             overall_region = self.mass_region(request_region.lower())[0]
-            z_match_ids = self.match_ids(
-                current_summoner_puuid, 990, "ranked", overall_region
+            z_match_ids, complete = self.match_ids(
+                summoner.get("puuid"),
+                990,
+                "ranked",
+                overall_region,
+                stop_at=state.last_match_id(request_region, current_summoner),
             )
+            self.save_match_ids(current_summoner, z_match_ids)
+            # A partial page list would move the watermark past the pages never fetched.
+            if complete:
+                state.record(
+                    request_region,
+                    current_summoner,
+                    summoner.get("puuid"),
+                    z_match_ids[0]["match_id"] if z_match_ids else None,
+                )
+            state.advance("match_list", index + 1)
+        state.finish("match_list")
 
-            try:
-                pd_all_matches = pd.DataFrame(
-                    self.db.execute(query).fetchall()
-                ).set_axis(["match_id"], axis=1)
-                df = pd.DataFrame(z_match_ids)
-                diff = df[
-                    ~df.apply(tuple, axis=1).isin(pd_all_matches.apply(tuple, axis=1))
-                ]
+    def save_match_ids(self, current_summoner, z_match_ids):
+        """
+        Inserts the match IDs of a summoner that are not yet in match_table.
 
-                if len(df) != len(diff):
-                    print("[{}][FIX]".format(time.strftime("%Y-%m-%d %H:%M")))
-            except ValueError:
-                df = pd.DataFrame(z_match_ids)
-                diff = df
+        Only the candidate IDs are sent to the database. When the API was built
+        with `bloom_capacity`, IDs the Bloom filter has already seen are dropped
+        before that; a false positive (about `bloom_error_rate` of new IDs)
+        skips the match for this run.
 
-            if not diff.empty:
-                try:
-                    diff.to_sql(
-                        "match_table",
-                        self.db.get_connection(),
-                        if_exists="append",
-                        index=False,
-                    )
-                    print(
-                        "[{}][ADD] +{}".format(
-                            time.strftime("%Y-%m-%d %H:%M"), len(diff)
-                        )
-                    )
-                except psycopg2.IntegrityError as e:
-                    print(
-                        "[{}][DUP]: {} {}".format(
-                            time.strftime("%Y-%m-%d %H:%M"), current_summoner, e
-                        )
-                    )
-                    continue
-            else:
-                print(
-                    "[{}][INFO] UP TO DATE {}".format(
-                        time.strftime("%Y-%m-%d %H:%M"), current_summoner
-                    )
-                )
+        Args:
+            current_summoner (str): The summoner the match IDs belong to, used for logging.
+            z_match_ids (list): A list of {"match_id": ...} dicts as returned by match_ids.
 
-    def match_download_standard(self, db):
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        query = "SELECT * FROM match_table WHERE processed_1v1 != 1"
-        all_match_ids = cursor.execute(query).fetchall()
-        for x in all_match_ids:
-            overall_region, tagline = self.mass_region(x[0].split("_")[0].lower())
+        Returns:
+            list: The match IDs that were new and got inserted.
+        """
+        candidates = list(dict.fromkeys(x["match_id"] for x in z_match_ids))
+        known_matches = self.load_known_matches()
+        if known_matches is not None:
+            candidates = [x for x in candidates if x not in known_matches]
+
+        if not candidates:
             print(
-                "{} Overall Region {} detected".format(
-                    time.strftime("%Y-%m-%d %H:%M"), overall_region
+                "[{}][INFO] UP TO DATE {}".format(
+                    time.strftime("%Y-%m-%d %H:%M"), current_summoner
                 )
             )
-            self.extract_matches(overall_region, x[0], db, x[0])
+            return []
+
+        inserted = self.db.insert_missing("match_table", "match_id", candidates)
+        if known_matches is not None:
+            with self.lock:
+                known_matches.update(candidates)
+        if len(inserted) != len(candidates):
+            print("[{}][FIX]".format(time.strftime("%Y-%m-%d %H:%M")))
+        print("[{}][ADD] +{}".format(time.strftime("%Y-%m-%d %H:%M"), len(inserted)))
+        return inserted
+
+    def load_known_matches(self):
+        if self.bloom_capacity is None:
+            return None
+        with self.lock:
+            if self.known_matches is None:
+                self.known_matches = BloomFilter(
+                    self.bloom_capacity, self.bloom_error_rate
+                )
+                self.known_matches.update(
+                    self.db.iter_column("match_table", "match_id")
+                )
+            return self.known_matches
+
+    def match_download_standard(self, db):
+        return self.drain_work_queue(
+            db,
+            "match_download_standard",
+            lambda match_id, region: self.extract_matches(region, match_id, db),
+        )
 
     def match_download_detail(self, db):
         """
-        Downloads detailed match information for matches that have not been processed for 5v5 analysis.
-
-        This function queries the 'match' table in the database for match IDs that have not been processed for 5v5
-        match detail analysis (indicated by the 'processed_5v5' column not being set to 1). For each unprocessed match,
-        it determines the overall region, fetches detailed match information, and inserts it into the 'match_detail'
-        table. It also updates the 'processed_5v5' status for the match in the 'match' table to prevent reprocessing.
+        Downloads the timeline of every match that has not been processed for 5v5 analysis.
 
-        The function handles exceptions that may occur during the database operations, such as IntegrityError, which indicates a duplicate entry attempt. In such cases, it logs the error and continues with the next match ID.
+        Match IDs are leased from the "match_download_detail" work queue (pending
+        rows of match_table with processed_5v5 != 1), so any number of workers,
+        in any number of processes or hosts, can run this against the same
+        database without downloading a match twice. Each timeline is inserted
+        into match_detail, and the match is flagged once it is stored (or was
+        already there).
 
         Parameters:
             db (Database): The database object that provides a connection to the database and methods to execute database operations.
 
         Returns:
-            None
+            int: The number of matches processed by this worker.
         """
-        query = "SELECT * FROM match WHERE processed_5v5 != 1"
-        all_match_ids = db.execute(query).fetchall()
-        for x in all_match_ids:
-            overall_region, tagline = self.mass_region(x[0].split("_")[0].lower())
+
+        def download(match_id, overall_region):
+            match_detail = self.match_timeline(match_id, overall_region)
+            if not match_detail:
+                return False
+            if not db.insert_match_detail(match_detail):
+                print(
+                    "[{}][DUP]: {}".format(time.strftime("%Y-%m-%d %H:%M"), match_id)
+                )
+            return True
+
+        return self.drain_work_queue(db, "match_download_detail", download)
+
+    def drain_work_queue(
+        self, db, queue, handler, batch_size=LEASE_BATCH_SIZE, lease_seconds=LEASE_SECONDS
+    ):
+        """
+        Processes leased batches of a work queue until it is empty.
+
+        `handler(match_id, overall_region)` returns a truthy value on success;
+        the match is then flagged as processed. Failed matches keep their
+        lease until it expires, so they are retried later instead of in a hot
+        loop. Leases are renewed halfway through their lifetime, and the
+        leases of matches not yet attempted are released if the worker stops.
+
+        Returns:
+            int: The number of matches processed by this worker.
+        """
+        owner = "{}:{}:{}".format(
+            socket.gethostname(), os.getpid(), threading.get_ident()
+        )
+        processed = 0
+        while True:
+            match_ids = db.lease_work(queue, owner, batch_size, lease_seconds)
+            if not match_ids:
+                break
+            renewed_at = time.monotonic()
+            done = []
+            pending = list(match_ids)
+            try:
+                while pending:
+                    if time.monotonic() - renewed_at > lease_seconds / 2:
+                        db.renew_leases(queue, owner, pending, lease_seconds)
+                        renewed_at = time.monotonic()
+                    match_id = pending.pop(0)
+                    overall_region, _ = self.mass_region(
+                        match_id.split("_")[0].lower()
+                    )
+                    if handler(match_id, overall_region):
+                        done.append(match_id)
+            finally:
+                if done:
+                    db.complete_work(queue, owner, done)
+                if pending:
+                    db.release_leases(queue, owner, pending)
+            processed += len(done)
             print(
-                "{} Overall Region {} detected".format(
-                    time.strftime("%Y-%m-%d %H:%M"), overall_region
+                "[{}][{}] {} leased, {} done, {} total".format(
+                    time.strftime("%Y-%m-%d %H:%M"),
+                    queue,
+                    len(match_ids),
+                    len(done),
+                    processed,
                 )
             )
-            match_detail = self.match_timeline(x[0], overall_region)
-            if match_detail:
-                try:
-                    db.execute("INSERT INTO match_detail VALUES (?)", (match_detail,))
-                    db.execute(
-                        "UPDATE match SET processed_5v5 = 1 WHERE key = ?", (x[0],)
-                    )
-                except psycopg2.IntegrityError as e:
-                    print(
-                        "[{}][DUP]: {} {}".format(
-                            time.strftime("%Y-%m-%d %H:%M"), x[0], e
-                        )
-                    )
-                    continue
+        return processed
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import os
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from constants import MASS_REGIONS, REGIONS
+from match_cache import match_cache
+from rate_limiter import rate_limiter
+from ttl_cache import cached
+
+riot_api_key = os.getenv("RIOT_API_KEY")
+
+# Requests allowed in flight per routing value (na1, euw1, americas, ...).
+REGION_CONCURRENCY = int(os.getenv("RIOT_REGION_CONCURRENCY", "20"))
+
+
+class AsyncRiotAPI:
+    """
+    asyncio counterpart of riot_api.RiotAPI.
+
+    All calls share one aiohttp.ClientSession and the process-wide rate
+    limiter, and each routing value gets its own semaphore so a slow region
+    never holds up the others. Methods return the decoded JSON payload, or
+    None when Riot answers with an error.
+
+    Usage:
+        async with AsyncRiotAPI() as api:
+            summoner = await api.summoner_info("name", "na1")
+    """
+
+    def __init__(self, concurrency=REGION_CONCURRENCY, max_retries=5, executor=None):
+        self.headers = {
+            "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:89.0) Gecko/20100101 Firefox/89.0",
+            "Accept-Language": "en-US,en;q=0.5",
+            "Accept-Charset": "application/x-www-form-urlencoded; charset=UTF-8",
+            "Origin": "https://developer.riotgames.com",
+            "X-Riot-Token": riot_api_key,
+        }
+        self.regions = REGIONS
+        self.mass_regions = MASS_REGIONS
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        self.match_cache = match_cache
+        # Runs the match cache's gzip and disk I/O; None is the loop's default executor.
+        self.executor = executor
+        self.semaphores = {
+            region: asyncio.Semaphore(concurrency)
+            for region in self.regions + self.mass_regions
+        }
+        self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=0, limit_per_host=self.concurrency, ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(
+                headers=self.headers, connector=connector
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def mass_region(self, region):
+        mass_region = str()
+        tagline = str()
+        if region in ["euw1", "eun1", "ru", "tr1"]:
+            mass_region = "europe"
+        elif region in ["br1", "la1", "la2", "na1"]:
+            mass_region = "americas"
+        else:
+            mass_region = "asia"
+        if region in ["br1", "jp1", "kr", "la1", "la2", "ru", "na1", "tr1", "oc1"]:
+            tagline = region.upper()
+        elif region == "euw1":
+            tagline = "EUW"
+        elif region == "eun1":
+            tagline = "EUNE"
+        return mass_region, tagline
+
+    async def get(self, region, request_url, method):
+        """
+        Sends a GET request under the semaphore of `region` and the shared rate limiter.
+
+        Args:
+            region (str): The routing value the URL targets, e.g. "na1" or "americas".
+            request_url (str): The full request URL.
+            method (str): The Riot method the URL belongs to, e.g. "match-v5.timeline".
+
+        Returns:
+            The decoded JSON body, or None if the request failed.
+        """
+        await self.open()
+        host = urlsplit(request_url).netloc
+        async with self.semaphores[region]:
+            for _ in range(self.max_retries + 1):
+                await self.rate_limiter.acquire_async(host, method)
+                async with self.session.get(request_url) as response:
+                    self.rate_limiter.update(
+                        host, method, response.headers, response.status
+                    )
+                    if response.status == 200:
+                        return await response.json()
+                    if response.status != 429:
+                        logging.error(
+                            f"Request error (@{method}). HTTP code {response.status}: {request_url}"
+                        )
+                        return None
+                logging.warning(
+                    f"Rate limited on {host} ({method}), retry after {response.headers.get('Retry-After')}s"
+                )
+        return None
+
+    async def cached_get(self, endpoint, match_id, region, request_url, method):
+        loop = asyncio.get_running_loop()
+        payload = await loop.run_in_executor(
+            self.executor, self.match_cache.get, endpoint, match_id
+        )
+        if payload is not None:
+            return payload
+        payload = await self.get(region, request_url, method)
+        if payload is not None:
+            await loop.run_in_executor(
+                self.executor, self.match_cache.put, endpoint, match_id, payload
+            )
+        return payload
+
+    async def account_riot_id(self, request_ref, summoner_name, region):
+        request_url = "https://{}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{}/{}".format(
+            request_ref, summoner_name, region
+        )
+        response = await self.get(request_ref, request_url, "account-v1.by-riot-id")
+        if response is None:
+            return None
+        return response.get("puuid")
+
+    @cached("summoner")
+    async def summoner_info(self, summoner_name, request_region):
+        assert request_region in self.regions
+        request_url = (
+            "https://{}.api.riotgames.com/lol/summoner/v4/summoners/by-name/{}".format(
+                request_region, summoner_name
+            )
+        )
+        return await self.get(request_region, request_url, "summoner-v4.by-name")
+
+    @cached("summoner_leagues")
+    async def summoner_leagues(self, summonerId, region):
+        assert region in self.regions
+        request_url = (
+            "https://{}.api.riotgames.com/lol/league/v4/entries/by-summoner/{}".format(
+                region, summonerId
+            )
+        )
+        return await self.get(region, request_url, "league-v4.entries")
+
+    @cached("champion_mastery")
+    async def champion_mastery(self, puuid, region):
+        assert region in self.regions
+        request_url = "https://{}.api.riotgames.com/lol/champion-mastery/v4/champion-masteries/by-puuid/{}".format(
+            region, puuid
+        )
+        return await self.get(region, request_url, "champion-mastery-v4.by-puuid")
+
+    @cached("champion_mastery_total_score")
+    async def champion_mastery_total_score(self, puuid, region):
+        assert region in self.regions
+        request_url = "https://{}.api.riotgames.com/lol/champion-mastery/v4/scores/by-puuid/{}".format(
+            region, puuid
+        )
+        return await self.get(region, request_url, "champion-mastery-v4.scores")
+
+    async def match_ids(self, puuid, num_matches, queue_type, region):
+        match_ids = []
+        async for page in self.iter_match_ids(puuid, num_matches, queue_type, region):
+            match_ids.extend([{"match_id": match_id} for match_id in page])
+        return match_ids
+
+    async def iter_match_ids(self, puuid, num_matches, queue_type, region):
+        """
+        Yields the match IDs of a player one page (up to 100 IDs) at a time, as Riot returns them.
+        """
+        if region not in self.mass_regions:
+            logging.error(f"Invalid region: {region}")
+            return
+        if queue_type not in ["ranked"]:
+            logging.error(f"Invalid queue type: {queue_type}")
+            return
+        if not 0 <= num_matches <= 990:
+            logging.error(f"Invalid number of matches: {num_matches}")
+            return
+        iterator = 0
+        while num_matches > 0:
+            request_url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?type={queue_type}&start={iterator}&count={min(num_matches, 100)}"
+            matches = await self.get(region, request_url, "match-v5.by-puuid")
+            if matches is None:
+                break
+            if matches:
+                yield matches
+            if len(matches) < min(num_matches, 100):
+                break
+            num_matches -= len(matches)
+            iterator += 100
+
+    async def match_info(self, match_id, region):
+        assert region in self.mass_regions
+        request_url = "https://{}.api.riotgames.com/lol/match/v5/matches/{}".format(
+            region, match_id
+        )
+        return await self.cached_get(
+            "match", match_id, region, request_url, "match-v5.match"
+        )
+
+    async def match_timeline(self, match_id, region):
+        assert region in self.mass_regions
+        request_url = (
+            "https://{}.api.riotgames.com/lol/match/v5/matches/{}/timeline".format(
+                region, match_id
+            )
+        )
+        return await self.cached_get(
+            "timeline", match_id, region, request_url, "match-v5.timeline"
+        )
+
+    async def top_players(self, region, queue):
+        """
+        Fetches the Challenger, Grandmaster and Master ladders of a region concurrently.
+
+        Returns:
+            list: Every ladder entry, tagged with its tier, request_region and queue.
+        """
+        assert region in self.regions
+        assert queue in ["RANKED_SOLO_5x5"]
+        leagues = ["challengerleagues", "grandmasterleagues", "masterleagues"]
+        responses = await asyncio.gather(
+            *[
+                self.get(
+                    region,
+                    "https://{}.api.riotgames.com/lol/league/v4/{}/by-queue/{}".format(
+                        region, league, queue
+                    ),
+                    "league-v4.{}".format(league),
+                )
+                for league in leagues
+            ]
+        )
+        total_users = list()
+        for response in responses:
+            if not response:
+                continue
+            for entry in response.get("entries", []):
+                entry["tier"] = response.get("tier")
+                entry["request_region"] = region
+                entry["queue"] = queue
+                total_users.append(entry)
+        return total_users
@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import os
+import sys
+import unittest
+import zlib
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api_responses import CompressionMiddleware, brotli, negotiate_encoding  # noqa: E402
+
+
+class TestNegotiateEncoding(unittest.TestCase):
+    def test_preference(self):
+        self.assertEqual(negotiate_encoding("gzip"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip;q=1.0, br;q=0.5"), "gzip")
+        self.assertEqual(negotiate_encoding("deflate, identity"), None)
+        self.assertEqual(negotiate_encoding(""), None)
+
+    def test_zero_quality_refuses(self):
+        self.assertEqual(negotiate_encoding("gzip;q=0"), None)
+        self.assertEqual(negotiate_encoding("*, gzip;q=0, br;q=0"), None)
+
+    def test_names_are_case_insensitive(self):
+        self.assertEqual(negotiate_encoding("GZIP; Q=0.7"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip;Q=0"), None)
+
+    def test_extra_params_keep_the_quality(self):
+        self.assertEqual(negotiate_encoding("gzip;level=9"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip ; foo=bar ; q=0.8"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip;q=0.5;foo=bar"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip;foo=bar;q=0"), None)
+
+    def test_malformed_quality_refuses_that_coding(self):
+        self.assertEqual(negotiate_encoding("gzip;q=high"), None)
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_wins_ties(self):
+        self.assertEqual(negotiate_encoding("gzip, br"), "br")
+        self.assertEqual(negotiate_encoding("*"), "br")
+        self.assertEqual(negotiate_encoding("br;q=0.5, gzip;q=0.9"), "gzip")
+        self.assertEqual(negotiate_encoding("br;mode=text;q=0.9, gzip;q=0.5"), "br")
+
+
+def run(middleware, messages, accept_encoding="gzip"):
+    scope = {
+        "type": "http",
+        "headers": [(b"accept-encoding", accept_encoding.encode())]
+        if accept_encoding
+        else [],
+    }
+    sent = []
+
+    async def app(scope, receive, send):
+        for message in messages:
+            await send(message)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(app)(scope, None, send))
+    headers = {k.decode(): v.decode() for k, v in sent[0]["headers"]}
+    return headers, [message["body"] for message in sent[1:]]
+
+
+def start(content_type="application/json", length=None, **extra):
+    headers = [(b"content-type", content_type.encode())]
+    if length is not None:
+        headers.append((b"content-length", str(length).encode()))
+    headers.extend((k.encode(), v.encode()) for k, v in extra.items())
+    return {"type": "http.response.start", "status": 200, "headers": headers}
+
+
+def body(data, more_body=False):
+    return {"type": "http.response.body", "body": data, "more_body": more_body}
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    def middleware(self, minimum_size=100):
+        return lambda app: CompressionMiddleware(app, minimum_size=minimum_size)
+
+    def test_small_bodies_pass_through(self):
+        data = b"x" * 99
+        headers, bodies = run(self.middleware(), [start(length=99), body(data)])
+        self.assertNotIn("content-encoding", headers)
+        self.assertEqual(bodies, [data])
+
+    def test_bodies_at_the_threshold_are_compressed(self):
+        data = b'{"a": 1}' * 50
+        headers, bodies = run(
+            self.middleware(minimum_size=len(data)), [start(length=len(data)), body(data)]
+        )
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertEqual(headers["content-length"], str(len(bodies[0])))
+        self.assertIn("Accept-Encoding", headers["vary"])
+        self.assertEqual(gzip.decompress(bodies[0]), data)
+
+    def test_other_types_and_encoded_bodies_pass_through(self):
+        data = b"x" * 1000
+        for response_start, encoding in [
+            (start("image/png", length=1000), None),
+            (start(length=1000, **{"content-encoding": "br"}), "br"),
+        ]:
+            headers, bodies = run(self.middleware(), [response_start, body(data)])
+            self.assertEqual(headers.get("content-encoding"), encoding)
+            self.assertEqual(bodies, [data])
+
+    def test_without_accept_encoding_nothing_changes(self):
+        data = b"x" * 1000
+        headers, bodies = run(
+            self.middleware(), [start(length=1000), body(data)], accept_encoding=None
+        )
+        self.assertNotIn("content-encoding", headers)
+        self.assertEqual(bodies, [data])
+
+    def test_streamed_chunks_are_flushed_one_by_one(self):
+        lines = [b'{"match_id": "NA1_%d"}\n' % i for i in range(3)]
+        headers, bodies = run(
+            self.middleware(),
+            [
+                start("application/x-ndjson"),
+                body(lines[0], more_body=True),
+                body(lines[1], more_body=True),
+                body(lines[2]),
+            ],
+        )
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", headers)
+        # Every chunk decodes on its own as soon as it arrives.
+        decoder = zlib.decompressobj(31)
+        for line, chunk in zip(lines, bodies):
+            self.assertEqual(decoder.decompress(chunk), line)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawl_state import CrawlState  # noqa: E402
+
+
+class TestStartRun(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.state = CrawlState(
+            path=os.path.join(self.dir.name, "crawl_state.db"),
+            legacy_checkpoint=os.path.join(self.dir.name, "missing.json"),
+        )
+
+    def tearDown(self):
+        self.state.conn.close()
+        self.dir.cleanup()
+
+    def test_resumes_over_the_same_items(self):
+        seed, position = self.state.start_run("match_list", 100)
+        self.assertEqual(position, 0)
+        self.state.advance("match_list", 40)
+        self.assertEqual(self.state.start_run("match_list", 100), (seed, 40))
+
+    def test_restarts_when_the_item_count_changed(self):
+        self.state.start_run("match_list", 100)
+        self.state.advance("match_list", 40)
+        _, position = self.state.start_run("match_list", 120)
+        self.assertEqual(position, 0)
+        # The new run is the one resumed from now on.
+        self.state.advance("match_list", 10)
+        self.assertEqual(self.state.start_run("match_list", 120)[1], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
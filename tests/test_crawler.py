@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from crawl_state import CrawlState  # noqa: E402
+from crawler import CrawlEngine  # noqa: E402
+
+
+class FakeDatabase:
+    def __init__(self, players):
+        self.players = players
+
+    def execute(self, query, params=None):
+        # player_table rows: summoner name at 1, request region at 11.
+        return [(None, name) + (None,) * 9 + (region,) for region, name in self.players]
+
+
+class FakeAPI:
+    def __init__(self, players):
+        self.db = FakeDatabase(players)
+        self.saved = []
+        self.lock = threading.Lock()
+
+    def mass_region(self, region):
+        if region in ("na1", "br1", "la1", "la2", "oc1"):
+            return ("americas",)
+        return ("asia",) if region in ("jp1", "kr") else ("europe",)
+
+    def summoner_info(self, summoner_name, region):
+        if summoner_name == "broken-summoner":
+            raise ValueError("summoner lookup failed")
+        return {"puuid": "puuid-" + summoner_name}
+
+    def match_ids(self, puuid, num_matches, queue_type, region, stop_at=None):
+        if puuid == "puuid-broken-matches":
+            raise ValueError("match list failed")
+        if puuid == "puuid-partial":
+            # The first page came back, a later one failed.
+            return [{"match_id": "NA1_9"}], False
+        return [{"match_id": "NA1_1"}], True
+
+    def save_match_ids(self, summoner_name, match_ids):
+        with self.lock:
+            self.saved.append(summoner_name)
+
+
+class TestMatchList(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.state = CrawlState(
+            path=os.path.join(self.dir.name, "crawl_state.db"),
+            legacy_checkpoint=os.path.join(self.dir.name, "missing.json"),
+        )
+
+    def tearDown(self):
+        self.state.conn.close()
+        self.dir.cleanup()
+
+    def test_failed_items_are_counted_and_the_lanes_keep_draining(self):
+        api = FakeAPI(
+            [
+                ("na1", "broken-summoner"),
+                ("na1", "broken-matches"),
+                ("na1", "a"),
+                ("br1", "b"),
+                ("euw1", "c"),
+            ]
+        )
+        engine = CrawlEngine(api, state=self.state, report_every=1)
+        crawl = threading.Thread(target=engine.match_list, daemon=True)
+        crawl.start()
+        crawl.join(timeout=30)
+        self.assertFalse(crawl.is_alive(), "a crawl lane never finished")
+
+        self.assertEqual(sorted(api.saved), ["a", "b", "c"])
+        self.assertEqual(engine.stats["na1"].errors, 1)
+        self.assertEqual(engine.stats["americas"].errors, 1)
+        self.assertEqual(engine.stats["americas"].items, 2)
+
+    def test_partial_page_list_keeps_the_old_watermark(self):
+        self.state.record("na1", "partial", "puuid-partial", "NA1_5")
+        self.state.record("na1", "a", "puuid-a", "NA1_0")
+        self.state.flush()
+        # Both were crawled long ago, so neither is fresh.
+        self.state.conn.execute("UPDATE summoners SET last_crawled = 0")
+        api = FakeAPI([("na1", "partial"), ("na1", "a")])
+        CrawlEngine(api, state=self.state, report_every=1).match_list()
+
+        self.assertEqual(sorted(api.saved), ["a", "partial"])
+        self.assertEqual(self.state.last_match_id("na1", "partial"), "NA1_5")
+        self.assertEqual(self.state.last_match_id("na1", "a"), "NA1_1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from test_database_pg import PostgresTestCase, make_timeline  # noqa: E402
+
+
+class TestAsyncMatchDetail(PostgresTestCase):
+    def fetch(self, *match_ids):
+        from database_async import AsyncDatabase
+
+        async def run():
+            adb = AsyncDatabase()
+            try:
+                rows = [await adb.fetch_match_detail(match_id) for match_id in match_ids]
+                streamed = [row async for row in adb.iter_match_details(list(match_ids))]
+            finally:
+                await adb.close()
+            return rows, streamed
+
+        return asyncio.run(run())
+
+    def test_inserted_timeline_round_trips(self):
+        timeline = make_timeline("NA1_200")
+        self.db.insert_match_detail(timeline)
+
+        rows, streamed = self.fetch("NA1_200", "NA1_404")
+        self.assertIsNone(rows[1])
+        self.assertEqual(rows[0]["match_id"], "NA1_200")
+        self.assertEqual(self.database_pg.decode_timeline(rows[0][0]), timeline)
+        self.assertEqual([row["match_id"] for row in streamed], ["NA1_200"])
+        self.assertEqual(self.database_pg.decode_timeline(streamed[0][0]), timeline)
+
+
+if __name__ == "__main__":
+    unittest.main()
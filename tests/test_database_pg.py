@@ -0,0 +1,248 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from timeline_frames import build_frames  # noqa: E402
+
+# Scratch database the tests may freely wipe; the tests are skipped without it.
+TEST_DB_NAME = os.getenv("TEST_DB_NAME")
+
+
+def make_timeline(match_id, frames=3):
+    return {
+        "metadata": {"matchId": match_id},
+        "info": {
+            "frames": [
+                {
+                    "timestamp": i * 60000,
+                    "participantFrames": {
+                        str(p): {
+                            "participantId": p,
+                            "level": 1 + i,
+                            "xp": 280 * i,
+                            "totalGold": 500 + 300 * i,
+                            "minionsKilled": 6 * i,
+                        }
+                        for p in range(1, 11)
+                    },
+                    "events": [{"type": "GAME_END", "winningTeam": 100}]
+                    if i == frames - 1
+                    else [],
+                }
+                for i in range(frames)
+            ]
+        },
+    }
+
+
+@unittest.skipUnless(TEST_DB_NAME, "TEST_DB_NAME is not set")
+class PostgresTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.environ["DB_NAME"] = TEST_DB_NAME
+        import database_pg
+
+        cls.database_pg = database_pg
+        cls.db = database_pg.Database(None)
+        cls.db.migrate()
+
+    def setUp(self):
+        with self.db.get_connection() as connection:
+            connection.cursor().execute(
+                "TRUNCATE match_detail, predictor, predictor_liveclient, "
+                "performance_table, top_players"
+            )
+
+    def count(self, query, params=None):
+        with self.db.get_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchone()[0]
+
+
+class TestExecute(PostgresTestCase):
+    def test_rows_are_fetched_before_the_connection_is_returned(self):
+        self.assertIsNone(
+            self.db.execute(
+                "INSERT INTO match_detail (match_id, key) VALUES (%s, %s)",
+                ("NA1_1", "NA1_1"),
+            )
+        )
+        self.assertEqual(self.db.execute("SELECT match_id FROM match_detail"), [("NA1_1",)])
+
+
+class TestMatchDetail(PostgresTestCase):
+    def test_insert_sets_match_id_key_and_timeline(self):
+        timeline = make_timeline("NA1_100")
+        self.assertTrue(self.db.insert_match_detail(timeline))
+        self.assertFalse(self.db.insert_match_detail(timeline))
+        with self.db.get_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT match_id, key, timeline FROM match_detail")
+            rows = cursor.fetchall()
+        self.assertEqual(len(rows), 1)
+        match_id, key, stored = rows[0]
+        self.assertEqual((match_id, key), ("NA1_100", "NA1_100"))
+        self.assertEqual(self.database_pg.decode_timeline(stored), timeline)
+
+
+class TestBulkInsert(PostgresTestCase):
+    def test_ladder_refresh_updates_players_in_place(self):
+        columns = ["summoner_id", "summoner_name", "league_points"]
+        for league_points in (100, 250):
+            self.db.bulk_insert(
+                "top_players",
+                columns,
+                [("id-1", "a", league_points), ("id-2", "b", league_points)],
+                conflict_columns=["summoner_id"],
+            )
+        self.assertEqual(
+            self.db.execute(
+                "SELECT summoner_id, league_points FROM top_players ORDER BY summoner_id"
+            ),
+            [("id-1", 250), ("id-2", 250)],
+        )
+
+
+class TestPerformance(PostgresTestCase):
+    def test_stored_matches_are_scored_into_snake_case_columns(self):
+        path = os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "dev",
+            "lol_dev",
+            "lol_optimizer",
+            "data",
+            "gameb0x_NA1_4914398785.txt",
+        )
+        with open(path, "r") as f:
+            payload = json.load(f)
+        match = payload.get("data", payload)
+        self.db.insert_match_detail(match)
+        performance = self.database_pg.ProcessPerformance(self.db)
+
+        self.assertEqual(performance.process_match_details(["NA1_4914398785"]), 1)
+        self.assertEqual(performance.process_match_details(["NA1_4914398785"]), 0)
+        rows = self.db.execute(
+            "SELECT champion_name, item_0, summoner_1_casts, time_ccing_others "
+            "FROM performance_table ORDER BY participant_id"
+        )
+        participant = match["info"]["participants"][0]
+        self.assertEqual(
+            rows[0],
+            (
+                participant["championName"],
+                participant["item0"],
+                participant["summoner1Casts"],
+                participant["timeCCingOthers"],
+            ),
+        )
+
+
+class TestBackfill(PostgresTestCase):
+    def test_legacy_rows_are_backfilled_in_committed_batches(self):
+        legacy = json.dumps(make_timeline("NA1_1"))
+        with self.db.get_connection() as connection:
+            connection.cursor().executemany(
+                "INSERT INTO match_detail (match_id) VALUES (%s)",
+                [(legacy,), ("NA1_2",), (json.dumps(make_timeline("NA1_2")),)],
+            )
+        with self.db.get_connection() as connection:
+            connection.set_session(autocommit=True)
+            try:
+                self.database_pg.backfill_match_detail(connection.cursor(), batch_size=1)
+            finally:
+                connection.set_session(autocommit=False)
+        self.assertEqual(
+            self.db.execute("SELECT match_id, key FROM match_detail ORDER BY match_id"),
+            [("NA1_1", "NA1_1"), ("NA1_2", "NA1_2")],
+        )
+        self.assertEqual(
+            self.database_pg.decode_timeline(
+                self.db.execute(
+                    "SELECT timeline FROM match_detail WHERE match_id = 'NA1_1'"
+                )[0][0]
+            ),
+            make_timeline("NA1_1"),
+        )
+
+
+class TestPredictor(PostgresTestCase):
+    def test_second_run_adds_no_frames(self):
+        for match_id in ("NA1_1", "NA1_2", "NA1_3"):
+            self.db.insert_match_detail(make_timeline(match_id))
+
+        self.assertEqual(self.db.process_predictor(chunk_size=2), 3)
+        frames = self.count("SELECT COUNT(*) FROM predictor")
+        self.assertEqual(frames, 3 * 3 * 10)
+        self.assertEqual(
+            self.count("SELECT COUNT(*) FROM match_detail WHERE classifier_processed = 1"),
+            3,
+        )
+
+        self.assertEqual(self.db.process_predictor(chunk_size=2), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM predictor"), frames)
+
+    def test_timeline_written_twice_inserts_frames_once(self):
+        timeline = make_timeline("NA1_1")
+        self.db.insert_match_detail(timeline)
+        written = []
+        for _ in range(2):
+            with self.db.get_connection() as connection:
+                written.append(
+                    self.db.write_predictor_chunk(
+                        connection,
+                        "predictor",
+                        "classifier_processed",
+                        self.database_pg.build_final_object,
+                        [("NA1_1", timeline)],
+                    )
+                )
+        self.assertEqual(written, [1, 0])
+        self.assertEqual(self.count("SELECT COUNT(*) FROM predictor"), 3 * 10)
+
+    def test_parallel_run_flags_what_it_builds(self):
+        for match_id in ("NA1_1", "NA1_2", "NA1_3", "NA1_4", "NA1_5"):
+            self.db.insert_match_detail(make_timeline(match_id))
+
+        self.assertEqual(self.db.process_predictor_parallel(workers=2, chunk_size=2), 5)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM predictor"), 5 * 3 * 10)
+
+        self.assertEqual(self.db.process_predictor_parallel(workers=2, chunk_size=2), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM predictor"), 5 * 3 * 10)
+
+    def test_unbuildable_timelines_are_flagged(self):
+        self.db.insert_match_detail(make_timeline("NA1_1"))
+        self.db.insert_match_detail(make_timeline("NA1_2", frames=0))
+        self.db.insert_match_detail(make_timeline("NA1_3", frames=0))
+
+        self.assertEqual(self.db.process_predictor_parallel(workers=2, chunk_size=1), 3)
+        self.assertEqual(self.db.process_predictor(chunk_size=2), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM predictor"), 3 * 10)
+
+    def test_worker_skips_matches_claimed_by_another_writer(self):
+        self.db.insert_match_detail(make_timeline("NA1_1"))
+        self.db.insert_match_detail(make_timeline("NA1_2"))
+        self.assertEqual(
+            self.database_pg.predictor_worker(
+                "predictor", "classifier_processed", build_frames, ["NA1_1"]
+            )[1],
+            1,
+        )
+        with self.db.get_connection() as connection:
+            # A shard read before another writer flagged NA1_1.
+            rows = [("NA1_1", make_timeline("NA1_1")), ("NA1_2", make_timeline("NA1_2"))]
+            self.assertEqual(
+                self.db.write_predictor_chunk(
+                    connection, "predictor", "classifier_processed", build_frames, rows
+                ),
+                1,
+            )
+        self.assertEqual(self.count("SELECT COUNT(*) FROM predictor"), 2 * 3 * 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
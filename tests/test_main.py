@@ -0,0 +1,34 @@
+import importlib.util
+import os
+import sys
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@unittest.skipUnless(importlib.util.find_spec("httpx"), "TestClient needs httpx")
+class TestStreamMatchList(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+
+        import main
+
+        # No startup: invalid requests must be rejected before any I/O.
+        cls.client = TestClient(main.app)
+
+    def test_invalid_parameters_are_rejected_before_streaming(self):
+        for query, detail in [
+            ("region=na1", "Invalid region"),
+            ("queue_type=normal", "Invalid queue type"),
+            ("num_matches=991", "Invalid number of matches"),
+            ("num_matches=-1", "Invalid number of matches"),
+        ]:
+            with self.subTest(query=query):
+                response = self.client.get("/summoner/match_list/puuid/stream?" + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"detail": detail})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from match_cache import MatchCache  # noqa: E402
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+class TestMatchCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_index_is_built_on_first_use(self):
+        MatchCache(self.dir.name).put("match", "NA1_1", {"id": 1})
+        cache = MatchCache(self.dir.name)
+        self.assertFalse(cache.loaded)
+        self.assertEqual(cache.get("match", "NA1_1"), {"id": 1})
+        self.assertTrue(cache.loaded)
+
+    def test_cap_covers_every_process_sharing_the_directory(self):
+        payload = {"frames": [os.urandom(16).hex() for _ in range(50)]}
+        max_bytes = 20000
+        first = MatchCache(self.dir.name, max_bytes=max_bytes)
+        second = MatchCache(self.dir.name, max_bytes=max_bytes)
+        for i in range(40):
+            (first if i % 2 else second).put("match", "NA1_{}".format(i), payload)
+        entry = os.path.getsize(first.path("match", "NA1_39"))
+        # Each process may overshoot by 10% of the cap plus one entry between scans.
+        self.assertLessEqual(
+            directory_size(self.dir.name), max_bytes + 2 * (max_bytes * 0.1 + entry)
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    1,
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "dev", "lol_dev", "lol_optimizer")
+    ),
+)
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+else:
+    from read_data import export_table, load  # noqa: E402
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TestRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.dir.name, "export")
+        self.conn = sqlite3.connect(os.path.join(self.dir.name, "lol.db"))
+
+    def tearDown(self):
+        self.conn.close()
+        self.dir.cleanup()
+
+    def test_unpartitioned_table(self):
+        self.conn.execute(
+            "CREATE TABLE performance_table (championName TEXT, kills INTEGER)"
+        )
+        self.conn.executemany(
+            "INSERT INTO performance_table VALUES (?, ?)", [("Ahri", 3), ("Zed", 7)]
+        )
+        export_table(self.conn, "performance_table", self.out)
+        df = load("performance_table", out_dir=self.out)
+        self.assertEqual(list(df.columns), ["championName", "kills"])
+        self.assertEqual(
+            sorted(df.itertuples(index=False, name=None)), [("Ahri", 3), ("Zed", 7)]
+        )
+
+    def test_partitioned_table_widened_across_runs(self):
+        self.conn.execute("CREATE TABLE match_table (match_id TEXT, score INTEGER)")
+        self.conn.execute("INSERT INTO match_table VALUES ('NA1_1', 1)")
+        export_table(self.conn, "match_table", self.out)
+        self.conn.execute("INSERT INTO match_table VALUES ('EUW1_2', 2.5)")
+        export_table(self.conn, "match_table", self.out)
+        df = load("match_table", out_dir=self.out).sort_values("match_id")
+        self.assertEqual(list(df["match_id"]), ["EUW1_2", "NA1_1"])
+        self.assertEqual(list(df["score"]), [2.5, 1.0])
+        self.assertEqual(list(df["region"]), ["euw1", "na1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
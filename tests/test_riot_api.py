@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from riot_api import RiotAPI  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = ""
+
+    def json(self):
+        return self.payload
+
+
+def paged_api(*responses):
+    api = RiotAPI(None)
+    pages = iter(responses)
+    api.get = lambda request_url, method: next(pages)
+    return api
+
+
+class TestMatchIds(unittest.TestCase):
+    def test_failed_page_reports_incomplete(self):
+        first_page = ["NA1_{}".format(i) for i in range(300, 200, -1)]
+        api = paged_api(FakeResponse(200, first_page), FakeResponse(503))
+        match_ids, complete = api.match_ids("puuid", 300, "ranked", "americas")
+        self.assertEqual([x["match_id"] for x in match_ids], first_page)
+        self.assertFalse(complete)
+
+    def test_stop_at_reports_complete(self):
+        api = paged_api(FakeResponse(200, ["NA1_3", "NA1_2", "NA1_1"]))
+        match_ids, complete = api.match_ids(
+            "puuid", 300, "ranked", "americas", stop_at="NA1_2"
+        )
+        self.assertEqual(match_ids, [{"match_id": "NA1_3"}])
+        self.assertTrue(complete)
+
+    def test_end_of_history_reports_complete(self):
+        api = paged_api(FakeResponse(200, ["NA1_2", "NA1_1"]), FakeResponse(200, []))
+        match_ids, complete = api.match_ids("puuid", 300, "ranked", "americas")
+        self.assertEqual(len(match_ids), 2)
+        self.assertTrue(complete)
+
+
+if __name__ == "__main__":
+    unittest.main()
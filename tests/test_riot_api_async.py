@@ -0,0 +1,51 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from riot_api_async import AsyncRiotAPI  # noqa: E402
+
+
+class RecordingCache:
+    def __init__(self):
+        self.stored = dict()
+        self.threads = []
+
+    def get(self, endpoint, match_id):
+        self.threads.append(threading.get_ident())
+        return self.stored.get((endpoint, match_id))
+
+    def put(self, endpoint, match_id, payload):
+        self.threads.append(threading.get_ident())
+        self.stored[(endpoint, match_id)] = payload
+
+
+class TestCachedGet(unittest.TestCase):
+    def test_cache_io_runs_off_the_event_loop(self):
+        api = AsyncRiotAPI()
+        api.match_cache = RecordingCache()
+        requests = []
+
+        async def get(region, request_url, method):
+            requests.append(request_url)
+            return {"metadata": {"matchId": "NA1_1"}}
+
+        api.get = get
+
+        async def run():
+            first = await api.match_info("NA1_1", "americas")
+            second = await api.match_info("NA1_1", "americas")
+            return threading.get_ident(), first, second
+
+        loop_thread, first, second = asyncio.run(run())
+        self.assertEqual(first, second)
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(len(api.match_cache.threads), 3)
+        self.assertNotIn(loop_thread, api.match_cache.threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import glob
+import json
+import os
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(1, ROOT)
+
+from database_pg import build_final_object  # noqa: E402
+from timeline_frames import FIELDS, build_frames, timelines_to_table  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, "dev", "lol_dev", "lol_optimizer", "data")
+
+
+def sample_timelines(limit=3):
+    timelines = []
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "*_timeline.txt")))[:limit]:
+        with open(path, "r") as f:
+            payload = json.load(f)
+        timelines.append(payload.get("data", payload))
+    return timelines
+
+
+def incomplete_timeline():
+    # Participant 1 is complete, 2 has no damageStats, 3 has a partial
+    # championStats, 4 is missing from the frame, the rest have neither section.
+    participant_frames = {
+        "1": {
+            "participantId": 1,
+            "level": 2,
+            "xp": 300,
+            "championStats": {field: 1 for field in FIELDS},
+            "damageStats": {"totalDamageDone": 10, "totalDamageTaken": 5},
+        },
+        "2": {"participantId": 2, "level": 3, "championStats": {"armor": 20}},
+        "3": {
+            "participantId": 3,
+            "championStats": {"armor": 20},
+            "damageStats": {"totalDamageDone": 1, "totalDamageTaken": 2},
+        },
+    }
+    for participant_id in range(5, 11):
+        participant_frames[str(participant_id)] = {"participantId": participant_id}
+    return {
+        "metadata": {"matchId": "NA1_1"},
+        "info": {
+            "frames": [
+                {
+                    "timestamp": 60000,
+                    "participantFrames": participant_frames,
+                    "events": [{"type": "GAME_END", "winningTeam": 200}],
+                }
+            ]
+        },
+    }
+
+
+class TestBuildFrames(unittest.TestCase):
+    def test_matches_build_final_object(self):
+        timelines = sample_timelines()
+        self.assertTrue(timelines, "no sample timelines in " + DATA_DIR)
+        for timeline in timelines:
+            self.assertEqual(build_frames(timeline), build_final_object(timeline))
+
+    def test_incomplete_frames_match_build_final_object(self):
+        timeline = incomplete_timeline()
+        self.assertEqual(build_frames(timeline), build_final_object(timeline))
+
+    def test_unbuildable_timeline(self):
+        self.assertIsNone(build_frames({"metadata": {}}))
+        self.assertIsNone(
+            build_frames({"metadata": {"matchId": "NA1_1"}, "info": {"frames": []}})
+        )
+
+
+class TestTimelinesToTable(unittest.TestCase):
+    def test_matches_build_final_object(self):
+        timelines = sample_timelines()
+        table = timelines_to_table(timelines)
+        expected = [row for timeline in timelines for row in build_final_object(timeline)]
+        self.assertEqual(list(table["identifier"]), [row["identifier"] for row in expected])
+        self.assertEqual(list(table["timestamp"]), [row["timestamp"] for row in expected])
+        self.assertEqual(list(table["winner"]), [row["winner"] for row in expected])
+        for values, row in zip(table["values"].tolist(), expected):
+            self.assertEqual(values, [row[field] for field in FIELDS])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import ttl_cache  # noqa: E402
+from ttl_cache import TTLCache, cached  # noqa: E402
+
+
+class Client:
+    def __init__(self, results=None):
+        self.calls = 0
+        self.results = results
+
+    @cached("summoner")
+    def summoner_info(self, summoner_name, request_region="na1"):
+        self.calls += 1
+        if self.results is not None:
+            return self.results.pop(0)
+        return {"name": summoner_name, "region": request_region}
+
+    @cached("summoner_leagues")
+    async def summoner_leagues(self, summonerId, region):
+        self.calls += 1
+        return [summonerId, region]
+
+
+class TestCached(unittest.TestCase):
+    def setUp(self):
+        ttl_cache.ttl_cache = TTLCache()
+
+    def test_positional_and_keyword_calls_share_an_entry(self):
+        client = Client()
+        first = client.summoner_info("faker", "kr")
+        self.assertEqual(client.summoner_info(summoner_name="faker", request_region="kr"), first)
+        self.assertEqual(client.summoner_info("faker", request_region="kr"), first)
+        self.assertEqual(client.calls, 1)
+
+    def test_defaults_are_part_of_the_key(self):
+        client = Client()
+        client.summoner_info("faker")
+        client.summoner_info("faker", "na1")
+        client.summoner_info("faker", "kr")
+        self.assertEqual(client.calls, 2)
+
+    def test_async_keyword_calls(self):
+        client = Client()
+
+        async def run():
+            return [
+                await client.summoner_leagues("id", "kr"),
+                await client.summoner_leagues(summonerId="id", region="kr"),
+            ]
+
+        self.assertEqual(asyncio.run(run()), [["id", "kr"], ["id", "kr"]])
+        self.assertEqual(client.calls, 1)
+
+    def test_none_is_not_cached(self):
+        client = Client(results=[None, {"name": "faker"}])
+        self.assertIsNone(client.summoner_info("faker", "kr"))
+        self.assertEqual(client.summoner_info("faker", "kr"), {"name": "faker"})
+        self.assertEqual(client.calls, 2)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_waiters_get_the_leader_exception(self):
+        cache = TTLCache()
+        started = threading.Event()
+
+        def loader():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError("upstream failed")
+
+        errors = []
+
+        def call():
+            try:
+                cache.get_or_load("summoner", ("faker",), loader)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        waiters = [threading.Thread(target=call) for _ in range(3)]
+        for thread in waiters:
+            thread.start()
+        for thread in [leader, *waiters]:
+            thread.join()
+
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(cache.stats["summoner"].coalesced, 3)
+        self.assertNotIn(("summoner", ("faker",)), cache.entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
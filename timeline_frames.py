@@ -0,0 +1,299 @@
+"""
+Columnar extraction of match timelines.
+
+database_pg.build_final_object turns every participant of every frame into
+its own dict through extract_frame_data. This module reads the same fields
+into NumPy arrays instead: one timeline becomes a (frames x participants x
+fields) float array, built in a single pass with C-level itemgetters over a
+precompiled field map and converted to NumPy once. Missing values are NaN.
+
+build_frames uses the same itemgetters to produce the frame dicts of
+build_final_object, and is the builder the predictor tables are filled with.
+"""
+
+import time
+from operator import itemgetter
+
+import numpy as np
+
+NUM_PARTICIPANTS = 10
+
+# (output name, participant frame section or None, key), in column order.
+FIELD_MAP = [
+    ("participantId", None, "participantId"),
+    ("level", None, "level"),
+    ("xp", None, "xp"),
+    ("totalGold", None, "totalGold"),
+    ("minionsKilled", None, "minionsKilled"),
+    ("jungleMinionsKilled", None, "jungleMinionsKilled"),
+    ("timeEnemySpentControlled", None, "timeEnemySpentControlled"),
+    ("abilityPower", "championStats", "abilityPower"),
+    ("armor", "championStats", "armor"),
+    ("attackDamage", "championStats", "attackDamage"),
+    ("attackSpeed", "championStats", "attackSpeed"),
+    ("health", "championStats", "health"),
+    ("healthMax", "championStats", "healthMax"),
+    ("healthRegen", "championStats", "healthRegen"),
+    ("magicResist", "championStats", "magicResist"),
+    ("movementSpeed", "championStats", "movementSpeed"),
+    ("power", "championStats", "power"),
+    ("powerMax", "championStats", "powerMax"),
+    ("powerRegen", "championStats", "powerRegen"),
+    ("totalDamageDealt", "damageStats", "totalDamageDone"),
+    ("totalDamageTaken", "damageStats", "totalDamageTaken"),
+]
+
+FIELDS = [name for name, _, _ in FIELD_MAP]
+
+
+def compile_field_map(field_map):
+    """
+    Groups the field map by section into itemgetters, in column order.
+
+    Fields of one section must be contiguous in `field_map`.
+
+    Returns:
+        list: (section, output names, keys, getter) tuples.
+    """
+    compiled = []
+    for name, section, key in field_map:
+        if compiled and compiled[-1][0] == section:
+            compiled[-1][1].append(name)
+            compiled[-1][2].append(key)
+        else:
+            compiled.append((section, [name], [key]))
+    return [
+        (
+            section,
+            names,
+            keys,
+            itemgetter(*keys) if len(keys) > 1 else (lambda d, k=keys[0]: (d[k],)),
+        )
+        for section, names, keys in compiled
+    ]
+
+
+COMPILED_FIELD_MAP = compile_field_map(FIELD_MAP)
+PARTICIPANT_KEYS = [str(participant_id) for participant_id in range(1, 11)]
+EMPTY_ROW = (None,) * len(FIELD_MAP)
+
+
+def extract_row(participant_frame):
+    # Slow path for frames with missing sections or keys.
+    row = []
+    for section, _, keys, _ in COMPILED_FIELD_MAP:
+        source = (
+            participant_frame if section is None else participant_frame.get(section)
+        ) or {}
+        row.extend(source.get(key) for key in keys)
+    return tuple(row)
+
+
+def timeline_winner(timeline):
+    try:
+        return timeline["info"]["frames"][-1]["events"][-1].get("winningTeam")
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def timeline_to_arrays(timeline):
+    """
+    Extracts one timeline into NumPy arrays.
+
+    Args:
+        timeline (dict): A match-v5 timeline payload.
+
+    Returns:
+        dict: With keys
+            - match_id (str)
+            - timestamps: int64 array of shape (frames,)
+            - values: float64 array of shape (frames, 10, len(FIELDS))
+            - winner: int8 array of shape (10,), 1 for the participants of the winning team
+        or None if the timeline has no frames.
+    """
+    try:
+        match_id = timeline["metadata"]["matchId"]
+        frames = timeline["info"]["frames"]
+    except (KeyError, TypeError):
+        return None
+    if not frames:
+        return None
+
+    # FIELD_MAP is laid out as participant frame, championStats, damageStats.
+    (_, _, _, top), (_, _, _, champion), (_, _, _, damage) = COMPILED_FIELD_MAP
+    rows = []
+    timestamps = np.empty(len(frames), dtype=np.int64)
+    for f, frame in enumerate(frames):
+        timestamps[f] = frame.get("timestamp", 0)
+        participant_frames = frame.get("participantFrames") or {}
+        for key in PARTICIPANT_KEYS:
+            participant_frame = participant_frames.get(key)
+            if not participant_frame:
+                rows.append(EMPTY_ROW)
+                continue
+            try:
+                rows.append(
+                    top(participant_frame)
+                    + champion(participant_frame["championStats"])
+                    + damage(participant_frame["damageStats"])
+                )
+            except (KeyError, TypeError):
+                rows.append(extract_row(participant_frame))
+    values = np.array(rows, dtype=np.float64).reshape(
+        len(frames), NUM_PARTICIPANTS, len(FIELD_MAP)
+    )
+
+    winner = timeline_winner(timeline)
+    team = np.array([100] * 5 + [200] * 5)
+    return {
+        "match_id": match_id,
+        "timestamps": timestamps,
+        "values": values,
+        "winner": (team == winner).astype(np.int8),
+    }
+
+
+def frame_dict(timestamp, participant_frame):
+    # Slow path of build_frames: a missing section is left out, a missing key is None.
+    data = {"timestamp": timestamp}
+    for section, names, keys, _ in COMPILED_FIELD_MAP:
+        source = participant_frame if section is None else participant_frame.get(section)
+        if section is None or source:
+            data.update(zip(names, (source.get(key) for key in keys)))
+    return data
+
+
+def build_frames(timeline):
+    """
+    Builds the predictor frames of one timeline, as database_pg.build_final_object does.
+
+    Each present participant of each frame becomes a dict of FIELDS plus
+    timestamp, identifier and winner. Values keep their JSON types.
+
+    Returns:
+        list: The frame dicts, or None if the timeline has no match ID or frames.
+    """
+    try:
+        match_id = timeline["metadata"]["matchId"]
+        frames = timeline["info"]["frames"]
+    except (KeyError, TypeError):
+        return None
+    if not frames:
+        return None
+
+    (_, _, _, top), (_, _, _, champion), (_, _, _, damage) = COMPILED_FIELD_MAP
+    keys = ["timestamp", *FIELDS, "identifier", "winner"]
+    winner = timeline_winner(timeline)
+    participants = []
+    for key in PARTICIPANT_KEYS:
+        team = 100 if int(key) <= 5 else 200
+        participants.append((key, f"{match_id}_{key}", 1 if winner == team else 0))
+    all_frames = []
+    for frame in frames:
+        timestamp = frame.get("timestamp")
+        participant_frames = frame.get("participantFrames") or {}
+        for key, identifier, won in participants:
+            participant_frame = participant_frames.get(key)
+            if not participant_frame:
+                continue
+            try:
+                row = (
+                    (timestamp,)
+                    + top(participant_frame)
+                    + champion(participant_frame["championStats"])
+                    + damage(participant_frame["damageStats"])
+                    + (identifier, won)
+                )
+                all_frames.append(dict(zip(keys, row)))
+            except (KeyError, TypeError):
+                data = frame_dict(timestamp, participant_frame)
+                data["identifier"] = identifier
+                data["winner"] = won
+                all_frames.append(data)
+    return all_frames
+
+
+def timelines_to_table(timelines):
+    """
+    Batch API: extracts many timelines into one flat table.
+
+    Each row is one (match, frame, participant). Rows for participants that
+    are missing from a frame are dropped, as build_final_object does.
+
+    Args:
+        timelines (iterable): match-v5 timeline payloads.
+
+    Returns:
+        dict: With keys
+            - identifier: object array of "<matchId>_<participantId>"
+            - timestamp: int64 array
+            - winner: int8 array
+            - values: float64 array of shape (rows, len(FIELDS))
+            - fields: the column names of `values`
+    """
+    identifiers, timestamps, winners, values = [], [], [], []
+    for timeline in timelines:
+        arrays = timeline_to_arrays(timeline)
+        if arrays is None:
+            continue
+        frames = len(arrays["timestamps"])
+        flat = arrays["values"].reshape(frames * NUM_PARTICIPANTS, len(FIELD_MAP))
+        present = ~np.isnan(flat[:, 0])
+        participant_ids = np.tile(np.arange(1, NUM_PARTICIPANTS + 1), frames)
+        identifiers.append(
+            np.char.add(arrays["match_id"] + "_", participant_ids.astype(str))[present]
+        )
+        timestamps.append(np.repeat(arrays["timestamps"], NUM_PARTICIPANTS)[present])
+        winners.append(np.tile(arrays["winner"], frames)[present])
+        values.append(flat[present])
+
+    if not values:
+        return {
+            "identifier": np.empty(0, dtype=object),
+            "timestamp": np.empty(0, dtype=np.int64),
+            "winner": np.empty(0, dtype=np.int8),
+            "values": np.empty((0, len(FIELD_MAP))),
+            "fields": FIELDS,
+        }
+    return {
+        "identifier": np.concatenate(identifiers).astype(object),
+        "timestamp": np.concatenate(timestamps),
+        "winner": np.concatenate(winners),
+        "values": np.concatenate(values),
+        "fields": FIELDS,
+    }
+
+
+def benchmark(timelines, repeat=5):
+    """
+    Times the dict-based build_final_object path against build_frames and timelines_to_table.
+
+    Returns:
+        dict: Seconds per pass for each path and the number of rows produced.
+    """
+    from database_pg import build_final_object
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = sum(len(build_final_object(t) or []) for t in timelines)
+    dict_seconds = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows_frames = sum(len(build_frames(t) or []) for t in timelines)
+    frames_seconds = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        table = timelines_to_table(timelines)
+    columnar_seconds = (time.perf_counter() - start) / repeat
+
+    return {
+        "timelines": len(timelines),
+        "rows_dict": rows,
+        "rows_frames": rows_frames,
+        "rows_columnar": len(table["values"]),
+        "dict_seconds": dict_seconds,
+        "frames_seconds": frames_seconds,
+        "columnar_seconds": columnar_seconds,
+    }
@@ -0,0 +1,198 @@
+"""
+Optional compressed storage for match_detail timelines.
+
+Timelines are large and very repetitive (the same keys in every frame of
+every match), so a zstd dictionary trained on sample payloads compresses
+them far better than zstd alone. With TIMELINE_STORAGE=zstd new timelines
+are written as dictionary-compressed blobs; with the default "json" they
+are written as JSON text as before.
+
+Reads are transparent in both modes: decode_timeline accepts a decoded
+JSON value, JSON text or bytes, or a zstd frame, so tables holding a mix of
+old and migrated rows can be read without knowing which is which.
+
+zstandard is only needed to write or read compressed rows.
+"""
+
+import json
+import os
+import threading
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+TIMELINE_STORAGE = os.getenv("TIMELINE_STORAGE", "json")
+TIMELINE_DICT_PATH = os.getenv(
+    "TIMELINE_DICT_PATH", os.path.join("data", "timeline.zdict")
+)
+TIMELINE_ZSTD_LEVEL = int(os.getenv("TIMELINE_ZSTD_LEVEL", "9"))
+DICT_SIZE = 112 * 1024
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def require_zstd():
+    if zstd is None:
+        raise RuntimeError(
+            "zstandard is not installed; it is required for compressed timelines"
+        )
+
+
+def split_samples(payload):
+    """
+    Splits one payload into dictionary training samples.
+
+    A timeline yields one sample per frame, since the dictionary only needs to
+    learn the repeated structure; any other payload is one sample.
+    """
+    frames = None
+    if isinstance(payload, dict):
+        frames = (payload.get("info") or {}).get("frames")
+    if not frames:
+        return [json.dumps(payload, separators=(",", ":")).encode()]
+    samples = [
+        json.dumps(frame, separators=(",", ":")).encode() for frame in frames
+    ]
+    samples.append(
+        json.dumps(
+            {k: v for k, v in payload.items() if k != "info"}, separators=(",", ":")
+        ).encode()
+    )
+    return samples
+
+
+def train_dictionary(payloads, dict_size=DICT_SIZE):
+    """
+    Trains a zstd dictionary on sample payloads.
+
+    Args:
+        payloads (iterable): Timelines (or other Riot payloads) as dicts.
+        dict_size (int): Maximum dictionary size in bytes.
+
+    Returns:
+        zstandard.ZstdCompressionDict: The trained dictionary.
+    """
+    require_zstd()
+    samples = [sample for payload in payloads for sample in split_samples(payload)]
+    return zstd.train_dictionary(dict_size, samples)
+
+
+def save_dictionary(dictionary, path=TIMELINE_DICT_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(dictionary.as_bytes())
+    os.replace(path + ".tmp", path)
+
+
+def load_dictionary(path=TIMELINE_DICT_PATH):
+    require_zstd()
+    with open(path, "rb") as f:
+        return zstd.ZstdCompressionDict(f.read())
+
+
+class TimelineCodec:
+    """
+    Encodes timelines to dictionary-compressed zstd frames and back.
+
+    zstandard compressors are not thread-safe, so each thread gets its own
+    compressor and decompressor.
+    """
+
+    def __init__(self, dictionary=None, level=TIMELINE_ZSTD_LEVEL):
+        require_zstd()
+        self.dictionary = dictionary
+        self.level = level
+        self.local = threading.local()
+
+    def compressor(self):
+        if not hasattr(self.local, "compressor"):
+            if self.dictionary is None:
+                self.local.compressor = zstd.ZstdCompressor(level=self.level)
+            else:
+                self.local.compressor = zstd.ZstdCompressor(
+                    level=self.level, dict_data=self.dictionary
+                )
+        return self.local.compressor
+
+    def decompressor(self):
+        if not hasattr(self.local, "decompressor"):
+            if self.dictionary is None:
+                self.local.decompressor = zstd.ZstdDecompressor()
+            else:
+                self.local.decompressor = zstd.ZstdDecompressor(
+                    dict_data=self.dictionary
+                )
+        return self.local.decompressor
+
+    def compress(self, timeline):
+        if not isinstance(timeline, (bytes, str)):
+            timeline = json.dumps(timeline, separators=(",", ":"))
+        if isinstance(timeline, str):
+            timeline = timeline.encode()
+        return self.compressor().compress(timeline)
+
+    def decompress(self, blob):
+        return json.loads(self.decompressor().decompress(blob))
+
+
+codec_lock = threading.Lock()
+default_codec = None
+
+
+def get_codec():
+    """
+    Returns the process-wide codec, loading TIMELINE_DICT_PATH if it exists.
+    """
+    global default_codec
+    with codec_lock:
+        if default_codec is None:
+            dictionary = None
+            if os.path.exists(TIMELINE_DICT_PATH):
+                dictionary = load_dictionary(TIMELINE_DICT_PATH)
+            default_codec = TimelineCodec(dictionary)
+        return default_codec
+
+
+def encode_timeline(timeline, storage=None):
+    """
+    Encodes a timeline for an INSERT into match_detail.
+
+    Returns:
+        bytes | str: A zstd frame when the storage mode is "zstd", JSON text otherwise.
+    """
+    storage = storage or TIMELINE_STORAGE
+    if storage == "zstd":
+        return get_codec().compress(timeline)
+    if isinstance(timeline, (bytes, str)):
+        return timeline
+    return json.dumps(timeline)
+
+
+def is_compressed(value):
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(
+        value[:4]
+    ) == ZSTD_MAGIC
+
+
+def decode_timeline(value):
+    """
+    Decodes a match_detail timeline column, whatever its storage.
+
+    Args:
+        value: A decoded JSON value (psycopg2 json/jsonb), JSON text or bytes,
+            or a zstd frame (bytes, or memoryview from a bytea column).
+
+    Returns:
+        dict: The timeline, or the value itself if it is already decoded.
+    """
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if is_compressed(value):
+        return get_codec().decompress(value)
+    if isinstance(value, (bytes, bytearray, str)):
+        return json.loads(value)
+    return value
@@ -0,0 +1,182 @@
+import asyncio
+import functools
+import inspect
+import threading
+import time
+
+# Seconds a lookup stays fresh, per endpoint.
+DEFAULT_TTLS = {
+    "summoner": 300,
+    "summoner_leagues": 60,
+    "champion_mastery": 300,
+    "champion_mastery_total_score": 300,
+}
+
+
+class EndpointStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def as_dict(self):
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+class TTLCache:
+    """
+    In-process TTL cache for mutable Riot lookups, with single-flight loading.
+
+    Concurrent misses for the same (endpoint, key) share one upstream call:
+    the first caller loads, the others wait for its result, or get its
+    exception raised. Failed loads (None or an exception) are not cached.
+    Hit, miss and coalesced counters are kept per endpoint.
+    """
+
+    def __init__(self, ttls=None, max_entries=10000):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.entries = dict()
+        self.in_flight = dict()
+        self.async_in_flight = dict()
+        self.stats = dict()
+        self.lock = threading.Lock()
+
+    def endpoint_stats(self, endpoint):
+        stats = self.stats.get(endpoint)
+        if stats is None:
+            stats = self.stats.setdefault(endpoint, EndpointStats())
+        return stats
+
+    def lookup(self, cache_key, now):
+        entry = self.entries.get(cache_key)
+        if entry is not None and entry[0] > now:
+            return entry
+        return None
+
+    def store(self, endpoint, cache_key, value):
+        if value is None:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries = {
+                    k: v for k, v in self.entries.items() if v[0] > now
+                }
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[cache_key] = (now + self.ttls.get(endpoint, 60), value)
+
+    def get_or_load(self, endpoint, key, loader):
+        cache_key = (endpoint, key)
+        stats = self.endpoint_stats(endpoint)
+        with self.lock:
+            entry = self.lookup(cache_key, time.monotonic())
+            if entry is not None:
+                stats.hits += 1
+                return entry[1]
+            flight = self.in_flight.get(cache_key)
+            if flight is None:
+                flight = {"event": threading.Event(), "value": None, "error": None}
+                self.in_flight[cache_key] = flight
+                leader = True
+                stats.misses += 1
+            else:
+                leader = False
+                stats.coalesced += 1
+
+        if not leader:
+            flight["event"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["value"]
+
+        try:
+            flight["value"] = loader()
+            self.store(endpoint, cache_key, flight["value"])
+            return flight["value"]
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(cache_key, None)
+            flight["event"].set()
+
+    async def get_or_load_async(self, endpoint, key, loader):
+        cache_key = (endpoint, key)
+        stats = self.endpoint_stats(endpoint)
+        entry = self.lookup(cache_key, time.monotonic())
+        if entry is not None:
+            stats.hits += 1
+            return entry[1]
+        future = self.async_in_flight.get(cache_key)
+        if future is not None:
+            stats.coalesced += 1
+            return await asyncio.shield(future)
+
+        stats.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.async_in_flight[cache_key] = future
+        try:
+            value = await loader()
+            self.store(endpoint, cache_key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        finally:
+            self.async_in_flight.pop(cache_key, None)
+
+    def report(self):
+        return {endpoint: stats.as_dict() for endpoint, stats in self.stats.items()}
+
+
+ttl_cache = TTLCache()
+
+
+def cached(endpoint):
+    """
+    Caches a RiotAPI / AsyncRiotAPI method in the shared TTL cache under `endpoint`.
+
+    The arguments of the call, bound to the method's signature with defaults
+    applied, form the cache key, so positional and keyword calls share entries.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def cache_key(self, args, kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            return tuple(bound.arguments.values())[1:]
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                return await ttl_cache.get_or_load_async(
+                    endpoint,
+                    cache_key(self, args, kwargs),
+                    lambda: func(self, *args, **kwargs),
+                )
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            return ttl_cache.get_or_load(
+                endpoint,
+                cache_key(self, args, kwargs),
+                lambda: func(self, *args, **kwargs),
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,101 @@
+"""
+Benchmark for JSON response rendering and compression.
+
+Loads a real Riot payload and times how long it takes to turn it into a
+response body three ways: FastAPI's default path (jsonable_encoder, then
+JSONResponse), JSONResponse alone and api_responses.FastJSONResponse. It
+then shows the bytes on the wire and the time taken to compress the body
+with the gzip and brotli settings used by api_responses.CompressionMiddleware.
+
+Usage:
+    python utils/bench_json_responses.py --payload data/lol_responses/match_data.json --repeat 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api_responses import (  # noqa: E402
+    BROTLI_QUALITY,
+    GZIP_LEVEL,
+    Compressor,
+    FastJSONResponse,
+    brotli,
+    orjson,
+)
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--payload", default=os.path.join("data", "lol_responses", "match_data.json")
+    )
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.payload, "r") as f:
+        payload = json.load(f)
+    print(
+        "{} | orjson {} | brotli {}".format(
+            args.payload,
+            "yes" if orjson is not None else "no",
+            "yes" if brotli is not None else "no",
+        )
+    )
+
+    renderers = {
+        "fastapi default": lambda: JSONResponse(jsonable_encoder(payload)).body,
+        "JSONResponse": lambda: JSONResponse(payload).body,
+        "FastJSONResponse": lambda: FastJSONResponse(payload).body,
+    }
+    baseline = None
+    for label, render in renderers.items():
+        body, ms = timed(render, args.repeat)
+        baseline = baseline or ms
+        print(
+            "{:<17} {:>8.3f} ms | {:>8} bytes | {:.1f}x".format(
+                label, ms, len(body), baseline / ms
+            )
+        )
+
+    body = FastJSONResponse(payload).body
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    print("{:<17} {:>8.3f} ms | {:>8} bytes".format("identity", 0.0, len(body)))
+    for encoding in encodings:
+
+        def compress():
+            compressor = Compressor(encoding)
+            return compressor.compress(body) + compressor.finish()
+
+        compressed, ms = timed(compress, args.repeat)
+        print(
+            "{:<17} {:>8.3f} ms | {:>8} bytes | {:.1f}x smaller".format(
+                "{} ({})".format(
+                    encoding,
+                    "level {}".format(GZIP_LEVEL)
+                    if encoding == "gzip"
+                    else "quality {}".format(BROTLI_QUALITY),
+                ),
+                ms,
+                len(compressed),
+                len(body) / len(compressed),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
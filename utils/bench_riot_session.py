@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for the pooled RiotAPI transport.
+
+Starts a local HTTP/1.1 stub that answers every GET with a small JSON body,
+then times N sequential requests made with a bare requests.get (new
+connection per call) against the same requests made through the shared
+riot_api session (keep-alive, one pool per host).
+
+Usage:
+    python utils/bench_riot_session.py --requests 500
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from riot_api import close_sessions, get_session  # noqa: E402
+
+BODY = b'{"puuid": "stub", "summonerLevel": 30}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(label, get, url, total):
+    start = time.perf_counter()
+    for _ in range(total):
+        get(url).json()
+    elapsed = time.perf_counter() - start
+    print(
+        "{:<10} {:>6} requests in {:.3f}s | {:.3f} ms/request".format(
+            label, total, elapsed, elapsed / total * 1000
+        )
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = "127.0.0.1:{}".format(server.server_address[1])
+    url = "http://{}/lol/summoner/v4/summoners/by-name/stub".format(host)
+
+    bare = run("bare", requests.get, url, args.requests)
+    pooled = run("pooled", get_session(host).get, url, args.requests)
+    print(
+        "Per-request overhead removed: {:.3f} ms ({:.1f}x)".format(
+            (bare - pooled) / args.requests * 1000, bare / pooled
+        )
+    )
+
+    close_sessions()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmarks timeline_frames against the dict-based build_final_object.
+
+Loads the sample timelines in dev/lol_dev/lol_optimizer/data and reports the
+time per pass of each path.
+
+Usage:
+    python utils/bench_timeline_frames.py --repeat 5
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(1, ROOT)
+
+from timeline_frames import benchmark  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, "dev", "lol_dev", "lol_optimizer", "data")
+
+
+def load_timelines(data_dir):
+    timelines = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "*_timeline.txt"))):
+        with open(path, "r") as f:
+            payload = json.load(f)
+        timelines.append(payload.get("data", payload))
+    return timelines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    timelines = load_timelines(args.data_dir)
+    result = benchmark(timelines, args.repeat)
+    print(
+        "{} timelines | dict: {} rows in {:.3f}s | build_frames: {} rows in {:.3f}s ({:.1f}x) "
+        "| columnar: {} rows in {:.3f}s ({:.1f}x)".format(
+            result["timelines"],
+            result["rows_dict"],
+            result["dict_seconds"],
+            result["rows_frames"],
+            result["frames_seconds"],
+            result["dict_seconds"] / result["frames_seconds"],
+            result["rows_columnar"],
+            result["columnar_seconds"],
+            result["dict_seconds"] / result["columnar_seconds"],
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmarks the match_detail timeline storage modes.
+
+Loads the sample timelines in dev/lol_dev/lol_optimizer/data, trains a
+dictionary on all but one of them (the held-out timeline shows how the
+dictionary does on unseen matches), then reports for plain JSON, zstd and
+dictionary zstd:
+    - the compression ratio
+    - encode and decode throughput
+    - write and read throughput through a scratch SQLite match_detail table
+
+Usage:
+    python utils/bench_timeline_storage.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(1, ROOT)
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_timeline_frames import DATA_DIR, load_timelines  # noqa: E402
+import timeline_store  # noqa: E402
+from timeline_store import (  # noqa: E402
+    TimelineCodec,
+    decode_timeline,
+    train_dictionary,
+)
+
+
+class JsonCodec:
+    def compress(self, timeline):
+        return json.dumps(timeline)
+
+    def decompress(self, value):
+        return json.loads(value)
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def bench_codec(codec, timelines, repeat):
+    encoded, encode_seconds = timed(
+        lambda: [codec.compress(t) for t in timelines], repeat
+    )
+    _, decode_seconds = timed(lambda: [codec.decompress(e) for e in encoded], repeat)
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE match_detail (content)")
+
+    def write():
+        conn.execute("DELETE FROM match_detail")
+        conn.executemany(
+            "INSERT INTO match_detail VALUES (?)",
+            [(codec.compress(t),) for t in timelines],
+        )
+        conn.commit()
+
+    def read():
+        return [
+            decode_timeline(row[0])
+            for row in conn.execute("SELECT content FROM match_detail")
+        ]
+
+    _, write_seconds = timed(write, repeat)
+    _, read_seconds = timed(read, repeat)
+    conn.close()
+    return sum(len(e) for e in encoded), {
+        "encode": encode_seconds,
+        "decode": decode_seconds,
+        "write": write_seconds,
+        "read": read_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--level", type=int, default=9)
+    args = parser.parse_args()
+
+    timelines = load_timelines(args.data_dir)
+    raw_mb = sum(len(json.dumps(t)) for t in timelines) / 1024**2
+    dictionary = train_dictionary(timelines[1:])
+    print(
+        "{} timelines, {:.1f} MB of JSON, {} byte dictionary".format(
+            len(timelines), raw_mb, len(dictionary.as_bytes())
+        )
+    )
+
+    codecs = [
+        ("json", JsonCodec()),
+        ("zstd", TimelineCodec(level=args.level)),
+        ("zstd+dict", TimelineCodec(dictionary, level=args.level)),
+    ]
+    for label, codec in codecs:
+        # decode_timeline must see the codec's dictionary.
+        timeline_store.default_codec = codec if label != "json" else None
+        size, seconds = bench_codec(codec, timelines, args.repeat)
+        held_out = len(codec.compress(timelines[0]))
+        print(
+            "{:<10} ratio {:>5.1f}x (held-out {:>5.1f}x) | encode {:>6.1f} MB/s "
+            "| decode {:>6.1f} MB/s | write {:>6.1f} MB/s | read {:>6.1f} MB/s".format(
+                label,
+                raw_mb * 1024**2 / size,
+                len(json.dumps(timelines[0])) / held_out,
+                raw_mb / seconds["encode"],
+                raw_mb / seconds["decode"],
+                raw_mb / seconds["write"],
+                raw_mb / seconds["read"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Checks that the work-queue queries are served by their indexes.
+
+Applies any pending migration, then runs EXPLAIN for every query in
+database_pg.QUERY_PLAN_CHECKS and exits non-zero if one of them does not
+use its index. Connects with the same DB_* environment variables as
+database_pg.
+
+Usage:
+    python utils/check_query_plans.py
+"""
+
+import os
+import sys
+
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database_pg import Database  # noqa: E402
+
+
+def main():
+    db = Database(os.getenv("DATABASE_URL"))
+    db.migrate()
+    print("Schema version {}".format(db.schema_version()))
+    failed = 0
+    for index_name, query, passed, nodes in db.check_query_plans():
+        print(
+            "{} {:<36} {}".format(
+                "PASS" if passed else "FAIL", index_name, " > ".join(nodes)
+            )
+        )
+        if not passed:
+            print("     {}".format(query))
+            failed += 1
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Load test for the FastAPI server in main.py.
+
+Starts a local Riot API stub that answers every request after a fixed
+delay, serves main.app from a single uvicorn worker with every Riot URL
+pointed at the stub, and runs N concurrent clients against the summoner
+and match list endpoints. Summoner names are unique per request, so the
+lookup cache never answers for the stub. Prints latency percentiles and
+throughput per endpoint.
+
+To compare two revisions, check the older one out in a worktree and point
+--app-dir at it:
+
+    git worktree add /tmp/before HEAD~1
+    python utils/load_test_api.py --app-dir /tmp/before
+    python utils/load_test_api.py
+
+Usage:
+    python utils/load_test_api.py --clients 200 --duration 20 --riot-latency 0.05
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import web
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STUB_HEADERS = {
+    "X-App-Rate-Limit": "1000000:1",
+    "X-Method-Rate-Limit": "1000000:1",
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_stub(port, latency):
+    async def handler(request):
+        await asyncio.sleep(latency)
+        if "/ids" in request.path:
+            count = int(request.query.get("count", 20))
+            payload = ["NA1_{}".format(i) for i in range(count)]
+        else:
+            name = request.path.rsplit("/", 1)[-1]
+            payload = {"id": name, "puuid": name, "name": name, "summonerLevel": 30}
+        return web.json_response(payload, headers=STUB_HEADERS)
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+def serve_api(app_dir, port, stub_port):
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    os.environ.setdefault("RIOT_API_KEY", "stub")
+    stub = "http://127.0.0.1:{}".format(stub_port)
+
+    def rewrite(request_url):
+        parts = urlsplit(request_url)
+        return stub + parts.path + ("?" + parts.query if parts.query else "")
+
+    # Every Riot client of the revision under test is pointed at the stub.
+    import rate_limiter
+    import riot_api
+
+    rate_limiter.rate_limiter.app_limits = [(1000000, 1)]
+    sync_get = riot_api.RiotAPI.get
+    riot_api.RiotAPI.get = lambda self, request_url, method: sync_get(
+        self, rewrite(request_url), method
+    )
+    try:
+        import riot_api_async
+    except ImportError:
+        riot_api_async = None
+    if riot_api_async is not None:
+        async_get = riot_api_async.AsyncRiotAPI.get
+        riot_api_async.AsyncRiotAPI.get = lambda self, region, request_url, method: (
+            async_get(self, region, rewrite(request_url), method)
+        )
+
+    import uvicorn
+
+    import main
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("{} did not come up".format(url))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def load(base_url, clients, duration):
+    endpoints = {
+        "summoner": lambda n: "/summoner/load{}?region=na1".format(n),
+        "match_list": lambda n: "/summoner/match_list/load{}?region=americas&num_matches=20".format(
+            n
+        ),
+    }
+    latencies = {name: [] for name in endpoints}
+    errors = {name: 0 for name in endpoints}
+    counter = iter(range(10**9))
+    deadline = time.monotonic() + duration
+    connector = aiohttp.TCPConnector(limit=0)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def client(client_id):
+            names = list(endpoints)
+            i = client_id
+            while time.monotonic() < deadline:
+                name = names[i % len(names)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    async with session.get(
+                        base_url + endpoints[name](next(counter))
+                    ) as response:
+                        body = await response.read()
+                        # Handlers report failures as {"error": ...} with a 200.
+                        if response.status != 200 or body.startswith(b'{"error"'):
+                            errors[name] += 1
+                            continue
+                except aiohttp.ClientError:
+                    errors[name] += 1
+                    continue
+                latencies[name].append(time.perf_counter() - start)
+
+        await asyncio.gather(*[client(i) for i in range(clients)])
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app-dir", default=REPO_DIR)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--riot-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    stub_port, api_port = free_port(), free_port()
+    processes = [
+        multiprocessing.Process(
+            target=serve_stub, args=(stub_port, args.riot_latency), daemon=True
+        ),
+        multiprocessing.Process(
+            target=serve_api,
+            args=(os.path.abspath(args.app_dir), api_port, stub_port),
+            daemon=True,
+        ),
+    ]
+    for process in processes:
+        process.start()
+    base_url = "http://127.0.0.1:{}".format(api_port)
+    try:
+        asyncio.run(wait_for(base_url + "/"))
+        latencies, errors = asyncio.run(load(base_url, args.clients, args.duration))
+    finally:
+        for process in processes:
+            process.terminate()
+
+    print(
+        "{} | {} clients | {:.0f}s | Riot stub latency {:.0f} ms".format(
+            args.app_dir, args.clients, args.duration, args.riot_latency * 1000
+        )
+    )
+    for name, values in latencies.items():
+        values.sort()
+        print(
+            "{:<11} {:>7} ok {:>5} err | {:>8.1f} req/s | p50 {:>7.1f} ms | p95 {:>7.1f} ms | p99 {:>7.1f} ms | max {:>7.1f} ms".format(
+                name,
+                len(values),
+                errors[name],
+                len(values) / args.duration,
+                percentile(values, 50) * 1000,
+                percentile(values, 95) * 1000,
+                percentile(values, 99) * 1000,
+                (values[-1] if values else 0.0) * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
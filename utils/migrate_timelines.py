@@ -0,0 +1,238 @@
+"""
+Migrates existing match_detail timelines to zstd-compressed blobs.
+
+--train builds the zstd dictionary first, from a sample of the stored
+timelines plus the payloads in data/lol_responses, and writes it to
+TIMELINE_DICT_PATH. The migration then rewrites every uncompressed row in
+batches, committing after each one; rows that are already compressed are
+skipped, so an interrupted run can simply be restarted. --revert writes
+JSON back.
+
+Timelines live in match_detail.timeline, which is BYTEA on Postgres
+(migration 5 of database_pg), so JSON and zstd rows can sit side by side.
+SQLite files created before that column existed keep the timeline in the
+first column, which is used instead.
+
+Usage:
+    python utils/migrate_timelines.py --backend sqlite --db lol_gpt_v3.db --train
+    python utils/migrate_timelines.py --backend pg --batch-size 500
+    python utils/migrate_timelines.py --backend sqlite --db lol_gpt_v3.db --revert
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(1, ROOT)
+
+import timeline_store  # noqa: E402
+from timeline_store import (  # noqa: E402
+    decode_timeline,
+    is_compressed,
+    save_dictionary,
+    train_dictionary,
+)
+
+SAMPLE_DIR = os.path.join(ROOT, "data", "lol_responses")
+
+
+def load_sample_files(sample_dir):
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(sample_dir, "*.json"))):
+        with open(path, "r") as f:
+            payloads.append(json.load(f))
+    return payloads
+
+
+class SqliteTarget:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        columns = [
+            row[1] for row in self.conn.execute("PRAGMA table_info(match_detail)")
+        ]
+        self.column = "timeline" if "timeline" in columns else columns[0]
+
+    def sample(self, limit):
+        cursor = self.conn.execute(
+            f'SELECT "{self.column}" FROM match_detail ORDER BY random() LIMIT ?',
+            (limit,),
+        )
+        return [decode_timeline(row[0]) for row in cursor]
+
+    def batches(self, batch_size):
+        last = 0
+        while True:
+            rows = self.conn.execute(
+                f'SELECT rowid, "{self.column}" FROM match_detail WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                (last, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield rows
+
+    def write(self, updates):
+        self.conn.executemany(
+            f'UPDATE match_detail SET "{self.column}" = ? WHERE rowid = ?',
+            [(value, key) for key, value in updates],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class PostgresTarget:
+    def __init__(self, url):
+        from database_pg import Database
+
+        self.db = Database(url)
+        self.db.migrate()
+        self.reader = self.db.get_connection()
+        self.writer = self.db.get_connection()
+
+    def sample(self, limit):
+        with self.writer.cursor() as cursor:
+            cursor.execute(
+                "SELECT timeline FROM match_detail WHERE timeline IS NOT NULL "
+                "ORDER BY random() LIMIT %s",
+                (limit,),
+            )
+            rows = cursor.fetchall()
+        self.writer.commit()
+        return [decode_timeline(row[0]) for row in rows]
+
+    def batches(self, batch_size):
+        with self.reader.cursor(name="migrate_timelines") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(
+                "SELECT match_id, timeline FROM match_detail WHERE timeline IS NOT NULL"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+
+    def write(self, updates):
+        from psycopg2.extras import execute_values
+
+        with self.writer.cursor() as cursor:
+            execute_values(
+                cursor,
+                "UPDATE match_detail AS m SET timeline = v.value "
+                "FROM (VALUES %s) AS v (match_id, value) WHERE m.match_id = v.match_id",
+                [(key, self.binary(value)) for key, value in updates],
+            )
+        self.writer.commit()
+
+    @staticmethod
+    def binary(value):
+        import psycopg2
+
+        if isinstance(value, str):
+            value = value.encode()
+        return psycopg2.Binary(value)
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+
+def migrate(target, batch_size, revert=False):
+    """
+    Rewrites every row that is not yet in the requested storage.
+
+    Returns:
+        tuple: (rows rewritten, bytes before, bytes after) over the rewritten rows.
+    """
+    rewritten, before, after = 0, 0, 0
+    start = time.perf_counter()
+    for rows in target.batches(batch_size):
+        updates = []
+        for key, value in rows:
+            if isinstance(value, memoryview):
+                value = value.tobytes()
+            if is_compressed(value) != revert:
+                continue
+            timeline = decode_timeline(value)
+            if revert:
+                encoded = json.dumps(timeline)
+            else:
+                encoded = timeline_store.encode_timeline(timeline, storage="zstd")
+            before += len(value) if value is not None else 0
+            after += len(encoded)
+            updates.append((key, encoded))
+        if updates:
+            target.write(updates)
+        rewritten += len(updates)
+        print(
+            "{} {} rows rewritten | {:.1f} MB -> {:.1f} MB | {:.0f} rows/s".format(
+                time.strftime("%Y-%m-%d %H:%M"),
+                rewritten,
+                before / 1024**2,
+                after / 1024**2,
+                rewritten / max(time.perf_counter() - start, 1e-9),
+            )
+        )
+    return rewritten, before, after
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["sqlite", "pg"], default="sqlite")
+    parser.add_argument("--db", default="lol_gpt_v3.db", help="SQLite database path")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--train", action="store_true", help="Train and save the dictionary first"
+    )
+    parser.add_argument("--train-rows", type=int, default=200)
+    parser.add_argument("--samples", default=SAMPLE_DIR)
+    parser.add_argument(
+        "--revert", action="store_true", help="Decompress the rows back to JSON"
+    )
+    args = parser.parse_args()
+
+    if args.backend == "pg":
+        target = PostgresTarget(os.getenv("DATABASE_URL"))
+    else:
+        target = SqliteTarget(args.db)
+
+    if args.train:
+        if os.path.exists(timeline_store.TIMELINE_DICT_PATH):
+            # Rows compressed with the old dictionary could not be read back.
+            parser.error(
+                "{} already exists; remove it only after --revert".format(
+                    timeline_store.TIMELINE_DICT_PATH
+                )
+            )
+        payloads = target.sample(args.train_rows) + load_sample_files(args.samples)
+        dictionary = train_dictionary(payloads)
+        save_dictionary(dictionary, timeline_store.TIMELINE_DICT_PATH)
+        print(
+            "Trained a {} byte dictionary on {} payloads -> {}".format(
+                len(dictionary.as_bytes()),
+                len(payloads),
+                timeline_store.TIMELINE_DICT_PATH,
+            )
+        )
+
+    rewritten, before, after = migrate(target, args.batch_size, args.revert)
+    if rewritten:
+        print(
+            "Done: {} rows, {:.1f} MB -> {:.1f} MB ({:.1f}x)".format(
+                rewritten, before / 1024**2, after / 1024**2, before / max(after, 1)
+            )
+        )
+    else:
+        print("Nothing to migrate")
+    target.close()
+
+
+if __name__ == "__main__":
+    main()